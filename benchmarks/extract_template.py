@@ -0,0 +1,115 @@
+"""Бенчмарк распаковки шаблона: последовательная против многопоточной.
+
+Собирает синтетический архив, похожий на крупный пользовательский шаблон (тысячи
+markdown-команд и скриптов), и замеряет `extract_template_zip` и `apply_template_merge`
+с разным числом потоков. Результаты разных прогонов сравниваются побайтно.
+
+Запуск из корня репозитория:
+
+    python benchmarks/extract_template.py --files 5000 --workers 1,2,4,8
+"""
+
+import argparse
+import hashlib
+import random
+import statistics
+import sys
+import tempfile
+import time
+import zipfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from specify_cli import apply_template_merge, extract_template_zip, plan_template_merge  # noqa: E402
+
+
+def build_archive(path: Path, files: int, size: int, seed: int) -> int:
+    """Пишет архив из `files` записей средним размером `size` байт, возвращает суммарный размер."""
+    rng = random.Random(seed)
+    words = [f"слово{i}" for i in range(512)] + ["spec", "plan", "tasks", "## Раздел", "- [ ] T001"]
+    total = 0
+    with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for index in range(files):
+            directory = f"sp-ru-template/.claude/commands/group{index % 64:02d}"
+            if index % 10 == 0:
+                name = f"sp-ru-template/.specify/scripts/bash/script{index}.sh"
+                body = "#!/usr/bin/env bash\n"
+            else:
+                name = f"{directory}/command{index}.md"
+                body = "---\ndescription: синтетическая команда\n---\n"
+            target = max(64, int(rng.gauss(size, size / 3)))
+            while len(body.encode("utf-8")) < target:
+                body += " ".join(rng.choices(words, k=16)) + "\n"
+            data = body.encode("utf-8")
+            total += len(data)
+            archive.writestr(name, data)
+    return total
+
+
+def tree_digest(root: Path) -> str:
+    digest = hashlib.sha256()
+    for path in sorted(root.rglob("*")):
+        if path.is_file():
+            digest.update(path.relative_to(root).as_posix().encode("utf-8"))
+            digest.update(path.read_bytes())
+    return digest.hexdigest()
+
+
+def measure(archive_path: Path, workers: int, repeat: int) -> tuple[list[float], list[float], str]:
+    extract_times: list[float] = []
+    merge_times: list[float] = []
+    digest = ""
+    for _ in range(repeat):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            temp = Path(temp_dir)
+            started = time.perf_counter()
+            with zipfile.ZipFile(archive_path) as zip_ref:
+                extract_template_zip(zip_ref, temp / "extracted", workers=workers)
+            extract_times.append(time.perf_counter() - started)
+
+            source_dir = temp / "extracted" / "sp-ru-template"
+            project = temp / "project"
+            project.mkdir()
+            plan = plan_template_merge(source_dir, project)
+            started = time.perf_counter()
+            apply_template_merge(plan, source_dir, project, workers=workers)
+            merge_times.append(time.perf_counter() - started)
+            digest = tree_digest(project)
+    return extract_times, merge_times, digest
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--files", type=int, default=5000, help="число файлов в архиве")
+    parser.add_argument("--size", type=int, default=4096, help="средний размер файла в байтах")
+    parser.add_argument("--workers", default="1,2,4,8", help="список числа потоков через запятую")
+    parser.add_argument("--repeat", type=int, default=3, help="число повторов для каждого варианта")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        archive_path = Path(temp_dir) / "template.zip"
+        total = build_archive(archive_path, args.files, args.size, args.seed)
+        print(f"Архив: {args.files} файлов, {total / 1e6:.1f} МБ распакованных, {archive_path.stat().st_size / 1e6:.1f} МБ сжатых")
+        print(f"{'потоки':>7} {'распаковка, с':>14} {'копирование, с':>15} {'ускорение':>10}")
+
+        baseline = None
+        digests = set()
+        for workers in (int(value) for value in args.workers.split(",")):
+            extract_times, merge_times, digest = measure(archive_path, workers, args.repeat)
+            digests.add(digest)
+            extract_median = statistics.median(extract_times)
+            merge_median = statistics.median(merge_times)
+            total_median = extract_median + merge_median
+            baseline = baseline or total_median
+            print(f"{workers:>7} {extract_median:>14.3f} {merge_median:>15.3f} {baseline / total_median:>9.2f}x")
+
+    if len(digests) != 1:
+        print("Ошибка: результаты распаковки различаются между прогонами", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -11,6 +11,7 @@
 #   --json              Вывод в формате JSON
 #   --require-tasks     Требовать наличие tasks.md (для этапа реализации)
 #   --include-tasks     Включить tasks.md в список AVAILABLE_DOCS
+#   --include-checklists  Добавить в JSON поле CHECKLISTS со статусом чек-листов (через `specify checklists status`)
 #   --paths-only        Выводить только переменные путей (без валидации)
 #   --help, -h          Показать справку
 #
@@ -25,6 +26,7 @@ set -e
 JSON_MODE=false
 REQUIRE_TASKS=false
 INCLUDE_TASKS=false
+INCLUDE_CHECKLISTS=false
 PATHS_ONLY=false
 
 for arg in "$@"; do
@@ -38,6 +40,9 @@ for arg in "$@"; do
         --include-tasks)
             INCLUDE_TASKS=true
             ;;
+        --include-checklists)
+            INCLUDE_CHECKLISTS=true
+            ;;
         --paths-only)
             PATHS_ONLY=true
             ;;
@@ -51,6 +56,7 @@ for arg in "$@"; do
   --json              Вывод в формате JSON
   --require-tasks     Требовать наличие tasks.md (для этапа реализации)
   --include-tasks     Включить tasks.md в список AVAILABLE_DOCS
+  --include-checklists  Добавить в JSON поле CHECKLISTS со статусом чек-листов (null, если команда specify недоступна)
   --paths-only        Выводить только переменные путей (без валидации предварительных требований)
   --help, -h          Показать это сообщение справки
 
@@ -148,7 +154,17 @@ if $JSON_MODE; then
         json_docs="[${json_docs%,}]"
     fi
     
-    printf '{"FEATURE_DIR":"%s","AVAILABLE_DOCS":%s}\n' "$FEATURE_DIR" "$json_docs"
+    if $INCLUDE_CHECKLISTS; then
+        # Подсчет пунктов выполняет CLI (с кэшем по хешу файлов); без него агент считает сам
+        json_checklists="null"
+        if command -v specify >/dev/null 2>&1; then
+            json_checklists=$(cd "$REPO_ROOT" && specify checklists status --json --feature "$(basename "$FEATURE_DIR")" 2>/dev/null | tail -n 1)
+            [[ -n "$json_checklists" ]] || json_checklists="null"
+        fi
+        printf '{"FEATURE_DIR":"%s","AVAILABLE_DOCS":%s,"CHECKLISTS":%s}\n' "$FEATURE_DIR" "$json_docs" "$json_checklists"
+    else
+        printf '{"FEATURE_DIR":"%s","AVAILABLE_DOCS":%s}\n' "$FEATURE_DIR" "$json_docs"
+    fi
 else
     # Текстовый вывод
     echo "FEATURE_DIR:$FEATURE_DIR"
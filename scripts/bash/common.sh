@@ -83,6 +83,36 @@ check_feature_branch() {
 
 get_feature_dir() { echo "$1/specs/$2"; }
 
+# Найти рабочее дерево (git worktree), в котором выгружена ветка фичи.
+# Точное совпадение имени ветки, иначе единственная ветка с тем же числовым префиксом.
+# Выводит путь к дереву или ничего, если фича не выгружена в отдельном дереве.
+find_feature_worktree() {
+    local branch_name="$1"
+    local prefix=""
+    [[ "$branch_name" =~ ^([0-9]{3})- ]] && prefix="${BASH_REMATCH[1]}"
+
+    local path="" exact="" prefixed=() line
+    while IFS= read -r line; do
+        case "$line" in
+            "worktree "*) path="${line#worktree }" ;;
+            "branch refs/heads/"*)
+                local branch="${line#branch refs/heads/}"
+                if [[ "$branch" == "$branch_name" ]]; then
+                    exact="$path"
+                elif [[ -n "$prefix" && "$branch" == "$prefix"-* ]]; then
+                    prefixed+=("$path")
+                fi
+                ;;
+        esac
+    done < <(git worktree list --porcelain 2>/dev/null)
+
+    if [[ -n "$exact" ]]; then
+        echo "$exact"
+    elif [[ ${#prefixed[@]} -eq 1 ]]; then
+        echo "${prefixed[0]}"
+    fi
+}
+
 # Найти директорию фичи по числовому префиксу вместо точного совпадения имени ветки
 # Это позволяет нескольким веткам работать над одной спецификацией (например, 004-fix-bug, 004-add-feature)
 find_feature_dir_by_prefix() {
@@ -133,6 +163,15 @@ get_feature_paths() {
         has_git_repo="true"
     fi
 
+    # Фича из SPECIFY_FEATURE может быть выгружена в отдельном рабочем дереве
+    # (create-new-feature.sh --worktree): тогда ее артефакты лежат в нем, а не в текущем дереве
+    if [[ "$has_git_repo" == "true" && -n "${SPECIFY_FEATURE:-}" ]]; then
+        local worktree=$(find_feature_worktree "$current_branch")
+        if [[ -n "$worktree" && -d "$worktree/.specify" ]]; then
+            repo_root="$worktree"
+        fi
+    fi
+
     # Использовать поиск по префиксу для поддержки нескольких веток на одну спецификацию
     local feature_dir=$(find_feature_dir_by_prefix "$repo_root" "$current_branch")
 
@@ -3,6 +3,9 @@
 set -e
 
 JSON_MODE=false
+# Режим рабочих деревьев: каждая фича в своем `git worktree` с общим хранилищем объектов
+WORKTREE_MODE=false
+[[ "${SPECIFY_WORKTREE:-}" == "1" || "${SPECIFY_WORKTREE:-}" == "true" ]] && WORKTREE_MODE=true
 SHORT_NAME=""
 BRANCH_NUMBER=""
 ARGS=()
@@ -13,6 +16,9 @@ while [ $i -le $# ]; do
         --json) 
             JSON_MODE=true 
             ;;
+        --worktree)
+            WORKTREE_MODE=true
+            ;;
         --short-name)
             if [ $((i + 1)) -gt $# ]; then
                 echo 'Ошибка: параметр --short-name требует значения' >&2
@@ -41,10 +47,12 @@ while [ $i -le $# ]; do
             BRANCH_NUMBER="$next_arg"
             ;;
         --help|-h) 
-            echo "Использование: $0 [--json] [--short-name <имя>] [--number N] <описание_функции>"
+            echo "Использование: $0 [--json] [--worktree] [--short-name <имя>] [--number N] <описание_функции>"
             echo ""
             echo "Опции:"
             echo "  --json              Вывод в формате JSON"
+            echo "  --worktree          Создать фичу в отдельном git worktree (или SPECIFY_WORKTREE=1);"
+            echo "                      каталог деревьев: SPECIFY_WORKTREE_DIR, по умолчанию ../<репозиторий>.worktrees"
             echo "  --short-name <имя>  Указать пользовательское короткое имя (2-4 слова) для ветки"
             echo "  --number N          Указать номер ветки вручную (переопределяет автоопределение)"
             echo "  --help, -h          Показать это справочное сообщение"
@@ -63,7 +71,7 @@ done
 
 FEATURE_DESCRIPTION="${ARGS[*]}"
 if [ -z "$FEATURE_DESCRIPTION" ]; then
-    echo "Использование: $0 [--json] [--short-name <имя>] [--number N] <описание_функции>" >&2
+    echo "Использование: $0 [--json] [--worktree] [--short-name <имя>] [--number N] <описание_функции>" >&2
     exit 1
 fi
 
@@ -96,6 +104,17 @@ get_highest_from_specs() {
             fi
         done
     fi
+
+    # Номера фич, перенесенных в архив (`specify archive`), остаются занятыми
+    local archive_index="$(dirname "$specs_dir")/.specify/archive/index.json"
+    if [ -f "$archive_index" ]; then
+        for number in $(grep -o '"name": *"[0-9]\+' "$archive_index" | grep -o '[0-9]\+$'); do
+            number=$((10#$number))
+            if [ "$number" -gt "$highest" ]; then
+                highest=$number
+            fi
+        done
+    fi
     
     echo "$highest"
 }
@@ -109,8 +128,8 @@ get_highest_from_branches() {
     
     if [ -n "$branches" ]; then
         while IFS= read -r branch; do
-            # Очистка имени ветки: удаление ведущих маркеров и префиксов удаленных репозиториев
-            clean_branch=$(echo "$branch" | sed 's/^[* ]*//; s|^remotes/[^/]*/||')
+            # Очистка имени ветки: удаление ведущих маркеров (* - текущая ветка, + - ветка в другом рабочем дереве) и префиксов удаленных репозиториев
+            clean_branch=$(echo "$branch" | sed 's/^[*+ ]*//; s|^remotes/[^/]*/||')
             
             # Извлечение номера фичи, если ветка соответствует шаблону ###-*
             if echo "$clean_branch" | grep -q '^[0-9]\{3\}-'; then
@@ -283,7 +302,20 @@ if [ ${#BRANCH_NAME} -gt $MAX_BRANCH_LENGTH ]; then
     >&2 echo "[specify] Обрезано до: $BRANCH_NAME (${#BRANCH_NAME} байт)"
 fi
 
-if [ "$HAS_GIT" = true ]; then
+WORKTREE=""
+if $WORKTREE_MODE; then
+    if [ "$HAS_GIT" != true ]; then
+        echo "Ошибка: режим --worktree требует git-репозиторий" >&2
+        exit 1
+    fi
+    # Деревья всех фич лежат рядом с основным деревом, даже если скрипт запущен из дерева другой фичи
+    MAIN_ROOT=$(git worktree list --porcelain | sed -n '1s/^worktree //p')
+    WORKTREES_DIR="${SPECIFY_WORKTREE_DIR:-$(dirname "$MAIN_ROOT")/$(basename "$MAIN_ROOT").worktrees}"
+    WORKTREE="$WORKTREES_DIR/$BRANCH_NAME"
+    mkdir -p "$WORKTREES_DIR"
+    git worktree add -q -b "$BRANCH_NAME" "$WORKTREE" >&2
+    SPECS_DIR="$WORKTREE/specs"
+elif [ "$HAS_GIT" = true ]; then
     git checkout -b "$BRANCH_NAME"
 else
     >&2 echo "[specify] Предупреждение: Git-репозиторий не обнаружен; создание ветки для $BRANCH_NAME пропущено"
@@ -293,6 +325,8 @@ FEATURE_DIR="$SPECS_DIR/$BRANCH_NAME"
 mkdir -p "$FEATURE_DIR"
 
 TEMPLATE="$REPO_ROOT/.specify/templates/spec-template.md"
+# В новом дереве есть только закоммиченные шаблоны; если шаблона там нет, берем его из текущего дерева
+[ -n "$WORKTREE" ] && [ -f "$WORKTREE/.specify/templates/spec-template.md" ] && TEMPLATE="$WORKTREE/.specify/templates/spec-template.md"
 SPEC_FILE="$FEATURE_DIR/spec.md"
 if [ -f "$TEMPLATE" ]; then cp "$TEMPLATE" "$SPEC_FILE"; else touch "$SPEC_FILE"; fi
 
@@ -300,10 +334,15 @@ if [ -f "$TEMPLATE" ]; then cp "$TEMPLATE" "$SPEC_FILE"; else touch "$SPEC_FILE"
 export SPECIFY_FEATURE="$BRANCH_NAME"
 
 if $JSON_MODE; then
-    printf '{"BRANCH_NAME":"%s","SPEC_FILE":"%s","FEATURE_NUM":"%s"}\n' "$BRANCH_NAME" "$SPEC_FILE" "$FEATURE_NUM"
+    if [ -n "$WORKTREE" ]; then
+        printf '{"BRANCH_NAME":"%s","SPEC_FILE":"%s","FEATURE_NUM":"%s","WORKTREE":"%s"}\n' "$BRANCH_NAME" "$SPEC_FILE" "$FEATURE_NUM" "$WORKTREE"
+    else
+        printf '{"BRANCH_NAME":"%s","SPEC_FILE":"%s","FEATURE_NUM":"%s"}\n' "$BRANCH_NAME" "$SPEC_FILE" "$FEATURE_NUM"
+    fi
 else
     echo "BRANCH_NAME: $BRANCH_NAME"
     echo "SPEC_FILE: $SPEC_FILE"
     echo "FEATURE_NUM: $FEATURE_NUM"
+    [ -n "$WORKTREE" ] && echo "WORKTREE: $WORKTREE"
     echo "Переменная окружения SPECIFY_FEATURE установлена в: $BRANCH_NAME"
 fi
@@ -4,6 +4,7 @@ set -e
 
 # Разбор аргументов командной строки
 JSON_MODE=false
+FORCE=false
 ARGS=()
 
 for arg in "$@"; do
@@ -11,9 +12,13 @@ for arg in "$@"; do
         --json) 
             JSON_MODE=true 
             ;;
+        --force)
+            FORCE=true
+            ;;
         --help|-h) 
-            echo "Использование: $0 [--json]"
+            echo "Использование: $0 [--json] [--force]"
             echo "  --json    Вывод результатов в формате JSON"
+            echo "  --force   Перезаписать существующий plan.md шаблоном"
             echo "  --help    Показать это справочное сообщение"
             exit 0 
             ;;
@@ -36,9 +41,13 @@ check_feature_branch "$CURRENT_BRANCH" "$HAS_GIT" || exit 1
 # Убедиться, что директория функции существует
 mkdir -p "$FEATURE_DIR"
 
-# Копирование шаблона плана, если он существует
+# Копирование шаблона плана, если он существует; готовый план не перезаписывается без --force
 TEMPLATE="$REPO_ROOT/.specify/templates/plan-template.md"
-if [[ -f "$TEMPLATE" ]]; then
+PLAN_EXISTS=false
+if [[ -s "$IMPL_PLAN" ]] && ! $FORCE; then
+    PLAN_EXISTS=true
+    echo "План уже существует, оставлен без изменений: $IMPL_PLAN" >&2
+elif [[ -f "$TEMPLATE" ]]; then
     cp "$TEMPLATE" "$IMPL_PLAN"
     echo "Шаблон плана скопирован в $IMPL_PLAN"
 else
@@ -49,13 +58,14 @@ fi
 
 # Вывод результатов
 if $JSON_MODE; then
-    printf '{"FEATURE_SPEC":"%s","IMPL_PLAN":"%s","SPECS_DIR":"%s","BRANCH":"%s","HAS_GIT":"%s"}\n' \
-        "$FEATURE_SPEC" "$IMPL_PLAN" "$FEATURE_DIR" "$CURRENT_BRANCH" "$HAS_GIT"
+    printf '{"FEATURE_SPEC":"%s","IMPL_PLAN":"%s","SPECS_DIR":"%s","BRANCH":"%s","HAS_GIT":"%s","PLAN_EXISTS":"%s"}\n' \
+        "$FEATURE_SPEC" "$IMPL_PLAN" "$FEATURE_DIR" "$CURRENT_BRANCH" "$HAS_GIT" "$PLAN_EXISTS"
 else
     echo "FEATURE_SPEC: $FEATURE_SPEC"
     echo "IMPL_PLAN: $IMPL_PLAN" 
     echo "SPECS_DIR: $FEATURE_DIR"
     echo "BRANCH: $CURRENT_BRANCH"
     echo "HAS_GIT: $HAS_GIT"
+    echo "PLAN_EXISTS: $PLAN_EXISTS"
 fi
 
@@ -11,6 +11,7 @@
 #   -Json               Вывод в формате JSON
 #   -RequireTasks       Требовать наличие tasks.md (для этапа реализации)
 #   -IncludeTasks       Включить tasks.md в список AVAILABLE_DOCS
+#   -IncludeChecklists  Добавить в JSON поле CHECKLISTS со статусом чек-листов (через `specify checklists status`)
 #   -PathsOnly          Вывести только переменные путей (без валидации)
 #   -Help, -h           Показать справку
 
@@ -19,6 +20,7 @@ param(
     [switch]$Json,
     [switch]$RequireTasks,
     [switch]$IncludeTasks,
+    [switch]$IncludeChecklists,
     [switch]$PathsOnly,
     [switch]$Help
 )
@@ -36,6 +38,7 @@ if ($Help) {
   -Json               Вывод в формате JSON
   -RequireTasks       Требовать наличие tasks.md (для этапа реализации)
   -IncludeTasks       Включить tasks.md в список AVAILABLE_DOCS
+  -IncludeChecklists  Добавить в JSON поле CHECKLISTS со статусом чек-листов (null, если команда specify недоступна)
   -PathsOnly          Вывести только переменные путей (без проверки условий)
   -Help, -h           Показать это справочное сообщение
 
@@ -127,10 +130,26 @@ if ($IncludeTasks -and (Test-Path $paths.TASKS)) {
 # Вывод результатов
 if ($Json) {
     # Вывод в JSON
-    [PSCustomObject]@{ 
+    $result = [ordered]@{
         FEATURE_DIR = $paths.FEATURE_DIR
-        AVAILABLE_DOCS = $docs 
-    } | ConvertTo-Json -Compress
+        AVAILABLE_DOCS = $docs
+    }
+    if ($IncludeChecklists) {
+        # Подсчет пунктов выполняет CLI (с кэшем по хешу файлов); без него агент считает сам
+        $result.CHECKLISTS = $null
+        if (Get-Command specify -ErrorAction SilentlyContinue) {
+            Push-Location $paths.REPO_ROOT
+            try {
+                $line = specify checklists status --json --feature (Split-Path $paths.FEATURE_DIR -Leaf) 2>$null | Select-Object -Last 1
+                if ($line) { $result.CHECKLISTS = $line | ConvertFrom-Json }
+            } catch {
+                $result.CHECKLISTS = $null
+            } finally {
+                Pop-Location
+            }
+        }
+    }
+    [PSCustomObject]$result | ConvertTo-Json -Compress -Depth 6
 } else {
     # Текстовый вывод
     Write-Output "FEATURE_DIR:$($paths.FEATURE_DIR)"
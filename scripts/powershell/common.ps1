@@ -108,10 +108,47 @@ function Get-FeatureDir {
     Join-Path $RepoRoot "specs/$Branch"
 }
 
+# Найти рабочее дерево (git worktree), в котором выгружена ветка фичи.
+# Точное совпадение имени ветки, иначе единственная ветка с тем же числовым префиксом.
+function Find-FeatureWorktree {
+    param([string]$Branch)
+    $prefix = if ($Branch -match '^(\d{3})-') { $matches[1] } else { $null }
+    $path = $null
+    $exact = $null
+    $prefixed = @()
+    try {
+        $lines = git worktree list --porcelain 2>$null
+    } catch {
+        return $null
+    }
+    foreach ($line in $lines) {
+        if ($line.StartsWith('worktree ')) {
+            $path = $line.Substring(9)
+        } elseif ($line.StartsWith('branch refs/heads/')) {
+            $name = $line.Substring(18)
+            if ($name -eq $Branch) {
+                $exact = $path
+            } elseif ($prefix -and $name.StartsWith("$prefix-")) {
+                $prefixed += $path
+            }
+        }
+    }
+    if ($exact) { return $exact }
+    if ($prefixed.Count -eq 1) { return $prefixed[0] }
+    return $null
+}
+
 function Get-FeaturePathsEnv {
     $repoRoot = Get-RepoRoot
     $currentBranch = Get-CurrentBranch
     $hasGit = Test-HasGit
+    # Фича из SPECIFY_FEATURE может быть выгружена в отдельном рабочем дереве (create-new-feature.ps1 -Worktree)
+    if ($hasGit -and $env:SPECIFY_FEATURE) {
+        $worktree = Find-FeatureWorktree -Branch $currentBranch
+        if ($worktree -and (Test-Path -LiteralPath (Join-Path $worktree '.specify') -PathType Container)) {
+            $repoRoot = [System.IO.Path]::GetFullPath($worktree)
+        }
+    }
     $featureDir = Get-FeatureDir -RepoRoot $repoRoot -Branch $currentBranch
     
     [PSCustomObject]@{
@@ -3,6 +3,7 @@
 [CmdletBinding(PositionalBinding=$false)]
 param(
     [switch]$Json,
+    [switch]$Worktree,
     [string]$ShortName,
     [int]$Number = 0,
     [switch]$Help,
@@ -18,10 +19,12 @@ $OutputEncoding = $utf8NoBom
 
 # Показать справку по запросу
 if ($Help) {
-    Write-Host "Использование: ./create-new-feature.ps1 [-Json] [-ShortName <имя>] [-Number N] <описание функциональности>"
+    Write-Host "Использование: ./create-new-feature.ps1 [-Json] [-Worktree] [-ShortName <имя>] [-Number N] <описание функциональности>"
     Write-Host ""
     Write-Host "Опции:"
     Write-Host "  -Json               Вывод в формате JSON"
+    Write-Host "  -Worktree           Создать фичу в отдельном git worktree (или SPECIFY_WORKTREE=1);"
+    Write-Host "                      каталог деревьев: SPECIFY_WORKTREE_DIR, по умолчанию ../<репозиторий>.worktrees"
     Write-Host "  -ShortName <имя>    Указать короткое имя (2-4 слова) для ветки вручную"
     Write-Host "  -Number N           Указать номер ветки вручную (переопределяет автоопределение)"
     Write-Host "  -Help               Показать это справочное сообщение"
@@ -77,6 +80,16 @@ function Get-HighestNumberFromSpecs {
             }
         }
     }
+    # Номера фич, перенесенных в архив (`specify archive`), остаются занятыми
+    $archiveIndex = Join-Path (Split-Path $SpecsDir -Parent) '.specify/archive/index.json'
+    if (Test-Path $archiveIndex) {
+        foreach ($feature in (Get-Content -Raw -Path $archiveIndex | ConvertFrom-Json).features) {
+            if ($feature.name -match '^(\d+)') {
+                $num = [int]$matches[1]
+                if ($num -gt $highest) { $highest = $num }
+            }
+        }
+    }
     return $highest
 }
 
@@ -88,8 +101,8 @@ function Get-HighestNumberFromBranches {
         $branches = git branch -a 2>$null
         if ($LASTEXITCODE -eq 0) {
             foreach ($branch in $branches) {
-                # Очистка имени ветки: удаление ведущих маркеров и префиксов удаленных репозиториев
-                $cleanBranch = $branch.Trim() -replace '^\*?\s+', '' -replace '^remotes/[^/]+/', ''
+                # Очистка имени ветки: удаление ведущих маркеров (* - текущая ветка, + - ветка в другом рабочем дереве) и префиксов удаленных репозиториев
+                $cleanBranch = $branch.Trim() -replace '^[*+]?\s+', '' -replace '^remotes/[^/]+/', ''
                 
                 # Извлечение номера функциональности, если ветка соответствует шаблону ###-*
                 if ($cleanBranch -match '^(\d+)-') {
@@ -249,7 +262,27 @@ if ($branchName.Length -gt $maxBranchLength) {
     Write-Warning "[specify] Обрезано до: $branchName ($($branchName.Length) байт)"
 }
 
-if ($hasGit) {
+# Режим рабочих деревьев: каждая фича в своем `git worktree` с общим хранилищем объектов
+if ($env:SPECIFY_WORKTREE -in @('1', 'true')) { $Worktree = $true }
+$worktreePath = $null
+
+if ($Worktree) {
+    if (-not $hasGit) {
+        Write-Error "Ошибка: режим -Worktree требует git-репозиторий"
+        exit 1
+    }
+    # Деревья всех фич лежат рядом с основным деревом, даже если скрипт запущен из дерева другой фичи
+    $mainRoot = ((git worktree list --porcelain) | Select-Object -First 1).Substring(9)
+    $worktreesDir = if ($env:SPECIFY_WORKTREE_DIR) { $env:SPECIFY_WORKTREE_DIR } else { Join-Path (Split-Path -Parent $mainRoot) ((Split-Path -Leaf $mainRoot) + '.worktrees') }
+    New-Item -ItemType Directory -Path $worktreesDir -Force | Out-Null
+    $worktreePath = Join-Path $worktreesDir $branchName
+    git worktree add -q -b $branchName $worktreePath 2>&1 | Out-Null
+    if ($LASTEXITCODE -ne 0) {
+        Write-Error "Не удалось создать рабочее дерево: $worktreePath"
+        exit 1
+    }
+    $specsDir = Join-Path $worktreePath 'specs'
+} elseif ($hasGit) {
     try {
         git checkout -b $branchName | Out-Null
     } catch {
@@ -263,6 +296,10 @@ $featureDir = Join-Path $specsDir $branchName
 New-Item -ItemType Directory -Path $featureDir -Force | Out-Null
 
 $template = Join-Path $repoRoot '.specify/templates/spec-template.md'
+# В новом дереве есть только закоммиченные шаблоны; если шаблона там нет, берем его из текущего дерева
+if ($worktreePath -and (Test-Path -LiteralPath (Join-Path $worktreePath '.specify/templates/spec-template.md'))) {
+    $template = Join-Path $worktreePath '.specify/templates/spec-template.md'
+}
 if (-not (Test-Path -LiteralPath $template)) {
     $template = Join-Path $repoRoot 'templates/spec-template.md'
 }
@@ -283,11 +320,13 @@ if ($Json) {
         FEATURE_NUM = $featureNum
         HAS_GIT = $hasGit
     }
+    if ($worktreePath) { $obj | Add-Member -NotePropertyName WORKTREE -NotePropertyValue $worktreePath }
     $obj | ConvertTo-Json -Compress
 } else {
     Write-Output "BRANCH_NAME: $branchName"
     Write-Output "SPEC_FILE: $specFile"
     Write-Output "FEATURE_NUM: $featureNum"
     Write-Output "HAS_GIT: $hasGit"
+    if ($worktreePath) { Write-Output "WORKTREE: $worktreePath" }
     Write-Output "Переменная окружения SPECIFY_FEATURE установлена в: $branchName"
 }
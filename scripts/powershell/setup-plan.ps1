@@ -4,6 +4,7 @@
 [CmdletBinding(PositionalBinding=$false)]
 param(
     [switch]$Json,
+    [switch]$Force,
     [switch]$Help
 )
 
@@ -11,8 +12,9 @@ $ErrorActionPreference = 'Stop'
 
 # Показать справку по запросу
 if ($Help) {
-    Write-Output "Использование: ./setup-plan.ps1 [-Json] [-Help]"
+    Write-Output "Использование: ./setup-plan.ps1 [-Json] [-Force] [-Help]"
     Write-Output "  -Json     Вывод результатов в формате JSON"
+    Write-Output "  -Force    Перезаписать существующий plan.md шаблоном"
     Write-Output "  -Help     Показать это справочное сообщение"
     exit 0
 }
@@ -31,12 +33,17 @@ if (-not (Test-FeatureBranch -Branch $paths.CURRENT_BRANCH -HasGit $paths.HAS_GI
 # Убедиться, что директория функциональности существует
 New-Item -ItemType Directory -Path $paths.FEATURE_DIR -Force | Out-Null
 
-# Скопировать шаблон плана, если он существует, иначе сообщить об этом или создать пустой файл
+# Скопировать шаблон плана, если он существует, иначе сообщить об этом или создать пустой файл.
+# Готовый план не перезаписывается без -Force
 $template = Join-Path $paths.REPO_ROOT '.specify/templates/plan-template.md'
 if (-not (Test-Path -LiteralPath $template)) {
     $template = Join-Path $paths.REPO_ROOT 'templates/plan-template.md'
 }
-if (Test-Path $template) { 
+$planExists = $false
+if (-not $Force -and (Test-Path -LiteralPath $paths.IMPL_PLAN -PathType Leaf) -and (Get-Item -LiteralPath $paths.IMPL_PLAN).Length -gt 0) {
+    $planExists = $true
+    Write-Warning "План уже существует, оставлен без изменений: $($paths.IMPL_PLAN)"
+} elseif (Test-Path $template) { 
     Copy-Item $template $paths.IMPL_PLAN -Force
     Write-Output "Шаблон плана скопирован в $($paths.IMPL_PLAN)"
 } else {
@@ -53,6 +60,7 @@ if ($Json) {
         SPECS_DIR = $paths.FEATURE_DIR
         BRANCH = $paths.CURRENT_BRANCH
         HAS_GIT = $paths.HAS_GIT
+        PLAN_EXISTS = $planExists
     }
     $result | ConvertTo-Json -Compress
 } else {
@@ -61,4 +69,5 @@ if ($Json) {
     Write-Output "SPECS_DIR: $($paths.FEATURE_DIR)"
     Write-Output "BRANCH: $($paths.CURRENT_BRANCH)"
     Write-Output "HAS_GIT: $($paths.HAS_GIT)"
+    Write-Output "PLAN_EXISTS: $planExists"
 }
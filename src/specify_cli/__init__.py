@@ -33,15 +33,30 @@ import shutil
 import shlex
 import json
 import codecs
+import re
+import select
+import struct
+import sqlite3
+import time
+import random
+import hashlib
+import threading
+import asyncio
+import atexit
+import importlib.metadata
+import importlib.resources
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import contextmanager, nullcontext
 from pathlib import Path
-from typing import Optional, Tuple
+from typing import NoReturn, Optional, Tuple
 
 import typer
 import httpx
 from rich.console import Console
 from rich.panel import Panel
-from rich.progress import Progress, SpinnerColumn, TextColumn
+from rich.progress import Progress, SpinnerColumn, TextColumn, BarColumn
 from rich.text import Text
+from rich.markup import escape
 from rich.live import Live
 from rich.align import Align
 from rich.table import Table
@@ -52,7 +67,10 @@ from typer.core import TyperGroup
 import readchar
 import ssl
 import truststore
+import platformdirs
 from datetime import datetime, timezone
+from urllib.parse import urljoin, urlparse
+from urllib.request import url2pathname
 
 ssl_context = truststore.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
 client = httpx.Client(verify=ssl_context)
@@ -123,6 +141,150 @@ def _format_rate_limit_error(status_code: int, headers: httpx.Headers, url: str)
     
     return "\n".join(lines)
 
+# Параметры повторов сетевых запросов (загрузка шаблона, запросы к GitHub API)
+RETRY_MAX_ATTEMPTS = 5
+RETRY_BACKOFF_BASE = 1.0  # секунды, удваивается с каждой попыткой
+RETRY_BACKOFF_MAX = 60.0  # верхняя граница одной паузы; более долгие ожидания сброса лимита не ждем
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+def _is_retryable_status(status_code: int, headers: httpx.Headers) -> bool:
+    """Определяет, имеет ли смысл повторять запрос с данным статусом ответа.
+
+    403 повторяется только если это ограничение скорости (исчерпан лимит или есть Retry-After),
+    а не отказ в доступе.
+    """
+    if status_code in RETRYABLE_STATUS_CODES:
+        return True
+    if status_code == 403:
+        rate_info = _parse_rate_limit_headers(headers)
+        return rate_info.get("remaining") == "0" or "retry_after_seconds" in rate_info
+    return False
+
+def _retry_delay(attempt: int, headers: httpx.Headers | None = None) -> float | None:
+    """Вычисляет паузу перед повтором номер `attempt` (с нуля).
+
+    Учитывает Retry-After и X-RateLimit-Reset из `_parse_rate_limit_headers`; без них
+    используется экспоненциальная задержка с полным джиттером. Возвращает None, если
+    сервер просит ждать дольше RETRY_BACKOFF_MAX - тогда повтор бессмыслен.
+    """
+    if headers is not None:
+        rate_info = _parse_rate_limit_headers(headers)
+        server_delay = None
+        if "retry_after_seconds" in rate_info:
+            server_delay = float(rate_info["retry_after_seconds"])
+        elif rate_info.get("remaining") == "0" and "reset_epoch" in rate_info:
+            server_delay = max(0.0, rate_info["reset_epoch"] - time.time()) + 1.0
+        if server_delay is not None:
+            return server_delay if server_delay <= RETRY_BACKOFF_MAX else None
+    return random.uniform(0, min(RETRY_BACKOFF_MAX, RETRY_BACKOFF_BASE * (2 ** attempt)))
+
+def _get_with_retry(client: httpx.Client, url: str, *, timeout: float, headers: dict, verbose: bool = False, attempts: int = RETRY_MAX_ATTEMPTS) -> httpx.Response:
+    """Выполняет GET с повторами при сетевых сбоях, 5xx и ограничениях скорости.
+
+    Возвращает последний полученный ответ (вызывающий код сам обрабатывает не-200 статусы)
+    или пробрасывает последнюю сетевую ошибку.
+    """
+    for attempt in range(attempts):
+        try:
+            response = client.get(url, timeout=timeout, follow_redirects=True, headers=headers)
+        except httpx.TransportError as e:
+            if attempt == attempts - 1:
+                raise
+            delay = _retry_delay(attempt)
+            if verbose:
+                console.print(f"[yellow]Сетевая ошибка ({e}), повтор через {delay:.1f} с...[/yellow]")
+            time.sleep(delay)
+            continue
+        if response.status_code == 200 or not _is_retryable_status(response.status_code, response.headers):
+            return response
+        delay = _retry_delay(attempt, response.headers)
+        if delay is None or attempt == attempts - 1:
+            return response
+        if verbose:
+            console.print(f"[yellow]GitHub вернул {response.status_code}, повтор через {delay:.1f} с...[/yellow]")
+        time.sleep(delay)
+    return response
+
+def _download_with_resume(client: httpx.Client, url: str, dest: Path, *, expected_size: int = 0, headers: dict | None = None, show_progress: bool = True, verbose: bool = False, debug: bool = False) -> int:
+    """Скачивает `url` в `dest` с докачкой через HTTP Range и повторами.
+
+    Данные пишутся в `dest` с суффиксом `.part`; после обрыва следующая попытка запрашивает
+    только недостающий хвост (`Range: bytes=N-`). Если сервер не поддерживает Range (отвечает 200),
+    файл перезаписывается с начала. Возвращает число байт итогового файла.
+    """
+    part_path = dest.with_name(dest.name + ".part")
+    part_path.unlink(missing_ok=True)
+    last_error: Exception | None = None
+
+    progress_cm = Progress(
+        SpinnerColumn(),
+        TextColumn("[progress.description]{task.description}"),
+        TextColumn("[progress.percentage]{task.percentage:>3.0f}%"),
+        console=console,
+    ) if show_progress else nullcontext()
+
+    with progress_cm as progress:
+        task = progress.add_task("Загрузка...", total=expected_size or None) if progress else None
+        for attempt in range(RETRY_MAX_ATTEMPTS):
+            offset = part_path.stat().st_size if part_path.exists() else 0
+            request_headers = dict(headers or {})
+            if offset:
+                request_headers["Range"] = f"bytes={offset}-"
+            delay = None
+            reason = ""
+            try:
+                with client.stream("GET", url, timeout=60, follow_redirects=True, headers=request_headers) as response:
+                    status = response.status_code
+                    if status == 416 and offset:
+                        if expected_size and offset >= expected_size:
+                            # Файл уже полностью получен в предыдущей попытке
+                            break
+                        # Частичный файл не согласуется с сервером - начинаем заново
+                        part_path.unlink()
+                        last_error = RuntimeError(f"сервер отклонил диапазон bytes={offset}-")
+                        reason = f"HTTP {status}"
+                        delay = 0.0
+                    elif status not in (200, 206):
+                        error_msg = _format_rate_limit_error(status, response.headers, url)
+                        if debug:
+                            response.read()
+                            error_msg += f"\n\n[dim]Тело ответа (обрезано 400):[/dim]\n{response.text[:400]}"
+                        last_error = RuntimeError(error_msg)
+                        reason = f"HTTP {status}"
+                        if not _is_retryable_status(status, response.headers):
+                            raise last_error
+                        delay = _retry_delay(attempt, response.headers)
+                        if delay is None:
+                            raise last_error
+                    else:
+                        if status == 200:
+                            offset = 0  # Range проигнорирован - начинаем заново
+                        total = expected_size or (offset + int(response.headers.get("content-length", 0)))
+                        if progress:
+                            progress.update(task, total=total or None, completed=offset)
+                        with open(part_path, "ab" if offset else "wb") as f:
+                            # Без chunk_size: полученные до обрыва байты не застревают в буфере и пишутся в .part
+                            for chunk in response.iter_bytes():
+                                f.write(chunk)
+                                offset += len(chunk)
+                                if progress:
+                                    progress.update(task, completed=offset)
+                        if expected_size and offset < expected_size:
+                            raise httpx.ReadError(f"соединение закрыто после {offset:,} из {expected_size:,} байт")
+                        break
+            except httpx.TransportError as e:
+                last_error = e
+                reason = str(e)
+                delay = _retry_delay(attempt)
+            if attempt == RETRY_MAX_ATTEMPTS - 1:
+                raise last_error
+            if verbose:
+                console.print(f"[yellow]Загрузка прервана ({reason}), повтор через {delay:.1f} с...[/yellow]")
+            time.sleep(delay)
+
+    part_path.replace(dest)
+    return dest.stat().st_size
+
 # Конфигурация агентов с именем, папкой, URL установки и требованием CLI инструмента
 AGENT_CONFIG = {
     "copilot": {
@@ -244,23 +406,68 @@ BANNER = """
 
 TAGLINE = "GitHub Spec Kit - Инструментарий разработки через спецификации"
 
+STEP_SYMBOLS = {
+    "done": "[green]●[/green]",
+    "pending": "[green dim]○[/green dim]",
+    "running": "[cyan]○[/cyan]",
+    "error": "[red]●[/red]",
+    "skipped": "[yellow]○[/yellow]",
+}
+
+class _Step:
+    """Запись шага StepTracker с монотонными отметками начала и окончания."""
+    __slots__ = ("key", "label", "status", "detail", "started", "ended")
+
+    def __init__(self, key: str, label: str, status: str = "pending", detail: str = ""):
+        self.key = key
+        self.label = label
+        self.status = status
+        self.detail = detail
+        self.started: float | None = None
+        self.ended: float | None = None
+
+    @property
+    def duration(self) -> float | None:
+        if self.started is None or self.ended is None:
+            return None
+        return self.ended - self.started
+
+def _format_duration(seconds: float) -> str:
+    if seconds < 1:
+        return f"{seconds * 1000:.0f} мс"
+    return f"{seconds:.2f} с"
+
 class StepTracker:
     """Отслеживает и отображает иерархические шаги без эмодзи, аналогично выводу дерева Claude Code.
-    Поддерживает живое автообновление через прикрепленный callback обновления.
+
+    Шаги хранятся в словаре по ключу (порядок добавления сохраняется), дерево перестраивается
+    только после изменений. Трекер можно передать в `Live` напрямую (`__rich__`), а слушатель
+    из `attach_listener` получает каждый переход шага - для построчного вывода вне терминала.
     """
+    status_order = {"pending": 0, "running": 1, "done": 2, "error": 3, "skipped": 4}
+
     def __init__(self, title: str):
         self.title = title
-        self.steps = []  # список словарей: {key, label, status, detail}
-        self.status_order = {"pending": 0, "running": 1, "done": 2, "error": 3, "skipped": 4}
-        self._refresh_cb = None  # callable для запуска обновления UI
+        self._steps: dict[str, _Step] = {}
+        self._lock = threading.RLock()
+        self._dirty = True
+        self._tree = None
+        self._listener = None  # callable(step), вызывается при каждом переходе шага
+
+    @property
+    def steps(self) -> list[_Step]:
+        with self._lock:
+            return list(self._steps.values())
 
-    def attach_refresh(self, cb):
-        self._refresh_cb = cb
+    def attach_listener(self, cb):
+        self._listener = cb
 
     def add(self, key: str, label: str):
-        if key not in [s["key"] for s in self.steps]:
-            self.steps.append({"key": key, "label": label, "status": "pending", "detail": ""})
-            self._maybe_refresh()
+        with self._lock:
+            if key in self._steps:
+                return
+            self._steps[key] = _Step(key, label)
+            self._dirty = True
 
     def start(self, key: str, detail: str = ""):
         self._update(key, status="running", detail=detail)
@@ -275,59 +482,302 @@ class StepTracker:
         self._update(key, status="skipped", detail=detail)
 
     def _update(self, key: str, status: str, detail: str):
-        for s in self.steps:
-            if s["key"] == key:
-                s["status"] = status
+        now = time.monotonic()
+        with self._lock:
+            step = self._steps.get(key)
+            if step is None:
+                step = self._steps[key] = _Step(key, key, status, detail)
+            else:
+                step.status = status
                 if detail:
-                    s["detail"] = detail
-                self._maybe_refresh()
-                return
-
-        self.steps.append({"key": key, "label": key, "status": status, "detail": detail})
-        self._maybe_refresh()
-
-    def _maybe_refresh(self):
-        if self._refresh_cb:
+                    step.detail = detail
+            if status == "running":
+                step.started, step.ended = now, None
+            else:
+                step.ended = now
+            self._dirty = True
+        if self._listener:
             try:
-                self._refresh_cb()
+                self._listener(step)
             except Exception:
                 pass
 
     def render(self):
-        tree = Tree(f"[cyan]{self.title}[/cyan]", guide_style="grey50")
-        for step in self.steps:
-            label = step["label"]
-            detail_text = step["detail"].strip() if step["detail"] else ""
-
-            status = step["status"]
-            if status == "done":
-                symbol = "[green]●[/green]"
-            elif status == "pending":
-                symbol = "[green dim]○[/green dim]"
-            elif status == "running":
-                symbol = "[cyan]○[/cyan]"
-            elif status == "error":
-                symbol = "[red]●[/red]"
-            elif status == "skipped":
-                symbol = "[yellow]○[/yellow]"
-            else:
-                symbol = " "
+        with self._lock:
+            if not self._dirty and self._tree is not None:
+                return self._tree
+            tree = Tree(f"[cyan]{self.title}[/cyan]", guide_style="grey50")
+            for step in self._steps.values():
+                tree.add(self._render_line(step))
+            self._tree = tree
+            self._dirty = False
+            return tree
+
+    def __rich__(self):
+        return self.render()
+
+    @staticmethod
+    def _render_line(step: _Step) -> str:
+        label = step.label
+        detail_text = step.detail.strip() if step.detail else ""
+        duration = step.duration
+        if duration is not None and duration >= 0.001:
+            detail_text = f"{detail_text}, {_format_duration(duration)}" if detail_text else _format_duration(duration)
+        symbol = STEP_SYMBOLS.get(step.status, " ")
+
+        if step.status == "pending":
+            # Вся строка светло-серая (pending)
+            if detail_text:
+                return f"{symbol} [bright_black]{label} ({detail_text})[/bright_black]"
+            return f"{symbol} [bright_black]{label}[/bright_black]"
+        # Метка белая, детали (если есть) светло-серые в скобках
+        if detail_text:
+            return f"{symbol} [white]{label}[/white] [bright_black]({detail_text})[/bright_black]"
+        return f"{symbol} [white]{label}[/white]"
+
+PROFILE_TOTAL_KEYS = ("bytes_downloaded", "bytes_written", "files_written")
+
+class Profiler:
+    """Собирает интервалы выполнения (spans) и экспортирует их в формате Chrome trace events.
+
+    Файл открывается в chrome://tracing, Perfetto и speedscope. Вложенность интервалов
+    определяется по времени внутри одного потока.
+    """
 
-            if status == "pending":
-                # Вся строка светло-серая (pending)
-                if detail_text:
-                    line = f"{symbol} [bright_black]{label} ({detail_text})[/bright_black]"
-                else:
-                    line = f"{symbol} [bright_black]{label}[/bright_black]"
-            else:
-                # Метка белая, детали (если есть) светло-серые в скобках
-                if detail_text:
-                    line = f"{symbol} [white]{label}[/white] [bright_black]({detail_text})[/bright_black]"
-                else:
-                    line = f"{symbol} [white]{label}[/white]"
+    def __init__(self):
+        self._origin = time.monotonic()
+        self._events: list[dict] = []
+        self._lock = threading.Lock()
+        self.totals: dict[str, int] = {}
+
+    def add_span(self, name: str, start: float, end: float, *, cat: str = "phase", args: dict | None = None, tid: int | None = None) -> None:
+        event = {
+            "name": name,
+            "cat": cat,
+            "ph": "X",
+            "ts": round((start - self._origin) * 1_000_000),
+            "dur": round((end - start) * 1_000_000),
+            "pid": os.getpid(),
+            "tid": tid if tid is not None else threading.get_native_id(),
+            "args": args or {},
+        }
+        with self._lock:
+            self._events.append(event)
+            for key in PROFILE_TOTAL_KEYS:
+                if isinstance(event["args"].get(key), int):
+                    self.totals[key] = self.totals.get(key, 0) + event["args"][key]
+
+    @contextmanager
+    def span(self, name: str, cat: str = "phase", **args):
+        start = time.monotonic()
+        try:
+            yield args
+        finally:
+            self.add_span(name, start, time.monotonic(), cat=cat, args=args)
+
+    def add_tracker(self, tracker: StepTracker) -> None:
+        """Добавляет завершенные шаги трекера как интервалы категории step."""
+        for step in tracker.steps:
+            if step.duration is not None:
+                self.add_span(step.label, step.started, step.ended, cat="step", args={"key": step.key, "status": step.status, "detail": step.detail})
+
+    def write(self, path: Path, command: str) -> None:
+        with self._lock:
+            events = sorted(self._events, key=lambda e: (e["ts"], -e["dur"]))
+        data = {
+            "traceEvents": events,
+            "displayTimeUnit": "ms",
+            "otherData": {"command": command, **{f"total_{k}": v for k, v in self.totals.items()}},
+        }
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=1)
+            f.write('\n')
+
+_profiler: Profiler | None = None
+
+def start_profile(path: Path | None, *, collect: bool = False) -> None:
+    """Включает сбор интервалов для `--profile` (или только счетчиков при collect, например для --json)."""
+    global _profiler
+    _profiler = Profiler() if path or collect else None
+
+def finish_profile(path: Path | None, command: str, tracker: StepTracker | None = None) -> dict:
+    """Записывает собранные интервалы в файл `--profile`, выключает профайлер и возвращает итоговые счетчики."""
+    global _profiler
+    if _run_record is not None and tracker is not None:
+        _run_record.trackers.append(tracker)
+    if _profiler is None:
+        return {}
+    profiler, _profiler = _profiler, None
+    if path:
+        if tracker:
+            profiler.add_tracker(tracker)
+        try:
+            profiler.write(path, command)
+        except OSError as e:
+            console.print(f"[yellow]Не удалось записать профиль {path}:[/yellow] {e}")
+    return dict(profiler.totals)
+
+def profile_span(name: str, **args):
+    """Интервал активного профайлера (`--profile`); без профайлера - no-op.
+
+    Возвращает контекстный менеджер, отдающий словарь аргументов, в который можно дописать
+    счетчики (bytes_downloaded, bytes_written, files_written) до завершения интервала.
+    """
+    span = nullcontext(args) if _profiler is None else _profiler.span(name, **args)
+    if _run_record is None:
+        return span
+    return _run_record.counted(span)
+
+RATE_LIMIT_MESSAGE = re.compile(r"ограничени\w* скорости|rate limit|статус (?:403|429)\b", re.IGNORECASE)
+
+class RunRecord:
+    """Сводка одного запуска команды для локальной истории запусков (`specify stats`).
 
-            tree.add(line)
-        return tree
+    Собирает счетчики интервалов `profile_span` (даже без `--profile`), длительности шагов
+    StepTracker, попадания в кэши и первую ошибку команды.
+    """
+
+    def __init__(self, command: str):
+        self.command = command
+        self.started_at = time.time()
+        self._origin = time.monotonic()
+        self._lock = threading.Lock()
+        self.totals: dict[str, int] = {}
+        self.cache: dict[str, list[int]] = {}
+        self.trackers: list[StepTracker] = []
+        self.error: tuple[str | None, str] | None = None
+
+    @contextmanager
+    def counted(self, span):
+        with span as args:
+            try:
+                yield args
+            finally:
+                with self._lock:
+                    for key in PROFILE_TOTAL_KEYS:
+                        if isinstance(args.get(key), int):
+                            self.totals[key] = self.totals.get(key, 0) + args[key]
+
+    def cache_lookup(self, name: str, *, hits: int = 0, misses: int = 0) -> None:
+        with self._lock:
+            counts = self.cache.setdefault(name, [0, 0])
+            counts[0] += hits
+            counts[1] += misses
+
+    def fail(self, message: str, stage: str | None = None) -> None:
+        with self._lock:
+            if self.error is None:
+                self.error = (stage, message)
+
+    def failure_cause(self) -> str:
+        """Классифицирует сбой: rate-limit, network (получение релиза и загрузка), extract или error."""
+        stage, message = self.error or (None, "")
+        failed = {step.key for tracker in self.trackers for step in tracker.steps if step.status == "error"}
+        details = " ".join([message] + [step.detail for tracker in self.trackers for step in tracker.steps if step.status == "error"])
+        if RATE_LIMIT_MESSAGE.search(details):
+            return "rate-limit"
+        if stage in ("fetch", "download") or failed & {"fetch", "download"}:
+            return "network"
+        if stage == "extract" or "extract" in failed:
+            return "extract"
+        return "error"
+
+    def row(self, exit_code: int) -> dict:
+        phases = {}
+        for tracker in self.trackers:
+            for step in tracker.steps:
+                if step.duration is not None:
+                    phases[step.key] = round(step.duration, 4)
+        data = {"phases": phases, "totals": self.totals, "cache": self.cache}
+        if exit_code and self.error:
+            data["error"] = (self.error[1].strip().splitlines() or [""])[0][:200]
+        return {
+            "started": self.started_at,
+            "command": self.command,
+            "exit_code": exit_code,
+            "duration": time.monotonic() - self._origin,
+            "cause": self.failure_cause() if exit_code else None,
+            "data": data,
+        }
+
+_run_record: RunRecord | None = None
+
+def record_cache_lookup(name: str, *, hits: int = 0, misses: int = 0) -> None:
+    """Учитывает попадания и промахи кэша `name` в истории текущего запуска."""
+    if _run_record is not None:
+        _run_record.cache_lookup(name, hits=hits, misses=misses)
+
+_json_output = False
+
+def enable_json_output() -> None:
+    """Включает режим --json: баннер, панели и Live не выводятся, события пишутся в stdout по одному JSON на строку."""
+    global _json_output
+    _json_output = True
+    console.quiet = True
+
+def emit_event(event: str, **fields) -> None:
+    """Пишет событие JSON Lines в stdout (только в режиме --json)."""
+    if not _json_output:
+        return
+    record = {"event": event, "time": round(time.time(), 3), **fields}
+    sys.stdout.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+    sys.stdout.flush()
+
+def emit_error(message: str, **fields) -> None:
+    """Событие error; rich-разметка из сообщения удаляется. Первая ошибка запоминается в истории запуска."""
+    plain = Text.from_markup(message).plain
+    if _run_record is not None:
+        _run_record.fail(plain, fields.get("stage"))
+    emit_event("error", message=plain, **fields)
+
+def exit_with_error(message: str, code: int = 1) -> NoReturn:
+    """Печатает ошибку (и событие error в режиме --json) и завершает команду."""
+    console.print(f"[red]Ошибка:[/red] {message}")
+    emit_error(message)
+    raise typer.Exit(code)
+
+def _emit_step_event(step: _Step) -> None:
+    emit_event(
+        "step",
+        key=step.key,
+        label=step.label,
+        status=step.status,
+        detail=step.detail,
+        duration=round(step.duration, 6) if step.duration is not None else None,
+    )
+
+def _print_step_line(step: _Step) -> None:
+    """Построчный вывод перехода шага для не-TTY вывода (CI логи)."""
+    line = f"[{step.status}] {step.label}"
+    if step.detail:
+        line += f": {step.detail.strip()}"
+    if step.duration is not None and step.duration >= 0.001:
+        line += f" ({_format_duration(step.duration)})"
+    console.print(line, markup=False, highlight=False, soft_wrap=True)
+
+@contextmanager
+def live_tracker(tracker: StepTracker):
+    """Отображает ход выполнения трекера.
+
+    В терминале - дерево в `Live`, которое перерисовывается по таймеру и перестраивается
+    только после изменений. Вне TTY - одна строка на каждый переход шага, без кадров перерисовки.
+    """
+    if _json_output:
+        tracker.attach_listener(_emit_step_event)
+        try:
+            yield None
+        finally:
+            tracker.attach_listener(None)
+    elif console.is_terminal:
+        with Live(tracker, console=console, refresh_per_second=8, transient=True) as live:
+            yield live
+    else:
+        tracker.attach_listener(_print_step_line)
+        try:
+            yield None
+        finally:
+            tracker.attach_listener(None)
 
 def get_key():
     """Получает одно нажатие клавиши кроссплатформенным способом используя readchar."""
@@ -445,6 +895,8 @@ app = typer.Typer(
 
 def show_banner():
     """Отображает ASCII арт баннер."""
+    if _json_output:
+        return
     banner_lines = BANNER.strip().split('\n')
     colors = ["bright_blue", "blue", "cyan", "bright_cyan", "white", "bright_white"]
 
@@ -460,7 +912,10 @@ def show_banner():
 @app.callback()
 def callback(ctx: typer.Context):
     """Показывает баннер, когда подкоманда не указана."""
-    if ctx.invoked_subcommand is None and "--help" not in sys.argv and "-h" not in sys.argv:
+    help_requested = "--help" in sys.argv or "-h" in sys.argv
+    if ctx.invoked_subcommand is not None and not help_requested:
+        start_run_record(ctx.invoked_subcommand)
+    if ctx.invoked_subcommand is None and not help_requested:
         show_banner()
         console.print(Align.center("[dim]Запустите 'specify --help' для информации об использовании[/dim]"))
         console.print()
@@ -498,6 +953,8 @@ def check_tool(tool: str, tracker: StepTracker = None) -> bool:
     # Команда migrate-installer УДАЛЯЕТ оригинальный исполняемый файл из PATH
     # и создает алиас в ~/.claude/local/claude
     # Этот путь должен быть приоритетнее других исполняемых файлов claude в PATH
+    if tracker:
+        tracker.start(tool)
     if tool == "claude":
         if CLAUDE_LOCAL_PATH.exists() and CLAUDE_LOCAL_PATH.is_file():
             if tracker:
@@ -534,24 +991,35 @@ def is_git_repo(path: Path = None) -> bool:
     except (subprocess.CalledProcessError, FileNotFoundError):
         return False
 
-def init_git_repo(project_path: Path, quiet: bool = False) -> Tuple[bool, Optional[str]]:
+def init_git_repo(project_path: Path, quiet: bool = False, paths: list[str] | None = None) -> Tuple[bool, Optional[str]]:
     """Инициализирует git репозиторий в указанном пути.
     
+    Команды git выполняются с cwd=project_path, без смены рабочей директории процесса,
+    поэтому функцию можно вызывать параллельно для нескольких проектов.
+
     Args:
         project_path: Путь для инициализации git репозитория
         quiet: если True, подавляет вывод в консоль (трекер обрабатывает статус)
+        paths: пути файлов шаблона относительно project_path; если заданы, в первый коммит
+            попадают только они - одним вызовом `git update-index --stdin`, без сканирования
+            рабочего дерева. Иначе индексируется вся директория (`git add -A`)
     
     Returns:
         Кортеж из (успех: bool, сообщение_об_ошибке: Optional[str])
     """
+    def git(*args: str, stdin: str | None = None):
+        subprocess.run(["git", *args], check=True, capture_output=True, text=True, cwd=project_path, input=stdin)
+
     try:
-        original_cwd = Path.cwd()
-        os.chdir(project_path)
         if not quiet:
             console.print("[cyan]Инициализация git репозитория...[/cyan]")
-        subprocess.run(["git", "init"], check=True, capture_output=True, text=True)
-        subprocess.run(["git", "add", "."], check=True, capture_output=True, text=True)
-        subprocess.run(["git", "commit", "-m", "Initial commit from Specify template"], check=True, capture_output=True, text=True)
+        with profile_span("git-init", files=len(paths) if paths is not None else None):
+            git("init")
+            if paths is None:
+                git("add", "-A")
+            else:
+                git("update-index", "--add", "-z", "--stdin", stdin="".join(f"{p}\0" for p in paths))
+            git("commit", "-m", "Initial commit from Specify template")
         if not quiet:
             console.print("[green]✓[/green] Git репозиторий инициализирован")
         return True, None
@@ -566,8 +1034,6 @@ def init_git_repo(project_path: Path, quiet: bool = False) -> Tuple[bool, Option
         if not quiet:
             console.print(f"[red]Ошибка инициализации git репозитория:[/red] {e}")
         return False, error_msg
-    finally:
-        os.chdir(original_cwd)
 
 def handle_vscode_settings(sub_item, dest_file, rel_path, verbose=False, tracker=None) -> None:
     """Обрабатывает слияние или копирование файлов .vscode/settings.json."""
@@ -581,17 +1047,27 @@ def handle_vscode_settings(sub_item, dest_file, rel_path, verbose=False, tracker
 
         if dest_file.exists():
             merged = merge_json_files(dest_file, new_settings, verbose=verbose and not tracker)
+            dest_file.unlink()
             with open(dest_file, 'w', encoding='utf-8') as f:
                 json.dump(merged, f, indent=4)
                 f.write('\n')
             log("Объединено:", "green")
         else:
-            shutil.copy2(sub_item, dest_file)
+            _replace_file(sub_item, dest_file)
             log("Скопировано (settings.json не существовал):", "blue")
 
     except Exception as e:
         log(f"Предупреждение: Не удалось объединить, копирование вместо этого: {e}", "yellow")
-        shutil.copy2(sub_item, dest_file)
+        _replace_file(sub_item, dest_file)
+
+def _replace_file(src: Path, dest: Path) -> None:
+    """Копирует `src` в `dest`, предварительно удаляя `dest`.
+
+    Файл проекта может быть жесткой ссылкой на общее хранилище шаблонов (`--materialize hardlink`):
+    запись поверх него изменила бы хранилище, а для файла только для чтения завершилась бы ошибкой.
+    """
+    dest.unlink(missing_ok=True)
+    shutil.copy2(src, dest)
 
 def merge_json_files(existing_path: Path, new_content: dict, verbose: bool = False) -> dict:
     """Объединяет новый JSON контент с существующим JSON файлом.
@@ -636,143 +1112,858 @@ def merge_json_files(existing_path: Path, new_content: dict, verbose: bool = Fal
 
     return merged
 
-def download_template_from_github(ai_assistant: str, download_dir: Path, *, script_type: str = "sh", verbose: bool = True, show_progress: bool = True, client: httpx.Client = None, debug: bool = False, github_token: str = None) -> Tuple[Path, dict]:
-    repo_owner = "valeriykorsunov"
-    repo_name = "spec-kit-ru"
-    if client is None:
-        client = httpx.Client(verify=ssl_context)
+MERGE_ACTION_LABELS = {
+    "create": "создать",
+    "overwrite": "перезаписать",
+    "merge": "объединить",
+    "unchanged": "без изменений",
+}
 
-    if verbose:
-        console.print("[cyan]Получение информации о последнем релизе...[/cyan]")
-    api_url = f"https://api.github.com/repos/{repo_owner}/{repo_name}/releases/latest"
+EXTRACT_WORKERS_ENV = "SPECIFY_EXTRACT_WORKERS"
+EXTRACT_MAX_WORKERS = 8
+EXTRACT_PARALLEL_MIN_MEMBERS = 32  # меньше записей - распаковка в одном потоке
+MATERIALIZE_ENV = "SPECIFY_MATERIALIZE"
+MATERIALIZE_MODES = {
+    "copy": "распаковка архива в проект",
+    "reflink": "общее хранилище, reflink (иначе копия)",
+    "hardlink": "общее хранилище, жесткие ссылки для скриптов и шаблонов .specify",
+}
+TEMPLATE_STORE_DIR = Path(platformdirs.user_cache_dir("specify-cli")) / "store"
+TEMPLATE_STORE_MAX_ENTRIES = 8  # столько последних использованных архивов хранится распакованными
+TEMPLATE_HARDLINK_PREFIXES = (".specify/scripts/", ".specify/templates/")  # файлы, которые проект не правит
+MATERIALIZE_COUNT_LABELS = {"reflink": "reflink", "hardlink": "жестких ссылок", "copy": "копий"}
+FICLONE = 0x40049409  # ioctl Linux: файл разделяет блоки данных с исходным (btrfs, XFS, bcachefs)
+
+def _is_vscode_settings(rel_path: Path) -> bool:
+    return rel_path.name == "settings.json" and rel_path.parent.name == ".vscode"
+
+def _file_digest(path: Path) -> bytes:
+    with open(path, 'rb') as f:
+        return hashlib.file_digest(f, "sha256").digest()
+
+def plan_template_merge(source_dir: Path, project_path: Path) -> list[tuple[str, Path]]:
+    """Строит план слияния файлов шаблона с существующей директорией проекта.
+
+    Каждый файл получает действие: create (нет в проекте), overwrite (содержимое отличается),
+    merge (.vscode/settings.json, слияние меняет настройки) или unchanged (совпадает по размеру
+    и хэшу либо слияние ничего не добавляет).
+
+    Returns:
+        Список пар (действие, относительный путь) в порядке обхода шаблона
+    """
+    plan = []
+    for src in sorted(source_dir.rglob('*')):
+        if not src.is_file():
+            continue
+        rel_path = src.relative_to(source_dir)
+        dest = project_path / rel_path
+        if not dest.exists():
+            action = "create"
+        elif _is_vscode_settings(rel_path):
+            try:
+                with open(src, 'r', encoding='utf-8') as f:
+                    new_settings = json.load(f)
+                with open(dest, 'r', encoding='utf-8') as f:
+                    existing_settings = json.load(f)
+                action = "unchanged" if merge_json_files(dest, new_settings) == existing_settings else "merge"
+            except (OSError, json.JSONDecodeError):
+                action = "merge"
+        elif dest.is_file() and dest.stat().st_size == src.stat().st_size and _file_digest(dest) == _file_digest(src):
+            action = "unchanged"
+        else:
+            action = "overwrite"
+        plan.append((action, rel_path))
+    return plan
 
+def apply_template_merge(plan: list[tuple[str, Path]], source_dir: Path, project_path: Path, verbose: bool = False, tracker: StepTracker | None = None, *, workers: int | None = None, materialize: str = "copy") -> dict:
+    """Применяет план из `plan_template_merge`: записывает только новые и измененные файлы.
+
+    Директории создаются заранее, а копирование файлов идет в `workers` потоков
+    (по умолчанию `default_extract_workers()`); слияние settings.json выполняется последовательно.
+    При `materialize` reflink или hardlink файлы создаются через `clone_template_files`
+    (`source_dir` - дерево из общего хранилища шаблонов).
+
+    Returns:
+        Счетчики по действиям
+    """
+    if workers is None:
+        workers = default_extract_workers()
+    counts = dict.fromkeys(MERGE_ACTION_LABELS, 0)
+    copies: list[tuple[Path, Path]] = []
+    with profile_span("merge", workers=workers) as span:
+        for action, rel_path in plan:
+            counts[action] += 1
+        for directory in sorted({(project_path / rel_path).parent for action, rel_path in plan if action != "unchanged"}):
+            directory.mkdir(parents=True, exist_ok=True)
+        for action, rel_path in plan:
+            if action == "unchanged":
+                continue
+            src = source_dir / rel_path
+            dest = project_path / rel_path
+            if action == "merge":
+                handle_vscode_settings(src, dest, rel_path, verbose, tracker)
+            else:
+                if action == "overwrite" and verbose and not tracker:
+                    console.print(f"[yellow]Перезапись файла:[/yellow] {rel_path}")
+                copies.append((src, dest))
+        if materialize != "copy":
+            clone_template_files(
+                [(src, dest, materialize == "hardlink" and dest.relative_to(project_path).as_posix().startswith(TEMPLATE_HARDLINK_PREFIXES)) for src, dest in copies],
+                workers=workers,
+            )
+        elif workers > 1 and len(copies) >= EXTRACT_PARALLEL_MIN_MEMBERS:
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="specify-merge") as pool:
+                list(pool.map(lambda pair: _replace_file(*pair), copies))
+        else:
+            for src, dest in copies:
+                _replace_file(src, dest)
+        span["files_written"] = len(plan) - counts["unchanged"]
+    return counts
+
+def print_merge_plan(plan: list[tuple[str, Path]]) -> None:
+    """Выводит план слияния таблицей и итоговой сводкой по действиям."""
+    styles = {"create": "green", "overwrite": "yellow", "merge": "cyan", "unchanged": "bright_black"}
+    table = Table(show_header=True, header_style="bold", box=None, padding=(0, 2))
+    table.add_column("Действие")
+    table.add_column("Путь")
+    for action in MERGE_ACTION_LABELS:
+        for item_action, rel_path in plan:
+            if item_action == action:
+                table.add_row(f"[{styles[action]}]{MERGE_ACTION_LABELS[action]}[/]", rel_path.as_posix())
+    console.print(table)
+    summary = ", ".join(f"{MERGE_ACTION_LABELS[a]}: {sum(1 for x, _ in plan if x == a)}" for a in MERGE_ACTION_LABELS)
+    console.print(f"\n[bold]Итого:[/bold] {summary}")
+
+def _template_root(extract_dir: Path) -> Path:
+    """Возвращает корень распакованного шаблона, пропуская единственную вложенную директорию."""
+    extracted_items = list(extract_dir.iterdir())
+    if len(extracted_items) == 1 and extracted_items[0].is_dir():
+        return extracted_items[0]
+    return extract_dir
+
+DEFAULT_TEMPLATE_REPO = "valeriykorsunov/spec-kit-ru"
+TEMPLATE_SOURCE_ENV = "SPECIFY_TEMPLATE_SOURCE"
+CONFIG_FILE = Path(platformdirs.user_config_dir("specify-cli")) / "config.json"
+
+def _load_cli_config() -> dict:
+    """Читает пользовательский конфиг CLI (JSON). Отсутствующий или некорректный файл - пустой конфиг."""
     try:
-        response = client.get(
-            api_url,
-            timeout=30,
-            follow_redirects=True,
-            headers=_github_auth_headers(github_token),
-        )
-        status = response.status_code
-        if status != 200:
-            # Форматируем подробное сообщение об ошибке с информацией о лимите
-            error_msg = _format_rate_limit_error(status, response.headers, api_url)
-            if debug:
-                error_msg += f"\n\n[dim]Тело ответа (обрезано 500):[/dim]\n{response.text[:500]}"
-            raise RuntimeError(error_msg)
+        with open(CONFIG_FILE, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError, OSError):
+        return {}
+    return data if isinstance(data, dict) else {}
+
+class TemplateSource:
+    """Источник шаблонов проекта.
+
+    `fetch_release` возвращает метаданные релиза в формате GitHub releases API
+    (`tag_name`, `published_at`, `assets` с `name`, `size`, `browser_download_url`),
+    `fetch_asset` сохраняет выбранный актив в локальный файл.
+
+    HTTP-источники задают `release_url` и получают общую логику: условные запросы
+    по ETag из кэша метаданных релизов, синхронную (с повторами) и асинхронную загрузку.
+    """
+    key = ""  # Стабильный идентификатор источника для кэша метаданных
+    release_url = ""
+
+    def describe(self) -> str:
+        """Короткое описание источника для сообщений `init` и `version`."""
+        return self.release_url or self.key or type(self).__name__
+
+    def request_headers(self, github_token: str = None) -> dict:
+        return {}
+
+    def release_error(self, response: httpx.Response, debug: bool = False) -> str:
+        error_msg = f"Источник шаблонов вернул статус {response.status_code} для {self.release_url}"
+        if debug:
+            error_msg += f"\n\n[dim]Тело ответа (обрезано 500):[/dim]\n{response.text[:500]}"
+        return error_msg
+
+    def parse_release(self, release_data: dict) -> dict:
+        return release_data
+
+    def _conditional_headers(self, github_token: str = None) -> dict:
+        headers = self.request_headers(github_token)
+        cached = load_cached_release(self)
+        if cached and cached.get("etag"):
+            headers["If-None-Match"] = cached["etag"]
+        return headers
+
+    def _finish_release(self, response: httpx.Response, debug: bool = False) -> dict:
+        if response.status_code == 304:
+            cached = load_cached_release(self)
+            if cached:
+                store_cached_release(self, cached["release"], cached.get("etag"))
+                return cached["release"]
+        if response.status_code != 200:
+            raise RuntimeError(self.release_error(response, debug))
         try:
-            release_data = response.json()
+            release_data = self.parse_release(response.json())
         except ValueError as je:
             raise RuntimeError(f"Не удалось распарсить JSON релиза: {je}\nСырые данные (обрезано 400): {response.text[:400]}")
-    except Exception as e:
-        console.print(f"[red]Ошибка при получении информации о релизе[/red]")
-        console.print(Panel(str(e), title="Ошибка получения", border_style="red"))
-        raise typer.Exit(1)
+        store_cached_release(self, release_data, response.headers.get("ETag"))
+        return release_data
+
+    def fetch_release(self, client: httpx.Client, *, github_token: str = None, verbose: bool = False, debug: bool = False, timeout: float = 30, attempts: int = RETRY_MAX_ATTEMPTS) -> dict:
+        response = _get_with_retry(
+            client,
+            self.release_url,
+            timeout=timeout,
+            headers=self._conditional_headers(github_token),
+            verbose=verbose,
+            attempts=attempts,
+        )
+        return self._finish_release(response, debug)
+
+    async def fetch_release_async(self, client: httpx.AsyncClient, *, github_token: str = None, timeout: float = 10) -> dict:
+        response = await client.get(self.release_url, timeout=timeout, follow_redirects=True, headers=self._conditional_headers(github_token))
+        return self._finish_release(response)
+
+    def fetch_asset(self, client: httpx.Client, asset: dict, dest: Path, *, github_token: str = None, show_progress: bool = True, verbose: bool = False, debug: bool = False) -> None:
+        _download_with_resume(
+            client,
+            asset["browser_download_url"],
+            dest,
+            expected_size=asset.get("size", 0),
+            headers=self.request_headers(github_token),
+            show_progress=show_progress,
+            verbose=verbose,
+            debug=debug,
+        )
 
-    assets = release_data.get("assets", [])
+class GitHubReleaseSource(TemplateSource):
+    """Последний релиз репозитория GitHub (по умолчанию - valeriykorsunov/spec-kit-ru)."""
+
+    def __init__(self, repo: str = DEFAULT_TEMPLATE_REPO):
+        self.repo = repo
+        self.key = f"github:{repo}"
+        self.release_url = f"https://api.github.com/repos/{repo}/releases/latest"
+
+    def describe(self) -> str:
+        return f"GitHub {self.repo}"
+
+    def request_headers(self, github_token=None):
+        return _github_auth_headers(github_token)
+
+    def release_error(self, response, debug=False):
+        # Форматируем подробное сообщение об ошибке с информацией о лимите
+        error_msg = _format_rate_limit_error(response.status_code, response.headers, self.release_url)
+        if debug:
+            error_msg += f"\n\n[dim]Тело ответа (обрезано 500):[/dim]\n{response.text[:500]}"
+        return error_msg
+
+class HttpMirrorSource(TemplateSource):
+    """HTTP зеркало: `index.json` в формате релиза GitHub рядом с ZIP-архивами.
+
+    `browser_download_url` (или `url`) активов может быть относительным - он разрешается
+    относительно адреса индекса; при отсутствии используется имя актива.
+    Токен GitHub на зеркало не отправляется.
+    """
+
+    def __init__(self, url: str):
+        self.release_url = url if url.endswith(".json") else url.rstrip("/") + "/index.json"
+        self.key = self.release_url
+
+    def describe(self) -> str:
+        return f"зеркало {self.release_url}"
+
+    def release_error(self, response, debug=False):
+        error_msg = f"Зеркало шаблонов вернуло статус {response.status_code} для {self.release_url}"
+        if debug:
+            error_msg += f"\n\n[dim]Тело ответа (обрезано 500):[/dim]\n{response.text[:500]}"
+        return error_msg
+
+    def parse_release(self, release_data):
+        for asset in release_data.get("assets", []):
+            asset["browser_download_url"] = urljoin(self.release_url, asset.get("browser_download_url") or asset.get("url") or asset["name"])
+        return release_data
+
+class LocalDirectorySource(TemplateSource):
+    """Локальная директория с ZIP-архивами шаблонов.
+
+    Если в ней есть `index.json`, он используется как метаданные релиза;
+    иначе релиз собирается из найденных `*.zip` с версией `local`.
+    Кэш метаданных не используется - чтение директории и так мгновенное.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.key = str(path)
+
+    def describe(self) -> str:
+        return f"директория {self.path}"
+
+    def fetch_release(self, client, *, github_token=None, verbose=False, debug=False, timeout=30, attempts=RETRY_MAX_ATTEMPTS):
+        if not self.path.is_dir():
+            raise RuntimeError(f"Директория шаблонов не найдена: {self.path}")
+        index_file = self.path / "index.json"
+        if index_file.is_file():
+            try:
+                with open(index_file, 'r', encoding='utf-8') as f:
+                    release_data = json.load(f)
+            except json.JSONDecodeError as je:
+                raise RuntimeError(f"Не удалось распарсить {index_file}: {je}")
+        else:
+            release_data = {
+                "tag_name": "local",
+                "published_at": None,
+                "assets": [{"name": p.name} for p in sorted(self.path.glob("*.zip"))],
+            }
+        for asset in release_data.get("assets", []):
+            asset_path = self.path / asset["name"]
+            asset["browser_download_url"] = asset_path.resolve().as_uri()
+            if asset_path.is_file():
+                asset["size"] = asset_path.stat().st_size
+        return release_data
+
+    async def fetch_release_async(self, client, *, github_token=None, timeout=10):
+        return self.fetch_release(None)
+
+    def fetch_asset(self, client, asset, dest, *, github_token=None, show_progress=True, verbose=False, debug=False):
+        shutil.copyfile(self.path / asset["name"], dest)
+
+# Каталоги и формат команд агентов - как в build_variant из .github/workflows/scripts/create-release-packages.sh;
+# при добавлении агента обновляйте оба места
+AGENT_COMMAND_FORMATS = {
+    "claude": (".claude/commands", "md", "$ARGUMENTS"),
+    "gemini": (".gemini/commands", "toml", "{{args}}"),
+    "copilot": (".github/agents", "agent.md", "$ARGUMENTS"),
+    "cursor-agent": (".cursor/commands", "md", "$ARGUMENTS"),
+    "qwen": (".qwen/commands", "toml", "{{args}}"),
+    "opencode": (".opencode/command", "md", "$ARGUMENTS"),
+    "windsurf": (".windsurf/workflows", "md", "$ARGUMENTS"),
+    "codex": (".codex/prompts", "md", "$ARGUMENTS"),
+    "kilocode": (".kilocode/workflows", "md", "$ARGUMENTS"),
+    "auggie": (".augment/commands", "md", "$ARGUMENTS"),
+    "roo": (".roo/commands", "md", "$ARGUMENTS"),
+    "codebuddy": (".codebuddy/commands", "md", "$ARGUMENTS"),
+    "qoder": (".qoder/commands", "md", "$ARGUMENTS"),
+    "amp": (".agents/commands", "md", "$ARGUMENTS"),
+    "shai": (".shai/commands", "md", "$ARGUMENTS"),
+    "q": (".amazonq/prompts", "md", "$ARGUMENTS"),
+    "bob": (".bob/commands", "md", "$ARGUMENTS"),
+}
+AGENT_CONTEXT_FILES = {"gemini": "GEMINI.md", "qwen": "QWEN.md"}
+SCRIPT_VARIANT_DIRS = {"sh": "bash", "ps": "powershell"}
+
+def bundled_assets_root() -> Path | None:
+    """Корень встроенных исходников шаблонов (templates/, scripts/, memory/).
+
+    В колесе они лежат в `specify_cli/assets` (force-include в pyproject.toml); при запуске
+    из исходников используется корень репозитория. None - шаблоны недоступны.
+    """
+    packaged = importlib.resources.files("specify_cli") / "assets"
+    if packaged.is_dir():
+        return Path(str(packaged))
+    repo_root = Path(__file__).resolve().parents[2]
+    if (repo_root / "templates" / "commands").is_dir():
+        return repo_root
+    return None
+
+def _rewrite_paths(text: str) -> str:
+    # rewrite_paths из скрипта сборки релиза
+    for name in ("memory", "scripts", "templates"):
+        text = re.sub(rf"/?{name}/", f".specify/{name}/", text)
+    return text
+
+def render_command(template_text: str, agent: str, script_type: str, arg_format: str) -> tuple[str, str]:
+    """Подставляет заполнители шаблона команды по правилам generate_commands из скрипта сборки релиза.
+
+    {SCRIPT} и {AGENT_SCRIPT} заменяются командами варианта `script_type` из frontmatter,
+    секции scripts/agent_scripts удаляются из frontmatter, {ARGS} заменяется на `arg_format`,
+    __AGENT__ - на имя агента, пути memory/, scripts/, templates/ переводятся в `.specify/`.
+
+    Returns:
+        (description, тело команды без завершающего перевода строки)
+    """
+    content = template_text.replace("\r", "").rstrip("\n")
+    lines = content.split("\n")
+    description = next((line.split(":", 1)[1].strip() for line in lines if line.startswith("description:")), "")
+    variant = re.compile(rf"^\s*{re.escape(script_type)}:\s*")
+    script_command = next((variant.sub("", line) for line in lines if variant.match(line)), "")
+    if not script_command:
+        script_command = f"(Missing script command for {script_type})"
+    agent_script_command = ""
+    in_agent_scripts = False
+    for line in lines:
+        if line == "agent_scripts:":
+            in_agent_scripts = True
+        elif in_agent_scripts and variant.match(line):
+            agent_script_command = variant.sub("", line)
+            break
+        elif in_agent_scripts and re.match(r"^[a-zA-Z]", line):
+            in_agent_scripts = False
+
+    body = content.replace("{SCRIPT}", script_command)
+    if agent_script_command:
+        body = body.replace("{AGENT_SCRIPT}", agent_script_command)
+
+    kept = []
+    dashes = 0
+    in_frontmatter = skip_scripts = False
+    for line in body.split("\n"):
+        if line == "---":
+            dashes += 1
+            in_frontmatter = dashes == 1
+            kept.append(line)
+            continue
+        if in_frontmatter and line in ("scripts:", "agent_scripts:"):
+            skip_scripts = True
+            continue
+        if in_frontmatter and skip_scripts and re.match(r"^[a-zA-Z].*:", line):
+            skip_scripts = False
+        if in_frontmatter and skip_scripts and re.match(r"^\s", line):
+            continue
+        kept.append(line)
+    body = "\n".join(kept).replace("{ARGS}", arg_format).replace("__AGENT__", agent)
+    return description, _rewrite_paths(body)
+
+def render_template_files(assets_root: Path, ai_assistant: str, script_type: str) -> dict[str, bytes]:
+    """Собирает файлы шаблона проекта для агента и типа скриптов так же, как build_variant при сборке релиза.
+
+    Returns:
+        Словарь {относительный путь: содержимое}.
+    """
+    if ai_assistant not in AGENT_COMMAND_FORMATS:
+        raise ValueError(f"Нет правил сборки команд для агента '{ai_assistant}'")
+    if script_type not in SCRIPT_VARIANT_DIRS:
+        raise ValueError(f"Неверный тип скрипта '{script_type}'")
+    files: dict[str, bytes] = {}
+
+    def add_tree(src: Path, dest_prefix: str, skip=lambda rel: False) -> None:
+        if not src.is_dir():
+            return
+        for path in sorted(src.rglob("*")):
+            rel = path.relative_to(src).as_posix()
+            if path.is_file() and not skip(rel):
+                files[f"{dest_prefix}/{rel}"] = path.read_bytes()
+
+    add_tree(assets_root / "memory", ".specify/memory")
+    scripts_dir = assets_root / "scripts"
+    variant_dir = SCRIPT_VARIANT_DIRS[script_type]
+    add_tree(scripts_dir / variant_dir, f".specify/scripts/{variant_dir}")
+    if scripts_dir.is_dir():
+        for path in sorted(scripts_dir.iterdir()):
+            if path.is_file():
+                files[f".specify/scripts/{path.name}"] = path.read_bytes()
+    add_tree(assets_root / "templates", ".specify/templates", skip=lambda rel: rel.startswith("commands/") or rel.endswith("vscode-settings.json"))
+
+    commands_dir, ext, arg_format = AGENT_COMMAND_FORMATS[ai_assistant]
+    for template in sorted((assets_root / "templates" / "commands").glob("*.md")):
+        description, body = render_command(template.read_text(encoding="utf-8"), ai_assistant, script_type, arg_format)
+        if ext == "toml":
+            body = body.replace("\\", "\\\\")
+            text = f'description = "{description}"\n\nprompt = """\n{body}\n"""\n'
+        else:
+            text = f"{body}\n"
+        files[f"{commands_dir}/speckit.{template.stem}.{ext}"] = text.encode("utf-8")
+        if ai_assistant == "copilot":
+            files[f".github/prompts/speckit.{template.stem}.prompt.md"] = f"---\nagent: speckit.{template.stem}\n---\n".encode("utf-8")
+
+    if ai_assistant == "copilot" and (assets_root / "templates" / "vscode-settings.json").is_file():
+        files[".vscode/settings.json"] = (assets_root / "templates" / "vscode-settings.json").read_bytes()
+    context_file = AGENT_CONTEXT_FILES.get(ai_assistant)
+    if context_file and (assets_root / "agent_templates" / ai_assistant / context_file).is_file():
+        files[context_file] = (assets_root / "agent_templates" / ai_assistant / context_file).read_bytes()
+    return files
+
+class BundledTemplateSource(TemplateSource):
+    """Шаблоны, встроенные в установленный пакет specify-cli: архивы собираются локально без сети.
+
+    Версия релиза совпадает с версией CLI, метаданные не кэшируются.
+    """
+
+    key = "bundled"
+
+    def __init__(self):
+        try:
+            self.version = importlib.metadata.version("specify-cli")
+        except importlib.metadata.PackageNotFoundError:
+            self.version = "0.0.0"
+
+    def describe(self) -> str:
+        return f"встроенные шаблоны specify-cli {self.version}"
+
+    def fetch_release(self, client, *, github_token=None, verbose=False, debug=False, timeout=30, attempts=RETRY_MAX_ATTEMPTS):
+        assets_root = bundled_assets_root()
+        if assets_root is None:
+            raise RuntimeError("Встроенные шаблоны не найдены в установленном пакете specify-cli")
+        return {
+            "tag_name": f"v{self.version}",
+            "published_at": None,
+            "assets": [
+                {"name": f"spec-kit-template-{agent}-{script}-v{self.version}.zip", "agent": agent, "script": script,
+                 "browser_download_url": assets_root.as_uri(), "size": 0}
+                for agent in AGENT_COMMAND_FORMATS
+                for script in SCRIPT_VARIANT_DIRS
+            ],
+        }
+
+    async def fetch_release_async(self, client, *, github_token=None, timeout=10):
+        return self.fetch_release(None)
+
+    def fetch_asset(self, client, asset, dest, *, github_token=None, show_progress=True, verbose=False, debug=False):
+        files = render_template_files(bundled_assets_root(), asset["agent"], asset["script"])
+        with zipfile.ZipFile(dest, "w", zipfile.ZIP_STORED) as zip_out:
+            for rel_path, data in files.items():
+                zip_out.writestr(rel_path, data)
+
+def _parse_template_source(spec: str) -> TemplateSource:
+    if spec == "bundled":
+        return BundledTemplateSource()
+    if spec.startswith("github:"):
+        repo = spec[len("github:"):].strip("/")
+        if repo.count("/") != 1:
+            raise ValueError(f"Ожидается github:owner/repo, получено '{spec}'")
+        return GitHubReleaseSource(repo)
+    if spec.startswith(("http://", "https://")):
+        return HttpMirrorSource(spec)
+    if spec.startswith("file://"):
+        return LocalDirectorySource(Path(url2pathname(urlparse(spec).path)))
+    path = Path(spec).expanduser()
+    if path.is_dir():
+        return LocalDirectorySource(path.resolve())
+    raise ValueError(f"Неизвестный источник шаблонов '{spec}'. Используйте github:owner/repo, URL зеркала, путь к директории или bundled")
+
+def resolve_template_sources() -> list[TemplateSource]:
+    """Возвращает все настроенные источники шаблонов, основной - первым.
+
+    Порядок поиска: переменная окружения SPECIFY_TEMPLATE_SOURCE (несколько значений через запятую),
+    ключ `template_source` в конфиге CLI (строка или список), затем GitHub по умолчанию.
+    """
+    raw = os.getenv(TEMPLATE_SOURCE_ENV)
+    if raw:
+        specs = raw.split(",")
+    else:
+        configured = _load_cli_config().get("template_source") or []
+        specs = [configured] if isinstance(configured, str) else list(configured)
+    specs = [spec.strip() for spec in specs if spec and spec.strip()]
+    if not specs:
+        return [GitHubReleaseSource()]
+    return [_parse_template_source(spec) for spec in specs]
+
+def resolve_template_source(spec: str | None = None) -> TemplateSource:
+    """Создает источник шаблонов по строке спецификации или возвращает основной настроенный.
+
+    Форматы: `github:owner/repo`, `http(s)://зеркало/[index.json]`, `file:///путь` или путь к директории.
+    """
+    if spec and spec.strip():
+        return _parse_template_source(spec.strip())
+    return resolve_template_sources()[0]
+
+RELEASE_CACHE_FILE = Path(platformdirs.user_cache_dir("specify-cli")) / "releases.json"
+RELEASE_CACHE_TTL = 3600  # секунды, после которых `version` обновляет метаданные в фоне
+PREFETCH_ASSET_WAIT = 30.0  # секунды ожидания фоновой загрузки архива; дольше - загрузка заново с прогрессом
+VERSION_FETCH_TIMEOUT = 3  # секунды на сетевой запрос `version` при пустом кэше
+
+def _read_release_cache() -> dict:
+    try:
+        with open(RELEASE_CACHE_FILE, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError, OSError):
+        return {}
+    return data if isinstance(data, dict) else {}
+
+def load_cached_release(source: TemplateSource) -> dict | None:
+    """Возвращает запись кэша метаданных релиза источника: release, etag, fetched_at."""
+    entry = _read_release_cache().get(source.key)
+    return entry if isinstance(entry, dict) and "release" in entry else None
+
+def _atomic_tmp_path(path: Path) -> Path:
+    """Временный файл рядом с `path` для атомарной замены; имя уникально для процесса и потока,
+    так как одни и те же файлы могут одновременно записывать фоновые потоки (предзагрузка релиза)."""
+    return path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+
+def store_cached_release(source: TemplateSource, release_data: dict, etag: str | None = None) -> None:
+    """Сохраняет метаданные релиза в общий кэш `init`/`version` (атомарная замена файла)."""
+    if not source.key or isinstance(source, LocalDirectorySource):
+        return
+    cache = _read_release_cache()
+    cache[source.key] = {"release": release_data, "etag": etag, "fetched_at": time.time()}
+    try:
+        RELEASE_CACHE_FILE.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = _atomic_tmp_path(RELEASE_CACHE_FILE)
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(cache, f, ensure_ascii=False)
+        tmp_path.replace(RELEASE_CACHE_FILE)
+    except OSError:
+        pass
+
+async def _fetch_releases_async(sources: list[TemplateSource], *, timeout: float, github_token: str = None) -> list:
+    async with httpx.AsyncClient(verify=ssl_context) as aclient:
+        return await asyncio.gather(
+            *(source.fetch_release_async(aclient, github_token=github_token, timeout=timeout) for source in sources),
+            return_exceptions=True,
+        )
+
+def refresh_release_cache(sources: list[TemplateSource] | None = None, *, timeout: float = 10, github_token: str = None) -> list:
+    """Параллельно запрашивает метаданные последних релизов всех источников и обновляет кэш.
+
+    Returns:
+        Для каждого источника - словарь релиза или исключение
+    """
+    if sources is None:
+        sources = resolve_template_sources()
+    return asyncio.run(_fetch_releases_async(sources, timeout=timeout, github_token=github_token))
+
+def _spawn_background_refresh() -> None:
+    """Запускает обновление кэша релизов в отдельном процессе, не дожидаясь его завершения."""
+    try:
+        subprocess.Popen(
+            [sys.executable, "-c", "from specify_cli import refresh_release_cache; refresh_release_cache()"],
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            start_new_session=True,
+        )
+    except OSError:
+        pass
+
+def _find_template_asset(release_data: dict, ai_assistant: str, script_type: str) -> dict | None:
     pattern = f"spec-kit-template-{ai_assistant}-{script_type}"
-    matching_assets = [
-        asset for asset in assets
+    return next((
+        asset for asset in release_data.get("assets", [])
         if pattern in asset["name"] and asset["name"].endswith(".zip")
-    ]
+    ), None)
 
-    asset = matching_assets[0] if matching_assets else None
+def _match_template_asset(release_data: dict, ai_assistant: str, script_type: str) -> dict:
+    asset = _find_template_asset(release_data, ai_assistant, script_type)
+    if asset is not None:
+        return asset
 
-    if asset is None:
-        console.print(f"[red]Не найден подходящий актив релиза[/red] для [bold]{ai_assistant}[/bold] (ожидаемый шаблон: [bold]{pattern}[/bold])")
-        asset_names = [a.get('name', '?') for a in assets]
-        console.print(Panel("\n".join(asset_names) or "(нет активов)", title="Доступные активы", border_style="yellow"))
-        raise typer.Exit(1)
+    assets = release_data.get("assets", [])
+    pattern = f"spec-kit-template-{ai_assistant}-{script_type}"
+    console.print(f"[red]Не найден подходящий актив релиза[/red] для [bold]{ai_assistant}[/bold] (ожидаемый шаблон: [bold]{pattern}[/bold])")
+    asset_names = [a.get('name', '?') for a in assets]
+    console.print(Panel("\n".join(asset_names) or "(нет активов)", title="Доступные активы", border_style="yellow"))
+    emit_error(f"Не найден подходящий актив релиза для {ai_assistant} (ожидаемый шаблон: {pattern})", stage="fetch", assets=asset_names)
+    raise typer.Exit(1)
+
+class ReleasePrefetch:
+    """Спекулятивная загрузка шаблона, пока `init` ждет ответов пользователя.
+
+    Метаданные последнего релиза запрашиваются сразу после `start()`, а архивы - как только
+    известны агенты и тип скрипта (`request_assets`). Загрузка идет в фоновых daemon-потоках
+    со своим HTTP-клиентом и без вывода в консоль; при любой ошибке `download_templates`
+    просто повторяет запрос сам и показывает ошибку как обычно. `close()` (также вызывается
+    при выходе из процесса, например при отказе в подтверждении) прерывает незавершенные
+    загрузки и удаляет временные файлы.
+    """
+
+    def __init__(self, source: TemplateSource, *, verify=True, github_token: str = None):
+        self.source = source
+        self._github_token = github_token
+        self._client = httpx.Client(verify=verify)
+        self._dir = Path(tempfile.mkdtemp(prefix="specify-prefetch-"))
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+        self._release_done = threading.Event()
+        self._release: dict | None = None
+        self._assets: dict[tuple[str, str], dict] = {}
+
+    def start(self) -> "ReleasePrefetch":
+        atexit.register(self.close)
+        self._spawn(self._fetch_release)
+        return self
+
+    def _spawn(self, target, *args) -> None:
+        threading.Thread(target=target, args=args, name="specify-prefetch", daemon=True).start()
+
+    def _fetch_release(self) -> None:
+        try:
+            # Одна попытка: повторы с паузами и сообщения об ошибках - забота основного потока
+            self._release = self.source.fetch_release(self._client, github_token=self._github_token, attempts=1)
+        except Exception:
+            self._release = None
+        finally:
+            self._release_done.set()
+
+    def request_assets(self, ai_assistants: list[str], script_type: str) -> None:
+        """Начинает загрузку архивов агентов, как только будет получен релиз."""
+        for ai in ai_assistants:
+            with self._lock:
+                if self._closed.is_set() or (ai, script_type) in self._assets:
+                    continue
+                entry = self._assets[(ai, script_type)] = {"done": threading.Event(), "name": None, "path": None, "abandoned": False}
+            self._spawn(self._fetch_asset, ai, script_type, entry)
+
+    def _fetch_asset(self, ai: str, script_type: str, entry: dict) -> None:
+        try:
+            self._release_done.wait()
+            asset = _find_template_asset(self._release, ai, script_type) if self._release else None
+            if asset is None or self._closed.is_set():
+                return
+            dest = self._dir / asset["name"]
+            self.source.fetch_asset(self._client, asset, dest, github_token=self._github_token, show_progress=False)
+            with self._lock:
+                if entry["abandoned"]:
+                    # Основной поток не дождался и уже скачал архив сам
+                    dest.unlink(missing_ok=True)
+                    return
+                entry["name"], entry["path"] = asset["name"], dest
+        except Exception:
+            pass
+        finally:
+            entry["done"].set()
+
+    def release(self) -> dict | None:
+        """Ждет фоновый запрос релиза; None, если он не удался."""
+        self._release_done.wait()
+        return self._release
+
+    def take_asset(self, ai: str, script_type: str, asset: dict, dest: Path) -> bool:
+        """Ждет фоновую загрузку архива `asset` не дольше PREFETCH_ASSET_WAIT и переносит его в `dest`.
+
+        Возвращает False, если архива нет. Если загрузка не успела, от нее отказываются (только
+        для этого архива: остальные предзагрузки и общий клиент не трогаются), и архив скачивается
+        заново в основном потоке с видимым прогрессом. Зависшую загрузку прерывает `close()`.
+        """
+        with self._lock:
+            entry = self._assets.get((ai, script_type))
+        if entry is None:
+            return False
+        if not entry["done"].wait(PREFETCH_ASSET_WAIT):
+            with self._lock:
+                if entry["name"] is None:
+                    entry["abandoned"] = True
+                    return False
+        # Перенос под блокировкой: close() не удалит временную директорию посреди перемещения
+        with self._lock:
+            if entry["name"] != asset["name"] or self._closed.is_set():
+                return False
+            shutil.move(entry["path"], dest)
+        return True
 
-    download_url = asset["browser_download_url"]
-    filename = asset["name"]
-    file_size = asset["size"]
+    def close(self) -> None:
+        with self._lock:
+            if self._closed.is_set():
+                return
+            self._closed.set()
+        atexit.unregister(self.close)
+        self._client.close()
+        shutil.rmtree(self._dir, ignore_errors=True)
+
+def download_templates(ai_assistants: list[str], download_dir: Path, *, script_type: str = "sh", verbose: bool = True, show_progress: bool = True, client: httpx.Client = None, debug: bool = False, github_token: str = None, source: TemplateSource | None = None, prefetch: ReleasePrefetch | None = None) -> list[Tuple[Path, dict]]:
+    """Скачивает шаблоны для нескольких агентов по одному ответу о последнем релизе.
+
+    Активы всех агентов находятся в одном релизе и скачиваются параллельно; полосы прогресса
+    показываются только при загрузке одного актива. Возвращает пары (путь к ZIP, метаданные)
+    в порядке `ai_assistants`. Релиз и архивы, уже полученные `prefetch` того же источника,
+    повторно не запрашиваются.
+    """
+    if source is None:
+        source = resolve_template_source()
+    if client is None:
+        client = httpx.Client(verify=ssl_context)
 
     if verbose:
-        console.print(f"[cyan]Найден шаблон:[/cyan] {filename}")
-        console.print(f"[cyan]Размер:[/cyan] {file_size:,} байт")
-        console.print(f"[cyan]Релиз:[/cyan] {release_data['tag_name']}")
+        console.print(f"[cyan]Получение информации о последнем релизе ({source.describe()})...[/cyan]")
+
+    if prefetch is not None and prefetch.source is not source:
+        prefetch = None
+
+    try:
+        with profile_span("release-lookup", source=source.describe(), prefetched=prefetch is not None):
+            release_data = prefetch.release() if prefetch else None
+            if release_data is None:
+                release_data = source.fetch_release(client, github_token=github_token, verbose=verbose, debug=debug)
+    except Exception as e:
+        console.print(f"[red]Ошибка при получении информации о релизе[/red]")
+        console.print(Panel(str(e), title="Ошибка получения", border_style="red"))
+        emit_error(str(e), stage="fetch")
+        raise typer.Exit(1)
+
+    assets = [_match_template_asset(release_data, ai, script_type) for ai in ai_assistants]
 
-    zip_path = download_dir / filename
     if verbose:
+        for asset in assets:
+            console.print(f"[cyan]Найден шаблон:[/cyan] {asset['name']}")
+            console.print(f"[cyan]Размер:[/cyan] {asset.get('size', 0):,} байт")
+        console.print(f"[cyan]Релиз:[/cyan] {release_data['tag_name']}")
         console.print(f"[cyan]Загрузка шаблона...[/cyan]")
 
+    def fetch(ai: str, asset: dict) -> Tuple[Path, dict]:
+        zip_path = download_dir / asset["name"]
+        prefetched = prefetch.take_asset(ai, script_type, asset, zip_path) if prefetch else False
+        record_cache_lookup("prefetch", hits=int(prefetched), misses=int(not prefetched))
+        with profile_span("download", asset=asset["name"], prefetched=prefetched) as span:
+            if not prefetched:
+                source.fetch_asset(client, asset, zip_path, github_token=github_token, show_progress=show_progress and len(assets) == 1, verbose=verbose, debug=debug)
+            span["bytes_downloaded"] = zip_path.stat().st_size
+        if verbose:
+            console.print(f"Загружено: {asset['name']}")
+        return zip_path, {
+            "filename": asset["name"],
+            "size": asset.get("size", 0) or zip_path.stat().st_size,
+            "release": release_data["tag_name"],
+            "asset_url": asset["browser_download_url"],
+            "prefetched": prefetched,
+        }
+
     try:
-        with client.stream(
-            "GET",
-            download_url,
-            timeout=60,
-            follow_redirects=True,
-            headers=_github_auth_headers(github_token),
-        ) as response:
-            if response.status_code != 200:
-                # Обработка ограничения скорости при загрузке
-                error_msg = _format_rate_limit_error(response.status_code, response.headers, download_url)
-                if debug:
-                    error_msg += f"\n\n[dim]Тело ответа (обрезано 400):[/dim]\n{response.text[:400]}"
-                raise RuntimeError(error_msg)
-            total_size = int(response.headers.get('content-length', 0))
-            with open(zip_path, 'wb') as f:
-                if total_size == 0:
-                    for chunk in response.iter_bytes(chunk_size=8192):
-                        f.write(chunk)
-                else:
-                    if show_progress:
-                        with Progress(
-                            SpinnerColumn(),
-                            TextColumn("[progress.description]{task.description}"),
-                            TextColumn("[progress.percentage]{task.percentage:>3.0f}%"),
-                            console=console,
-                        ) as progress:
-                            task = progress.add_task("Загрузка...", total=total_size)
-                            downloaded = 0
-                            for chunk in response.iter_bytes(chunk_size=8192):
-                                f.write(chunk)
-                                downloaded += len(chunk)
-                                progress.update(task, completed=downloaded)
-                    else:
-                        for chunk in response.iter_bytes(chunk_size=8192):
-                            f.write(chunk)
+        if len(assets) == 1:
+            return [fetch(ai_assistants[0], assets[0])]
+        with ThreadPoolExecutor(max_workers=len(assets)) as pool:
+            return list(pool.map(fetch, ai_assistants, assets))
     except Exception as e:
         console.print(f"[red]Ошибка загрузки шаблона[/red]")
         detail = str(e)
-        if zip_path.exists():
-            zip_path.unlink()
+        for asset in assets:
+            zip_path = download_dir / asset["name"]
+            zip_path.unlink(missing_ok=True)
+            zip_path.with_name(zip_path.name + ".part").unlink(missing_ok=True)
         console.print(Panel(detail, title="Ошибка загрузки", border_style="red"))
+        emit_error(detail, stage="download")
         raise typer.Exit(1)
-    if verbose:
-        console.print(f"Загружено: {filename}")
-    metadata = {
-        "filename": filename,
-        "size": file_size,
-        "release": release_data["tag_name"],
-        "asset_url": download_url
-    }
-    return zip_path, metadata
 
-def download_and_extract_template(project_path: Path, ai_assistant: str, script_type: str, is_current_dir: bool = False, *, verbose: bool = True, tracker: StepTracker | None = None, client: httpx.Client = None, debug: bool = False, github_token: str = None) -> Path:
+def download_template_from_github(ai_assistant: str, download_dir: Path, *, script_type: str = "sh", verbose: bool = True, show_progress: bool = True, client: httpx.Client = None, debug: bool = False, github_token: str = None, source: TemplateSource | None = None) -> Tuple[Path, dict]:
+    return download_templates([ai_assistant], download_dir, script_type=script_type, verbose=verbose, show_progress=show_progress, client=client, debug=debug, github_token=github_token, source=source)[0]
+
+def download_and_extract_template(project_path: Path, ai_assistant: str, script_type: str, is_current_dir: bool = False, *, verbose: bool = True, tracker: StepTracker | None = None, client: httpx.Client = None, debug: bool = False, github_token: str = None, source: TemplateSource | None = None, installed_files: list[str] | None = None, extra_agents: list[str] | None = None, extract_workers: int | None = None, prefetch: ReleasePrefetch | None = None, materialize: str = "copy") -> Path:
     """Скачивает последний релиз и распаковывает его для создания нового проекта.
-    Возвращает project_path. Использует трекер если предоставлен (ключи: fetch, download, extract, cleanup)
+    Возвращает project_path. Использует трекер если предоставлен (ключи: fetch, download, extract, cleanup).
+    Если передан список installed_files, в него добавляются пути всех файлов шаблона относительно project_path.
+    Шаблоны `extra_agents` скачиваются параллельно из того же релиза; из них добавляются только файлы
+    агентов, общий `.specify/` берется из шаблона `ai_assistant`.
+    `extract_workers` - число потоков распаковки и копирования (по умолчанию `default_extract_workers()`).
+    `prefetch` - фоновая загрузка, начатая заранее (см. `ReleasePrefetch`).
+    `materialize` - режим из MATERIALIZE_MODES: reflink и hardlink распаковывают архив один раз
+    в общее хранилище (`template_store_entry`) и создают файлы проекта из него.
     """
     current_dir = Path.cwd()
+    if extract_workers is None:
+        extract_workers = default_extract_workers()
+    if source is None:
+        source = resolve_template_source()
 
     if tracker:
-        tracker.start("fetch", "соединение с GitHub API")
+        tracker.start("fetch", f"соединение: {source.describe()}")
     try:
-        zip_path, meta = download_template_from_github(
-            ai_assistant,
+        downloads = download_templates(
+            [ai_assistant, *(extra_agents or [])],
             current_dir,
             script_type=script_type,
             verbose=verbose and tracker is None,
             show_progress=(tracker is None),
             client=client,
             debug=debug,
-            github_token=github_token
+            github_token=github_token,
+            source=source,
+            prefetch=prefetch,
         )
+        zip_path, meta = downloads[0]
+        extra_zips = [path for path, _ in downloads[1:]]
+        for _, asset_meta in downloads:
+            emit_event("release", source=source.describe(), release=asset_meta["release"], asset=asset_meta["filename"], size=asset_meta["size"])
         if tracker:
-            tracker.complete("fetch", f"релиз {meta['release']} ({meta['size']:,} байт)")
+            total_size = sum(asset_meta["size"] for _, asset_meta in downloads)
+            tracker.complete("fetch", f"релиз {meta['release']} ({total_size:,} байт)")
             tracker.add("download", "Загрузка шаблона")
-            tracker.complete("download", meta['filename'])
+            download_detail = ", ".join(asset_meta["filename"] for _, asset_meta in downloads)
+            if all(asset_meta["prefetched"] for _, asset_meta in downloads):
+                download_detail += " (загружен заранее)"
+            tracker.complete("download", download_detail)
     except Exception as e:
         if tracker:
             tracker.error("fetch", str(e))
@@ -787,89 +1978,111 @@ def download_and_extract_template(project_path: Path, ai_assistant: str, script_
     elif verbose:
         console.print("Распаковка шаблона...")
 
+    # BOM нужен Windows PowerShell 5.1 для корректного чтения UTF-8 скриптов
+    add_ps_bom = os.name == "nt" and script_type == "ps"
+    extract_detail = ""
+
     try:
         if not is_current_dir:
             project_path.mkdir(parents=True)
 
-        with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-            zip_contents = zip_ref.namelist()
+        def merge_into_project(source_dir: Path, materialize: str = "copy") -> None:
+            plan = plan_template_merge(source_dir, project_path)
+            if installed_files is not None:
+                installed_files.extend(rel_path.as_posix() for _, rel_path in plan)
+            counts = apply_template_merge(plan, source_dir, project_path, verbose, tracker, workers=extract_workers, materialize=materialize)
+            merge_detail = ", ".join(f"{MERGE_ACTION_LABELS[a]}: {n}" for a, n in counts.items() if n)
             if tracker:
-                tracker.start("zip-list")
-                tracker.complete("zip-list", f"{len(zip_contents)} записей")
+                tracker.add("merge", "Слияние с текущей директорией")
+                tracker.complete("merge", merge_detail)
             elif verbose:
-                console.print(f"[cyan]ZIP содержит {len(zip_contents)} элементов[/cyan]")
+                console.print(f"[cyan]Файлы шаблона объединены с текущей директорией[/cyan] ({merge_detail})")
 
+        if materialize != "copy":
+            zip_paths = [zip_path, *extra_zips]
             if is_current_dir:
-                with tempfile.TemporaryDirectory() as temp_dir:
-                    temp_path = Path(temp_dir)
-                    zip_ref.extractall(temp_path)
+                TEMPLATE_STORE_DIR.mkdir(parents=True, exist_ok=True)
+                # Временное дерево слияния - жесткие ссылки на хранилище в той же файловой системе
+                with tempfile.TemporaryDirectory(prefix="merge.", dir=TEMPLATE_STORE_DIR) as temp_dir:
+                    extract_stats = materialize_template(zip_paths, Path(temp_dir), mode=materialize, add_ps_bom=add_ps_bom, workers=extract_workers, link_all=True)
+                    merge_into_project(Path(temp_dir), materialize)
+                extract_detail = "из общего хранилища"
+            else:
+                extract_stats = materialize_template(zip_paths, project_path, mode=materialize, add_ps_bom=add_ps_bom, workers=extract_workers)
+                if installed_files is not None:
+                    installed_files.extend(extract_stats["files"])
+                extract_detail = ", ".join(f"{label}: {extract_stats[key]}" for key, label in MATERIALIZE_COUNT_LABELS.items() if extract_stats[key])
+            if tracker:
+                tracker.skip("zip-list", "общее хранилище")
+                tracker.start("extracted-summary")
+                tracker.complete("extracted-summary", f"{len(extract_stats['files'])} файлов ({MATERIALIZE_MODES[materialize]})")
+            elif verbose:
+                console.print(f"[cyan]Файлы шаблона созданы из общего хранилища:[/cyan] {extract_detail}")
+        else:
+            with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+                zip_contents = zip_ref.namelist()
+                if tracker:
+                    tracker.start("zip-list")
+                    tracker.complete("zip-list", f"{len(zip_contents)} записей")
+                elif verbose:
+                    console.print(f"[cyan]ZIP содержит {len(zip_contents)} элементов[/cyan]")
+
+                if is_current_dir:
+                    with tempfile.TemporaryDirectory() as temp_dir:
+                        temp_path = Path(temp_dir)
+                        extract_stats = extract_template_zip(zip_ref, temp_path, add_ps_bom=add_ps_bom, workers=extract_workers)
+
+                        extracted_items = list(temp_path.iterdir())
+                        if tracker:
+                            tracker.start("extracted-summary")
+                            tracker.complete("extracted-summary", f"temp {len(extracted_items)} элементов")
+                        elif verbose:
+                            console.print(f"[cyan]Распаковано {len(extracted_items)} элементов во временную директорию[/cyan]")
+
+                        source_dir = _template_root(temp_path)
+                        if source_dir != temp_path:
+                            if tracker:
+                                tracker.add("flatten", "Выравнивание вложенной структуры")
+                                tracker.complete("flatten")
+                            elif verbose:
+                                console.print(f"[cyan]Найдена вложенная структура директорий[/cyan]")
+                        _extract_extra_agents(extra_zips, source_dir, add_ps_bom=add_ps_bom, tracker=tracker, verbose=verbose, workers=extract_workers)
+
+                        merge_into_project(source_dir)
+                else:
+                    extract_stats = extract_template_zip(zip_ref, project_path, add_ps_bom=add_ps_bom, workers=extract_workers)
 
-                    extracted_items = list(temp_path.iterdir())
+                    extracted_items = list(project_path.iterdir())
                     if tracker:
                         tracker.start("extracted-summary")
-                        tracker.complete("extracted-summary", f"temp {len(extracted_items)} элементов")
+                        tracker.complete("extracted-summary", f"{len(extracted_items)} элементов верхнего уровня")
                     elif verbose:
-                        console.print(f"[cyan]Распаковано {len(extracted_items)} элементов во временную директорию[/cyan]")
+                        console.print(f"[cyan]Распаковано {len(extracted_items)} элементов в {project_path}:[/cyan]")
+                        for item in extracted_items:
+                            console.print(f"  - {item.name} ({'папка' if item.is_dir() else 'файл'})")
+
+                    if installed_files is not None:
+                        nested_prefix = f"{extracted_items[0].name}/" if len(extracted_items) == 1 and extracted_items[0].is_dir() else ""
+                        installed_files.extend(f[len(nested_prefix):] for f in extract_stats["files"])
 
-                    source_dir = temp_path
                     if len(extracted_items) == 1 and extracted_items[0].is_dir():
-                        source_dir = extracted_items[0]
+                        nested_dir = extracted_items[0]
+                        temp_move_dir = project_path.parent / f"{project_path.name}_temp"
+
+                        shutil.move(str(nested_dir), str(temp_move_dir))
+
+                        project_path.rmdir()
+
+                        shutil.move(str(temp_move_dir), str(project_path))
                         if tracker:
                             tracker.add("flatten", "Выравнивание вложенной структуры")
                             tracker.complete("flatten")
                         elif verbose:
-                            console.print(f"[cyan]Найдена вложенная структура директорий[/cyan]")
-
-                    for item in source_dir.iterdir():
-                        dest_path = project_path / item.name
-                        if item.is_dir():
-                            if dest_path.exists():
-                                if verbose and not tracker:
-                                    console.print(f"[yellow]Слияние директории:[/yellow] {item.name}")
-                                for sub_item in item.rglob('*'):
-                                    if sub_item.is_file():
-                                        rel_path = sub_item.relative_to(item)
-                                        dest_file = dest_path / rel_path
-                                        dest_file.parent.mkdir(parents=True, exist_ok=True)
-                                        # Специальная обработка для .vscode/settings.json - слияние вместо перезаписи
-                                        if dest_file.name == "settings.json" and dest_file.parent.name == ".vscode":
-                                            handle_vscode_settings(sub_item, dest_file, rel_path, verbose, tracker)
-                                        else:
-                                            shutil.copy2(sub_item, dest_file)
-                            else:
-                                shutil.copytree(item, dest_path)
-                        else:
-                            if dest_path.exists() and verbose and not tracker:
-                                console.print(f"[yellow]Перезапись файла:[/yellow] {item.name}")
-                            shutil.copy2(item, dest_path)
-                    if verbose and not tracker:
-                        console.print(f"[cyan]Файлы шаблона объединены с текущей директорией[/cyan]")
-            else:
-                zip_ref.extractall(project_path)
-
-                extracted_items = list(project_path.iterdir())
-                if tracker:
-                    tracker.start("extracted-summary")
-                    tracker.complete("extracted-summary", f"{len(extracted_items)} элементов верхнего уровня")
-                elif verbose:
-                    console.print(f"[cyan]Распаковано {len(extracted_items)} элементов в {project_path}:[/cyan]")
-                    for item in extracted_items:
-                        console.print(f"  - {item.name} ({'папка' if item.is_dir() else 'файл'})")
-
-                if len(extracted_items) == 1 and extracted_items[0].is_dir():
-                    nested_dir = extracted_items[0]
-                    temp_move_dir = project_path.parent / f"{project_path.name}_temp"
-
-                    shutil.move(str(nested_dir), str(temp_move_dir))
+                            console.print(f"[cyan]Выровнена вложенная структура директорий[/cyan]")
 
-                    project_path.rmdir()
-
-                    shutil.move(str(temp_move_dir), str(project_path))
-                    if tracker:
-                        tracker.add("flatten", "Выравнивание вложенной структуры")
-                        tracker.complete("flatten")
-                    elif verbose:
-                        console.print(f"[cyan]Выровнена вложенная структура директорий[/cyan]")
+                    agent_files = _extract_extra_agents(extra_zips, project_path, add_ps_bom=add_ps_bom, tracker=tracker, verbose=verbose, workers=extract_workers)
+                    if installed_files is not None:
+                        installed_files.extend(agent_files)
 
     except Exception as e:
         if tracker:
@@ -885,11 +2098,13 @@ def download_and_extract_template(project_path: Path, ai_assistant: str, script_
         raise typer.Exit(1)
     else:
         if tracker:
-            tracker.complete("extract")
+            tracker.complete("extract", extract_detail)
     finally:
         if tracker:
             tracker.add("cleanup", "Удаление временного архива")
 
+        for path in extra_zips:
+            path.unlink(missing_ok=True)
         if zip_path.exists():
             zip_path.unlink()
             if tracker:
@@ -897,95 +2112,334 @@ def download_and_extract_template(project_path: Path, ai_assistant: str, script_
             elif verbose:
                 console.print(f"Очищено: {zip_path.name}")
 
-    if os.name == "nt" and script_type == "ps":
-        ensure_powershell_scripts_utf8_bom(project_path, tracker=tracker)
+    if tracker:
+        if os.name == "nt":
+            tracker.skip("chmod", "Windows")
+        else:
+            tracker.complete("chmod", f"{extract_stats['executable']} исполняемых")
+        if add_ps_bom:
+            tracker.add("ps-encoding", "Кодировка PowerShell")
+            tracker.complete("ps-encoding", f"обновлено: {extract_stats['bom']}")
+    elif verbose and extract_stats["executable"]:
+        console.print(f"[cyan]Права выполнения установлены на {extract_stats['executable']} скриптах[/cyan]")
 
     return project_path
 
 
-def ensure_powershell_scripts_utf8_bom(project_path: Path, tracker: StepTracker | None = None) -> None:
-    scripts_root = project_path / ".specify" / "scripts" / "powershell"
-    if not scripts_root.is_dir():
-        return
-
+def _extract_extra_agents(zip_paths: list[Path], dest: Path, *, add_ps_bom: bool, tracker: StepTracker | None, verbose: bool, workers: int | None = None) -> list[str]:
+    """Распаковывает в `dest` файлы дополнительных агентов (без общего `.specify/`), возвращает их пути."""
+    if not zip_paths:
+        return []
+    files: list[str] = []
+    for zip_path in zip_paths:
+        with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+            files.extend(extract_template_zip(zip_ref, dest, add_ps_bom=add_ps_bom, skip_shared=True, workers=workers)["files"])
     if tracker:
-        tracker.add("ps-encoding", "Кодировка PowerShell")
-        tracker.start("ps-encoding")
+        tracker.add("agents", "Файлы дополнительных агентов")
+        tracker.complete("agents", f"{len(zip_paths)} агент(ов), {len(files)} файлов")
+    elif verbose:
+        console.print(f"[cyan]Добавлены файлы дополнительных агентов:[/cyan] {len(files)}")
+    return files
+
+def preview_template_merge(project_path: Path, ai_assistant: str, script_type: str, *, client: httpx.Client = None, debug: bool = False, github_token: str = None, source: TemplateSource | None = None, extra_agents: list[str] | None = None, prefetch: ReleasePrefetch | None = None) -> list[tuple[str, Path]]:
+    """Скачивает и распаковывает шаблон во временную директорию и строит план слияния с `project_path`, не изменяя проект."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_path = Path(temp_dir)
+        downloads = download_templates(
+            [ai_assistant, *(extra_agents or [])],
+            temp_path,
+            script_type=script_type,
+            verbose=False,
+            show_progress=True,
+            client=client,
+            debug=debug,
+            github_token=github_token,
+            source=source,
+            prefetch=prefetch,
+        )
+        extract_dir = temp_path / "extracted"
+        add_ps_bom = os.name == "nt" and script_type == "ps"
+        with zipfile.ZipFile(downloads[0][0], 'r') as zip_ref:
+            extract_template_zip(zip_ref, extract_dir, add_ps_bom=add_ps_bom)
+        source_dir = _template_root(extract_dir)
+        _extract_extra_agents([path for path, _ in downloads[1:]], source_dir, add_ps_bom=add_ps_bom, tracker=None, verbose=False)
+        return plan_template_merge(source_dir, project_path)
+
+def default_extract_workers() -> int:
+    """Число потоков распаковки: из `SPECIFY_EXTRACT_WORKERS` или по числу CPU (не больше EXTRACT_MAX_WORKERS)."""
+    value = os.getenv(EXTRACT_WORKERS_ENV, "").strip()
+    if value.isdigit() and int(value) > 0:
+        return min(int(value), EXTRACT_MAX_WORKERS)
+    return min(os.cpu_count() or 1, EXTRACT_MAX_WORKERS)
+
+def extract_template_zip(zip_ref: zipfile.ZipFile, dest: Path, *, add_ps_bom: bool = False, skip_shared: bool = False, workers: int | None = None) -> dict:
+    """Распаковывает архив шаблона в `dest`, записывая каждый файл ровно один раз.
+
+    Права выполнения выставляются при создании файла: по Unix-режиму из `external_attr`
+    записи ZIP или, для `.sh` скриптов, по шебангу `#!` в начале содержимого (no-op на Windows).
+    При `add_ps_bom` к `.ps1` скриптам в UTF-8 без BOM сразу добавляется BOM.
+    При `skip_shared` распаковываются только файлы агента: общий для всех агентов `.specify/`
+    пропускается, а вложенная корневая директория архива (если есть) отбрасывается.
+    Записи распаковываются в `workers` потоков (по умолчанию `default_extract_workers()`):
+    zlib и запись файлов отпускают GIL, а все директории создаются заранее по списку записей.
 
-    converted = 0
-    for ps1_file in scripts_root.rglob("*.ps1"):
-        data = ps1_file.read_bytes()
-        if data.startswith(codecs.BOM_UTF8):
-            continue
+    Returns:
+        Словарь: files - относительные пути записанных файлов, executable - число
+        исполняемых файлов, bom - число .ps1 скриптов, получивших BOM, bytes - записано байт
+    """
+    if workers is None:
+        workers = default_extract_workers()
+    with profile_span("extract", dest=str(dest), workers=workers) as span:
+        stats = _extract_members(zip_ref, dest, add_ps_bom=add_ps_bom, skip_shared=skip_shared, workers=workers)
+        span["files_written"] = len(stats["files"])
+        span["bytes_written"] = stats["bytes"]
+    return stats
+
+def _extract_members(zip_ref: zipfile.ZipFile, dest: Path, *, add_ps_bom: bool, skip_shared: bool = False, workers: int = 1) -> dict:
+    dest_root = dest.resolve()
+
+    prefix = ""
+    if skip_shared:
+        top_level = {name.split("/", 1)[0] for name in zip_ref.namelist()}
+        if len(top_level) == 1 and not next(iter(top_level)).startswith(".") and all("/" in name for name in zip_ref.namelist()):
+            prefix = f"{next(iter(top_level))}/"
+
+    # Сначала проверяем все пути и собираем директории: потоки записи только создают файлы
+    members: list[tuple[zipfile.ZipInfo, Path]] = []
+    directories = {dest_root}
+    for info in zip_ref.infolist():
+        name = info.filename
+        if skip_shared:
+            name = name[len(prefix):] if name.startswith(prefix) else name
+            if not name or name.split("/", 1)[0] == ".specify":
+                continue
+        target = (dest_root / name).resolve()
+        if not target.is_relative_to(dest_root) or target == dest_root:
+            raise RuntimeError(f"Небезопасный путь в архиве: {info.filename}")
+        if info.is_dir():
+            directories.add(target)
+        else:
+            directories.add(target.parent)
+            members.append((info, target))
+    for directory in sorted(directories):
+        directory.mkdir(parents=True, exist_ok=True)
+
+    def write(member: tuple[zipfile.ZipInfo, Path]) -> tuple[bool, bool, int]:
+        return _write_member(zip_ref, *member, add_ps_bom=add_ps_bom)
+
+    # Мелкие архивы не окупают запуск пула
+    if workers > 1 and len(members) >= EXTRACT_PARALLEL_MIN_MEMBERS:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="specify-extract") as pool:
+            results = list(pool.map(write, members))
+    else:
+        results = [write(member) for member in members]
 
-        try:
-            text = data.decode("utf-8")
-        except UnicodeDecodeError:
-            continue
+    return {
+        "files": [target.relative_to(dest_root).as_posix() for _, target in members],
+        "executable": sum(1 for is_exec, _, _ in results if is_exec) if os.name != "nt" else 0,
+        "bom": sum(1 for _, bom, _ in results if bom),
+        "bytes": sum(size for _, _, size in results),
+    }
 
-        ps1_file.write_bytes(codecs.BOM_UTF8 + text.encode("utf-8"))
-        converted += 1
+def _write_member(zip_ref: zipfile.ZipFile, info: zipfile.ZipInfo, target: Path, *, add_ps_bom: bool) -> tuple[bool, bool, int]:
+    """Записывает одну запись архива в `target`, возвращает (исполняемый, добавлен BOM, записано байт)."""
+    bom_added = False
+    with zip_ref.open(info) as src:
+        head = src.read(65536)
+        unix_mode = info.external_attr >> 16
+        is_exec = bool(unix_mode & 0o111) or (info.filename.endswith(".sh") and head.startswith(b"#!"))
+
+        if add_ps_bom and info.filename.endswith(".ps1") and not head.startswith(codecs.BOM_UTF8):
+            # .ps1 скрипты небольшие - читаем целиком, чтобы проверить, что это UTF-8
+            head += src.read()
+            try:
+                head.decode("utf-8")
+            except UnicodeDecodeError:
+                pass
+            else:
+                head = codecs.BOM_UTF8 + head
+                bom_added = True
 
-    if tracker:
-        tracker.complete("ps-encoding", f"обновлено: {converted}")
+        fd = os.open(target, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_BINARY", 0), 0o777 if is_exec else 0o666)
+        with os.fdopen(fd, "wb") as out:
+            out.write(head)
+            shutil.copyfileobj(src, out, 65536)
+            size = out.tell()
+    return is_exec, bom_added, size
 
+def default_materialize_mode() -> str:
+    """Режим создания файлов шаблона из `SPECIFY_MATERIALIZE` (по умолчанию copy)."""
+    value = os.getenv(MATERIALIZE_ENV, "").strip().lower()
+    return value if value in MATERIALIZE_MODES else "copy"
 
-def ensure_executable_scripts(project_path: Path, tracker: StepTracker | None = None) -> None:
-    """Гарантирует, что POSIX .sh скрипты в .specify/scripts (рекурсивно) имеют биты исполнения (no-op на Windows)."""
-    if os.name == "nt":
-        return  # Windows: пропускаем молча
-    scripts_root = project_path / ".specify" / "scripts"
-    if not scripts_root.is_dir():
-        return
-    failures: list[str] = []
-    updated = 0
-    for script in scripts_root.rglob("*.sh"):
-        try:
-            if script.is_symlink() or not script.is_file():
-                continue
-            try:
-                with script.open("rb") as f:
-                    if f.read(2) != b"#!":
-                        continue
-            except Exception:
+def template_store_entry(zip_path: Path, *, add_ps_bom: bool = False, workers: int | None = None) -> tuple[Path, dict]:
+    """Возвращает распакованное дерево архива в общем хранилище шаблонов, распаковывая архив только один раз.
+
+    Записи хранилища адресуются хэшем содержимого архива, поэтому проекты из одного релиза
+    используют одно дерево. Файлы дерева доступны только для чтения: на них могут указывать
+    жесткие ссылки из проектов. Дерево собирается во временной директории и переименовывается
+    целиком, так что параллельные `init` не видят частично распакованных записей.
+
+    Returns:
+        (директория дерева, манифест: files, executable, bom, bytes)
+    """
+    digest = hashlib.sha256()
+    with open(zip_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    key = digest.hexdigest()[:32] + ("-bom" if add_ps_bom else "")
+    entry = TEMPLATE_STORE_DIR / key
+    try:
+        manifest = json.loads((entry / "manifest.json").read_text(encoding="utf-8"))
+        os.utime(entry)
+        record_cache_lookup("template-store", hits=1)
+        return entry / "tree", manifest
+    except (OSError, ValueError):
+        pass
+    record_cache_lookup("template-store", misses=1)
+
+    TEMPLATE_STORE_DIR.mkdir(parents=True, exist_ok=True)
+    staging = Path(tempfile.mkdtemp(prefix=f"{key}.", dir=TEMPLATE_STORE_DIR))
+    try:
+        with zipfile.ZipFile(zip_path, "r") as zip_ref:
+            manifest = extract_template_zip(zip_ref, staging / "tree", add_ps_bom=add_ps_bom, workers=workers)
+        if os.name != "nt":
+            for path in (staging / "tree").rglob("*"):
+                if path.is_file():
+                    path.chmod(path.stat().st_mode & ~0o222)
+        (staging / "manifest.json").write_text(json.dumps(manifest, ensure_ascii=False), encoding="utf-8")
+        try:
+            staging.rename(entry)
+        except OSError:
+            # Тот же архив уже распакован параллельным запуском; запись без манифеста заменяется
+            if not (entry / "manifest.json").is_file():
+                shutil.rmtree(entry)
+                staging.rename(entry)
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+    prune_template_store()
+    return entry / "tree", manifest
+
+def prune_template_store(keep: int = TEMPLATE_STORE_MAX_ENTRIES) -> None:
+    """Удаляет из хранилища шаблонов записи сверх `keep` последних использованных и брошенные временные директории."""
+    try:
+        entries = [path for path in TEMPLATE_STORE_DIR.iterdir() if path.is_dir()]
+    except OSError:
+        return
+    stale = [path for path in entries if "." in path.name and time.time() - path.stat().st_mtime > 86400]
+    complete = sorted((path for path in entries if "." not in path.name), key=lambda path: path.stat().st_mtime, reverse=True)
+    for path in stale + complete[keep:]:
+        shutil.rmtree(path, ignore_errors=True)
+
+def _clone_file(src: Path, dest: Path, *, hardlink: bool, reflink: list[bool], ioctl) -> str:
+    """Создает `dest` из файла хранилища: жесткой ссылкой, reflink или копированием. Возвращает способ."""
+    # Существующий файл удаляется, а не перезаписывается: запись через жесткую ссылку изменила бы хранилище
+    dest.unlink(missing_ok=True)
+    if hardlink:
+        try:
+            os.link(src, dest)
+            return "hardlink"
+        except OSError:
+            pass
+    is_exec = bool(src.stat().st_mode & 0o111)
+    with open(src, "rb") as source:
+        fd = os.open(dest, os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, "O_BINARY", 0), 0o777 if is_exec else 0o666)
+        with os.fdopen(fd, "wb") as out:
+            if reflink[0]:
+                try:
+                    ioctl(out.fileno(), FICLONE, source.fileno())
+                    return "reflink"
+                except OSError:
+                    # Файловая система (или пара разных файловых систем) не поддерживает reflink - дальше только копии
+                    reflink[0] = False
+            shutil.copyfileobj(source, out, 1 << 20)
+    return "copy"
+
+def clone_template_files(files: list[tuple[Path, Path, bool]], *, workers: int | None = None) -> dict:
+    """Создает файлы проекта из файлов хранилища шаблонов.
+
+    `files` - тройки (файл хранилища, файл проекта, можно ли жесткую ссылку). Без жесткой
+    ссылки файл создается через reflink (FICLONE, только Linux), а если файловая система его
+    не поддерживает - копированием. Файлы создаются в `workers` потоков.
+
+    Returns:
+        Счетчики по способам: hardlink, reflink, copy
+    """
+    try:
+        import fcntl
+        ioctl = fcntl.ioctl
+    except ImportError:  # Windows
+        ioctl = None
+    if workers is None:
+        workers = default_extract_workers()
+    reflink = [ioctl is not None and sys.platform.startswith("linux")]
+    for directory in sorted({dest.parent for _, dest, _ in files}):
+        directory.mkdir(parents=True, exist_ok=True)
+
+    def clone(item: tuple[Path, Path, bool]) -> str:
+        src, dest, hardlink = item
+        return _clone_file(src, dest, hardlink=hardlink, reflink=reflink, ioctl=ioctl)
+
+    if workers > 1 and len(files) >= EXTRACT_PARALLEL_MIN_MEMBERS:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="specify-clone") as pool:
+            methods = list(pool.map(clone, files))
+    else:
+        methods = [clone(item) for item in files]
+    return {method: methods.count(method) for method in ("hardlink", "reflink", "copy")}
+
+def materialize_template(zip_paths: list[Path], dest: Path, *, mode: str, add_ps_bom: bool = False, workers: int | None = None, link_all: bool = False) -> dict:
+    """Создает файлы шаблона в `dest` из общего хранилища вместо распаковки архивов в проект.
+
+    Из первого архива берутся все файлы, из остальных (дополнительные агенты) - все, кроме
+    общего `.specify/`, как при `skip_shared`. В режиме hardlink жесткими ссылками становятся
+    только скрипты и шаблоны `.specify/` (TEMPLATE_HARDLINK_PREFIXES), при `link_all` - все
+    файлы (для временного дерева слияния `--here`).
+
+    Returns:
+        Словарь: files - относительные пути файлов, executable, bom, hardlink, reflink, copy
+    """
+    sources: dict[str, Path] = {}
+    executable = bom = 0
+    for index, zip_path in enumerate(zip_paths):
+        tree, manifest = template_store_entry(zip_path, add_ps_bom=add_ps_bom, workers=workers)
+        root = _template_root(tree)
+        prefix = f"{root.relative_to(tree).as_posix()}/" if root != tree else ""
+        for name in manifest["files"]:
+            if not name.startswith(prefix):
                 continue
-            st = script.stat(); mode = st.st_mode
-            if mode & 0o111:
+            rel = name[len(prefix):]
+            if index and rel.split("/", 1)[0] == ".specify":
                 continue
-            new_mode = mode
-            if mode & 0o400: new_mode |= 0o100
-            if mode & 0o040: new_mode |= 0o010
-            if mode & 0o004: new_mode |= 0o001
-            if not (new_mode & 0o100):
-                new_mode |= 0o100
-            os.chmod(script, new_mode)
-            updated += 1
-        except Exception as e:
-            failures.append(f"{script.relative_to(scripts_root)}: {e}")
-    if tracker:
-        detail = f"{updated} обновлено" + (f", {len(failures)} сбоев" if failures else "")
-        tracker.add("chmod", "Установка прав выполнения скриптов рекурсивно")
-        (tracker.error if failures else tracker.complete)("chmod", detail)
-    else:
-        if updated:
-            console.print(f"[cyan]Обновлены права выполнения на {updated} скриптах рекурсивно[/cyan]")
-        if failures:
-            console.print("[yellow]Некоторые скрипты не удалось обновить:[/yellow]")
-            for f in failures:
-                console.print(f"  - {f}")
+            sources[rel] = root / rel
+        if not index:
+            executable, bom = manifest["executable"], manifest["bom"]
+
+    files = [
+        (src, dest / rel, link_all or (mode == "hardlink" and rel.startswith(TEMPLATE_HARDLINK_PREFIXES)))
+        for rel, src in sources.items()
+    ]
+    with profile_span("materialize", dest=str(dest), mode=mode) as span:
+        counts = clone_template_files(files, workers=workers)
+        span["files_written"] = len(files)
+    return {"files": list(sources), "executable": executable, "bom": bom, **counts}
 
 @app.command()
 def init(
     project_name: str = typer.Argument(None, help="Имя для директории вашего нового проекта (необязательно при использовании --here, или используйте '.' для текущей директории)"),
-    ai_assistant: str = typer.Option(None, "--ai", help="AI ассистент для использования: claude, gemini, copilot, cursor-agent, qwen, opencode, codex, windsurf, kilocode, auggie, codebuddy, amp, shai, q, bob, или qoder "),
+    ai_assistant: str = typer.Option(None, "--ai", help="AI ассистент для использования: claude, gemini, copilot, cursor-agent, qwen, opencode, codex, windsurf, kilocode, auggie, codebuddy, amp, shai, q, bob, или qoder. Несколько ассистентов - через запятую: claude,gemini,copilot"),
     script_type: str = typer.Option(None, "--script", help="Тип скрипта: sh или ps"),
     ignore_agent_tools: bool = typer.Option(False, "--ignore-agent-tools", help="Пропустить проверку инструментов AI агентов, например Claude Code"),
     no_git: bool = typer.Option(False, "--no-git", help="Пропустить инициализацию git репозитория"),
     here: bool = typer.Option(False, "--here", help="Инициализировать проект в текущей директории вместо создания новой"),
     force: bool = typer.Option(False, "--force", help="Принудительное слияние/перезапись при использовании --here (пропуск подтверждения)"),
+    dry_run: bool = typer.Option(False, "--dry-run", help="Показать план изменений файлов (создать/перезаписать/объединить/без изменений), ничего не записывая на диск"),
     skip_tls: bool = typer.Option(False, "--skip-tls", help="Пропустить проверку SSL/TLS (не рекомендуется)"),
+    offline: bool = typer.Option(False, "--offline", help="Собрать шаблон локально из встроенных в пакет исходников, без обращения к сети (версия шаблона = версия CLI)"),
     debug: bool = typer.Option(False, "--debug", help="Показать подробный диагностический вывод для сетевых сбоев и ошибок распаковки"),
     github_token: str = typer.Option(None, "--github-token", help="Токен GitHub для запросов API (или установите переменную окружения GH_TOKEN или GITHUB_TOKEN)"),
+    materialize: str = typer.Option(None, "--materialize", help="Как создавать файлы шаблона: copy (распаковка в проект), reflink (архив распаковывается один раз в общее хранилище, файлы - reflink или копии) или hardlink (как reflink, но скрипты и шаблоны .specify - жесткие ссылки, только для чтения). По умолчанию SPECIFY_MATERIALIZE или copy"),
+    profile: Path = typer.Option(None, "--profile", help="Записать профиль выполнения (Chrome trace events / speedscope JSON) в указанный файл", dir_okay=False),
+    json_output: bool = typer.Option(False, "--json", help="Вывод событий JSON Lines в stdout вместо интерфейса (требует --ai; для непустой директории с --here также --force)"),
 ):
     """
     Инициализация нового проекта Specify из последнего шаблона.
@@ -1002,6 +2456,7 @@ def init(
         specify init my-project
         specify init my-project --ai claude
         specify init my-project --ai copilot --no-git
+        specify init my-project --ai claude,gemini,copilot  # Несколько ассистентов за один проход
         specify init --ignore-agent-tools my-project
         specify init . --ai claude         # Инициализация в текущей директории
         specify init .                     # Инициализация в текущей директории (интерактивный выбор AI)
@@ -1010,21 +2465,41 @@ def init(
         specify init --here --ai codebuddy
         specify init --here
         specify init --here --force  # Пропуск подтверждения, если текущая директория не пуста
+        specify init --here --dry-run  # Показать, какие файлы будут созданы или изменены
+        specify init my-project --profile init-trace.json
+        specify init my-project --ai claude --offline  # Без сети, шаблоны из установленного пакета
+        specify init my-project --ai claude --materialize reflink  # Файлы из общего хранилища шаблонов
+        specify init my-project --ai claude --json
     """
 
+    if json_output:
+        enable_json_output()
+    started_at = time.monotonic()
     show_banner()
+    start_profile(profile, collect=json_output)
+    emit_event("start", command="init")
 
     if project_name == ".":
         here = True
         project_name = None  # Очищаем project_name для использования существующей логики валидации
 
     if here and project_name:
-        console.print("[red]Ошибка:[/red] Нельзя указать имя проекта и флаг --here одновременно")
-        raise typer.Exit(1)
+        exit_with_error("Нельзя указать имя проекта и флаг --here одновременно")
 
     if not here and not project_name:
-        console.print("[red]Ошибка:[/red] Необходимо указать имя проекта, использовать '.' для текущей директории или использовать флаг --here")
-        raise typer.Exit(1)
+        exit_with_error("Необходимо указать имя проекта, использовать '.' для текущей директории или использовать флаг --here")
+
+    if json_output and not ai_assistant:
+        exit_with_error("В режиме --json необходимо указать --ai")
+
+    materialize = (materialize or default_materialize_mode()).strip().lower()
+    if materialize not in MATERIALIZE_MODES:
+        exit_with_error(f"Неизвестный режим --materialize '{materialize}'. Выберите из: {', '.join(MATERIALIZE_MODES)}")
+
+    try:
+        template_source = BundledTemplateSource() if offline else resolve_template_source()
+    except ValueError as e:
+        exit_with_error(str(e))
 
     if here:
         project_name = Path.cwd().name
@@ -1036,6 +2511,10 @@ def init(
             console.print("[yellow]Файлы шаблона будут объединены с существующим контентом и могут перезаписать существующие файлы[/yellow]")
             if force:
                 console.print("[cyan]--force указан: пропуск подтверждения и выполнение слияния[/cyan]")
+            elif dry_run:
+                console.print("[cyan]--dry-run указан: файлы не будут изменены[/cyan]")
+            elif json_output:
+                exit_with_error("Текущая директория не пуста: в режиме --json укажите --force или --dry-run")
             else:
                 response = typer.confirm("Вы хотите продолжить?")
                 if not response:
@@ -1053,8 +2532,22 @@ def init(
             )
             console.print()
             console.print(error_panel)
+            emit_error(f"Директория '{project_name}' уже существует")
             raise typer.Exit(1)
 
+    if ai_assistant:
+        selected_ais = list(dict.fromkeys(a.strip() for a in ai_assistant.split(",") if a.strip()))
+        for ai in selected_ais:
+            if ai not in AGENT_CONFIG:
+                exit_with_error(f"Неверный AI ассистент '{ai}'. Выберите из: {', '.join(AGENT_CONFIG.keys())}")
+        if not selected_ais:
+            exit_with_error(f"Не указан AI ассистент. Выберите из: {', '.join(AGENT_CONFIG.keys())}")
+    if script_type and script_type not in SCRIPT_TYPE_CHOICES:
+        exit_with_error(f"Неверный тип скрипта '{script_type}'. Выберите из: {', '.join(SCRIPT_TYPE_CHOICES.keys())}")
+
+    # Локальные проверки пройдены: релиз запрашивается, пока пользователь выбирает агента и идут проверки инструментов
+    prefetch = ReleasePrefetch(template_source, verify=ssl_context if not skip_tls else False, github_token=github_token).start()
+
     current_dir = Path.cwd()
 
     setup_lines = [
@@ -1075,27 +2568,38 @@ def init(
         if not should_init_git:
             console.print("[yellow]Git не найден - инициализация репозитория будет пропущена[/yellow]")
 
-    if ai_assistant:
-        if ai_assistant not in AGENT_CONFIG:
-            console.print(f"[red]Ошибка:[/red] Неверный AI ассистент '{ai_assistant}'. Выберите из: {', '.join(AGENT_CONFIG.keys())}")
-            raise typer.Exit(1)
-        selected_ai = ai_assistant
-    else:
+    if not ai_assistant:
         # Создание словаря опций для выбора (agent_key: display_name)
         ai_choices = {key: config["name"] for key, config in AGENT_CONFIG.items()}
-        selected_ai = select_with_arrows(
+        selected_ais = [select_with_arrows(
             ai_choices, 
             "Выберите вашего AI ассистента:", 
             "copilot"
-        )
+        )]
+    # Первый ассистент - основной: из его шаблона берется общий .specify/
+    selected_ai = selected_ais[0]
+    extra_agents = selected_ais[1:]
+
+    if script_type:
+        selected_script = script_type
+    else:
+        default_script = "ps" if os.name == "nt" else "sh"
 
-    if not ignore_agent_tools:
-        agent_config = AGENT_CONFIG.get(selected_ai)
+        if sys.stdin.isatty() and not json_output:
+            selected_script = select_with_arrows(SCRIPT_TYPE_CHOICES, "Выберите тип скрипта (или нажмите Enter)", default_script)
+        else:
+            selected_script = default_script
+
+    # Агенты и тип скрипта известны - архивы скачиваются, пока идут проверки инструментов
+    prefetch.request_assets(selected_ais, selected_script)
+
+    for selected_agent in ([] if ignore_agent_tools else selected_ais):
+        agent_config = AGENT_CONFIG.get(selected_agent)
         if agent_config and agent_config["requires_cli"]:
             install_url = agent_config["install_url"]
-            if not check_tool(selected_ai):
+            if not check_tool(selected_agent):
                 error_panel = Panel(
-                    f"[cyan]{selected_ai}[/cyan] не найден\n"
+                    f"[cyan]{selected_agent}[/cyan] не найден\n"
                     f"Установите с: [cyan]{install_url}[/cyan]\n"
                     f"{agent_config['name']} требуется для продолжения с этим типом проекта.\n\n"
                     "Совет: Используйте [cyan]--ignore-agent-tools[/cyan] для пропуска этой проверки",
@@ -1105,24 +2609,24 @@ def init(
                 )
                 console.print()
                 console.print(error_panel)
+                emit_error(f"{selected_agent} не найден, установите с: {install_url}", tool=selected_agent)
                 raise typer.Exit(1)
 
-    if script_type:
-        if script_type not in SCRIPT_TYPE_CHOICES:
-            console.print(f"[red]Ошибка:[/red] Неверный тип скрипта '{script_type}'. Выберите из: {', '.join(SCRIPT_TYPE_CHOICES.keys())}")
-            raise typer.Exit(1)
-        selected_script = script_type
-    else:
-        default_script = "ps" if os.name == "nt" else "sh"
-
-        if sys.stdin.isatty():
-            selected_script = select_with_arrows(SCRIPT_TYPE_CHOICES, "Выберите тип скрипта (или нажмите Enter)", default_script)
-        else:
-            selected_script = default_script
-
-    console.print(f"[cyan]Выбранный AI ассистент:[/cyan] {selected_ai}")
+    console.print(f"[cyan]Выбранный AI ассистент:[/cyan] {', '.join(selected_ais)}")
     console.print(f"[cyan]Выбранный тип скрипта:[/cyan] {selected_script}")
 
+    if dry_run:
+        local_client = httpx.Client(verify=ssl_context if not skip_tls else False)
+        plan = preview_template_merge(project_path, selected_ai, selected_script, client=local_client, debug=debug, github_token=github_token, source=template_source, extra_agents=extra_agents, prefetch=prefetch)
+        prefetch.close()
+        console.print()
+        print_merge_plan(plan)
+        console.print("\n[bold]Пробный запуск:[/bold] файлы не изменены, git не инициализирован.")
+        for action, rel_path in plan:
+            emit_event("plan", action=action, path=rel_path.as_posix())
+        emit_event("result", ok=True, dry_run=True, project_path=str(project_path), ai=selected_ai, agents=selected_ais, script=selected_script, duration=round(time.monotonic() - started_at, 6), **finish_profile(profile, "init"))
+        return
+
     tracker = StepTracker("Инициализация проекта Specify")
 
     sys._specify_tracker_active = True
@@ -1130,7 +2634,7 @@ def init(
     tracker.add("precheck", "Проверка необходимых инструментов")
     tracker.complete("precheck", "ок")
     tracker.add("ai-select", "Выбор AI ассистента")
-    tracker.complete("ai-select", f"{selected_ai}")
+    tracker.complete("ai-select", ", ".join(selected_ais))
     tracker.add("script-select", "Выбор типа скрипта")
     tracker.complete("script-select", selected_script)
     for key, label in [
@@ -1139,33 +2643,35 @@ def init(
         ("extract", "Распаковка шаблона"),
         ("zip-list", "Содержимое архива"),
         ("extracted-summary", "Сводка распаковки"),
+        ("merge", "Слияние с текущей директорией"),
         ("chmod", "Права выполнения скриптов"),
         ("cleanup", "Очистка"),
         ("git", "Инициализация git репозитория"),
         ("final", "Финализация")
     ]:
+        if key == "merge" and not here:
+            continue
         tracker.add(key, label)
 
     # Отслеживание сообщения об ошибке git вне контекста Live, чтобы оно сохранилось
     git_error_message = None
 
-    with Live(tracker.render(), console=console, refresh_per_second=8, transient=True) as live:
-        tracker.attach_refresh(lambda: live.update(tracker.render()))
+    with live_tracker(tracker):
         try:
             verify = not skip_tls
             local_ssl_context = ssl_context if verify else False
             local_client = httpx.Client(verify=local_ssl_context)
 
-            download_and_extract_template(project_path, selected_ai, selected_script, here, verbose=False, tracker=tracker, client=local_client, debug=debug, github_token=github_token)
-
-            ensure_executable_scripts(project_path, tracker=tracker)
+            installed_files: list[str] = []
+            download_and_extract_template(project_path, selected_ai, selected_script, here, verbose=False, tracker=tracker, client=local_client, debug=debug, github_token=github_token, source=template_source, installed_files=installed_files, extra_agents=extra_agents, prefetch=prefetch, materialize=materialize)
+            prefetch.close()
 
             if not no_git:
                 tracker.start("git")
                 if is_git_repo(project_path):
                     tracker.complete("git", "существующий репо обнаружен")
                 elif should_init_git:
-                    success, error_msg = init_git_repo(project_path, quiet=True)
+                    success, error_msg = init_git_repo(project_path, quiet=True, paths=installed_files)
                     if success:
                         tracker.complete("git", "инициализирован")
                     else:
@@ -1180,6 +2686,8 @@ def init(
         except Exception as e:
             tracker.error("final", str(e))
             console.print(Panel(f"Инициализация не удалась: {e}", title="Сбой", border_style="red"))
+            if not isinstance(e, typer.Exit):
+                emit_error(f"Инициализация не удалась: {e}")
             if debug:
                 _env_pairs = [
                     ("Python", sys.version.split()[0]),
@@ -1193,7 +2701,22 @@ def init(
                 shutil.rmtree(project_path)
             raise typer.Exit(1)
         finally:
-            pass
+            profile_totals = finish_profile(profile, "init", tracker)
+
+    emit_event(
+        "result",
+        ok=True,
+        project_path=str(project_path),
+        ai=selected_ai,
+        agents=selected_ais,
+        script=selected_script,
+        files=len(installed_files),
+        git_error=git_error_message,
+        duration=round(time.monotonic() - started_at, 6),
+        **profile_totals,
+    )
+    if json_output:
+        return
 
     console.print(tracker.render())
     console.print("\n[bold green]Проект готов.[/bold green]")
@@ -1215,13 +2738,13 @@ def init(
         )
         console.print(git_error_panel)
 
-    # Уведомление о безопасности папки агента
-    agent_config = AGENT_CONFIG.get(selected_ai)
-    if agent_config:
-        agent_folder = agent_config["folder"]
+    # Уведомление о безопасности папок агентов
+    agent_folders = [AGENT_CONFIG[ai]["folder"] for ai in selected_ais if ai in AGENT_CONFIG]
+    if agent_folders:
+        agent_folder = ", ".join(f"[cyan]{folder}[/cyan]" for folder in agent_folders)
         security_notice = Panel(
             f"Некоторые агенты могут хранить учетные данные, токены авторизации или другие личные артефакты в папке агента внутри вашего проекта.\n"
-            f"Подумайте о добавлении [cyan]{agent_folder}[/cyan] (или его частей) в [cyan].gitignore[/cyan], чтобы предотвратить случайную утечку учетных данных.",
+            f"Подумайте о добавлении {agent_folder} (или их частей) в [cyan].gitignore[/cyan], чтобы предотвратить случайную утечку учетных данных.",
             title="[yellow]Безопасность папки агента[/yellow]",
             border_style="yellow",
             padding=(1, 2)
@@ -1238,7 +2761,7 @@ def init(
         step_num = 2
 
     # Добавление шага настройки Codex, если необходимо
-    if selected_ai == "codex":
+    if "codex" in selected_ais:
         codex_path = project_path / ".codex"
         quoted_path = shlex.quote(str(codex_path))
         if os.name == "nt":  # Windows
@@ -1273,9 +2796,16 @@ def init(
     console.print(enhancements_panel)
 
 @app.command()
-def check():
+def check(
+    profile: Path = typer.Option(None, "--profile", help="Записать профиль выполнения (Chrome trace events / speedscope JSON) в указанный файл", dir_okay=False),
+    json_output: bool = typer.Option(False, "--json", help="Вывод результатов проверки событиями JSON Lines в stdout"),
+):
     """Проверка установки всех необходимых инструментов."""
+    if json_output:
+        enable_json_output()
     show_banner()
+    start_profile(profile)
+    emit_event("start", command="check")
     console.print("[bold]Проверка установленных инструментов...[/bold]\n")
 
     tracker = StepTracker("Проверка доступных инструментов")
@@ -1304,6 +2834,20 @@ def check():
     tracker.add("code-insiders", "Visual Studio Code Insiders")
     code_insiders_ok = check_tool("code-insiders", tracker=tracker)
 
+    finish_profile(profile, "check", tracker)
+    if json_output:
+        for step in tracker.steps:
+            emit_event(
+                "tool",
+                tool=step.key,
+                name=step.label,
+                status={"done": "found", "error": "missing"}.get(step.status, step.status),
+                detail=step.detail,
+                duration=round(step.duration, 6) if step.duration is not None else None,
+            )
+        emit_event("result", ok=True, git=git_ok, agents_found=[k for k, found in agent_results.items() if found])
+        return
+
     console.print(tracker.render())
 
     console.print("\n[bold green]Specify CLI готов к использованию![/bold green]")
@@ -1315,11 +2859,22 @@ def check():
         console.print("[dim]Совет: Установите AI ассистента для лучшего опыта[/dim]")
 
 @app.command()
-def version():
-    """Отображение версии и системной информации."""
+def version(
+    json_output: bool = typer.Option(False, "--json", help="Вывод информации о версии событием JSON Lines в stdout"),
+    refresh: bool = typer.Option(False, "--refresh", help="Запросить метаданные релизов сейчас, не дожидаясь устаревания кэша"),
+    offline: bool = typer.Option(False, "--offline", help="Использовать только кэш метаданных релизов, без сетевых запросов"),
+):
+    """Отображение версии и системной информации.
+
+    Метаданные релизов шаблонов берутся из кэша, общего с `init`. Устаревший кэш обновляется
+    в фоновом процессе; сетевой запрос (параллельно по всем источникам, не дольше
+    VERSION_FETCH_TIMEOUT секунд) выполняется только при пустом кэше или с --refresh.
+    """
     import platform
     import importlib.metadata
     
+    if json_output:
+        enable_json_output()
     show_banner()
     
     # Получение версии CLI из метаданных пакета
@@ -1338,28 +2893,45 @@ def version():
         except Exception:
             pass
     
-    # Получение версии последнего релиза шаблона
-    repo_owner = "github"
-    repo_name = "spec-kit"
-    api_url = f"https://api.github.com/repos/{repo_owner}/{repo_name}/releases/latest"
-    
-    template_version = "unknown"
-    release_date = "unknown"
-    
+    # Получение версий последних релизов шаблонов всех настроенных источников
     try:
-        response = client.get(
-            api_url,
-            timeout=10,
-            follow_redirects=True,
-            headers=_github_auth_headers(),
-        )
-        if response.status_code == 200:
-            release_data = response.json()
-            template_version = release_data.get("tag_name", "unknown")
+        sources = resolve_template_sources()
+    except ValueError:
+        sources = []
+
+    releases: dict[str, dict] = {}
+    fetched_at: dict[str, float] = {}
+    to_fetch = []
+    for source in sources:
+        cached = load_cached_release(source)
+        record_cache_lookup("release-cache", hits=int(cached is not None), misses=int(cached is None))
+        if cached:
+            releases[source.key] = cached["release"]
+            fetched_at[source.key] = cached.get("fetched_at", 0)
+        if refresh or not cached or isinstance(source, LocalDirectorySource):
+            to_fetch.append(source)
+
+    if offline:
+        to_fetch = [source for source in to_fetch if isinstance(source, LocalDirectorySource)]
+    if to_fetch:
+        for source, result in zip(to_fetch, refresh_release_cache(to_fetch, timeout=VERSION_FETCH_TIMEOUT)):
+            if isinstance(result, dict):
+                releases[source.key] = result
+                fetched_at[source.key] = time.time()
+    if not offline and any(time.time() - fetched_at.get(s.key, 0) > RELEASE_CACHE_TTL for s in sources if s not in to_fetch):
+        _spawn_background_refresh()
+
+    template_rows = []
+    for source in sources:
+        template_version = "unknown"
+        release_date = "unknown"
+        release_data = releases.get(source.key)
+        if release_data:
+            template_version = release_data.get("tag_name") or "unknown"
             # Удаление префикса 'v' если есть
             if template_version.startswith("v"):
                 template_version = template_version[1:]
-            release_date = release_data.get("published_at", "unknown")
+            release_date = release_data.get("published_at") or "unknown"
             if release_date != "unknown":
                 # Красивое форматирование даты
                 try:
@@ -1367,16 +2939,41 @@ def version():
                     release_date = dt.strftime("%Y-%m-%d")
                 except Exception:
                     pass
-    except Exception:
-        pass
+        template_rows.append((source, template_version, release_date))
+
+    if json_output:
+        primary = template_rows[0] if template_rows else (None, "unknown", "unknown")
+        emit_event(
+            "version",
+            cli_version=cli_version,
+            template_version=primary[1],
+            release_date=primary[2],
+            templates=[
+                {
+                    "source": source.key,
+                    "template_version": template_version,
+                    "release_date": release_date,
+                    "fetched_at": fetched_at.get(source.key),
+                }
+                for source, template_version, release_date in template_rows
+            ],
+            python=platform.python_version(),
+            platform=platform.system(),
+            architecture=platform.machine(),
+            os_version=platform.version(),
+        )
+        return
 
     info_table = Table(show_header=False, box=None, padding=(0, 2))
     info_table.add_column("Key", style="cyan", justify="right")
     info_table.add_column("Value", style="white")
 
     info_table.add_row("Версия CLI", cli_version)
-    info_table.add_row("Версия шаблона", template_version)
-    info_table.add_row("Выпущен", release_date)
+    for source, template_version, release_date in template_rows:
+        info_table.add_row("", "")
+        info_table.add_row("Источник шаблонов", source.describe())
+        info_table.add_row("Версия шаблона", template_version)
+        info_table.add_row("Выпущен", release_date)
     info_table.add_row("", "")
     info_table.add_row("Python", platform.python_version())
     info_table.add_row("Платформа", platform.system())
@@ -1393,8 +2990,2417 @@ def version():
     console.print(panel)
     console.print()
 
+FEATURE_DIR_PATTERN = re.compile(r"^(\d{3})-")
+MARKDOWN_HEADING = re.compile(r"^(#{1,6})\s+(.+?)\s*#*\s*$")
+
+def find_project_root(start: Path | None = None) -> Path | None:
+    """Ищет корень проекта Specify (директорию с `.specify/`) от `start` вверх."""
+    start = (start or Path.cwd()).resolve()
+    for candidate in (start, *start.parents):
+        if (candidate / ".specify").is_dir():
+            return candidate
+    return None
+
+def _require_project_root() -> Path:
+    root = find_project_root()
+    if root is None:
+        exit_with_error("Не найден проект Specify (.specify/) в текущей директории или выше")
+    return root
+
+def iter_feature_dirs(project_root: Path):
+    """Перебирает директории фич `specs/NNN-*` в порядке номеров."""
+    specs_dir = project_root / "specs"
+    if not specs_dir.is_dir():
+        return
+    for entry in sorted(specs_dir.iterdir(), key=lambda p: p.name):
+        if entry.is_dir() and FEATURE_DIR_PATTERN.match(entry.name):
+            yield entry
+
+def _current_git_branch(project_root: Path) -> str | None:
+    try:
+        result = subprocess.run(["git", "rev-parse", "--abbrev-ref", "HEAD"], cwd=project_root, capture_output=True, text=True, check=True)
+    except (subprocess.CalledProcessError, FileNotFoundError):
+        return None
+    return result.stdout.strip() or None
+
+def resolve_feature_dir(project_root: Path, feature: str | None = None) -> Path:
+    """Определяет директорию фичи по правилам scripts/bash/common.sh.
+
+    Источник имени: аргумент, затем SPECIFY_FEATURE, затем текущая ветка git. Директория ищется
+    по числовому префиксу (004-* для ветки 004-whatever). Без git берется фича с наибольшим номером.
+
+    Raises:
+        ValueError: фича не найдена или префикс неоднозначен
+    """
+    dirs = list(iter_feature_dirs(project_root))
+    name = feature or os.getenv("SPECIFY_FEATURE")
+    from_git = False
+    if not name:
+        name = _current_git_branch(project_root)
+        from_git = name is not None
+    if name:
+        if name.isdigit():
+            prefix = f"{int(name):03d}"
+        else:
+            match = FEATURE_DIR_PATTERN.match(name)
+            prefix = match.group(1) if match else None
+        matches = [d for d in dirs if d.name == name]
+        if not matches and prefix:
+            matches = [d for d in dirs if d.name.startswith(f"{prefix}-")]
+        if len(matches) == 1:
+            return matches[0]
+        if len(matches) > 1:
+            raise ValueError(f"Найдено несколько директорий спецификаций с префиксом '{prefix}': {', '.join(d.name for d in matches)}")
+        if from_git:
+            raise ValueError(f"Вы не в ветке фичи (текущая ветка: {name}). Укажите --feature или переменную SPECIFY_FEATURE")
+        archived = find_archived_feature(project_root, name)
+        if archived is not None:
+            raise ValueError(f"Фича {archived['name']} в архиве; восстановите ее командой: specify archive --restore {archived['name']}")
+        raise ValueError(f"Директория фичи '{name}' не найдена в specs/")
+    if not dirs:
+        raise ValueError("В specs/ нет директорий фич")
+    return dirs[-1]
+
+def git_worktrees(project_root: Path) -> list[tuple[Path, str | None]]:
+    """Рабочие деревья репозитория (`git worktree list`): пары (путь, ветка); без git - пустой список."""
+    try:
+        result = subprocess.run(["git", "worktree", "list", "--porcelain"], cwd=project_root, capture_output=True, text=True, check=True)
+    except (subprocess.CalledProcessError, FileNotFoundError):
+        return []
+    worktrees = []
+    for block in result.stdout.strip().split("\n\n"):
+        fields = dict(line.split(" ", 1) for line in block.splitlines() if " " in line)
+        if "worktree" in fields:
+            branch = fields.get("branch", "")
+            worktrees.append((Path(fields["worktree"]), branch.removeprefix("refs/heads/") or None))
+    return worktrees
+
+def find_feature_worktree(project_root: Path, name: str) -> Path | None:
+    """Ищет другое рабочее дерево проекта, в котором выгружена ветка фичи `name`.
+
+    Как `find_feature_worktree` в scripts/bash/common.sh: точное совпадение ветки, иначе
+    единственная ветка с тем же числовым префиксом. Учитываются только деревья с `.specify/`.
+    """
+    if name.isdigit():
+        prefix = f"{int(name):03d}"
+    else:
+        match = FEATURE_DIR_PATTERN.match(name)
+        prefix = match.group(1) if match else None
+    current = project_root.resolve()
+    candidates = [(path, branch) for path, branch in git_worktrees(project_root) if branch and path.resolve() != current and (path / ".specify").is_dir()]
+    exact = [path for path, branch in candidates if branch == name]
+    if exact:
+        return exact[0]
+    prefixed = [path for path, branch in candidates if prefix and branch.startswith(f"{prefix}-")]
+    return prefixed[0] if len(prefixed) == 1 else None
+
+def resolve_feature(project_root: Path, feature: str | None = None) -> tuple[Path, Path]:
+    """Как `resolve_feature_dir`, но с учетом рабочих деревьев (`create-new-feature.sh --worktree`).
+
+    Если фича задана явно (аргументом или SPECIFY_FEATURE) и ее ветка выгружена в другом рабочем
+    дереве, артефакты берутся из него. Возвращает (корень проекта, директория фичи).
+
+    Raises:
+        ValueError: фича не найдена или префикс неоднозначен
+    """
+    name = feature or os.getenv("SPECIFY_FEATURE")
+    if name:
+        worktree = find_feature_worktree(project_root, name)
+        if worktree is not None:
+            project_root = worktree
+    return project_root, resolve_feature_dir(project_root, feature)
+
+def split_markdown_sections(text: str) -> list[tuple[str, int, str]]:
+    """Разбивает Markdown на секции по заголовкам.
+
+    Returns:
+        Список (путь заголовков через " > ", номер строки заголовка с 1, текст секции).
+        Текст до первого заголовка идет секцией с пустым путем. Заголовки внутри
+        блоков кода игнорируются.
+    """
+    sections = []
+    stack: list[tuple[int, str]] = []
+    heading_path, start_line, body = "", 1, []
+    in_fence = False
+    for line_no, line in enumerate(text.splitlines(), start=1):
+        if line.lstrip().startswith(("```", "~~~")):
+            in_fence = not in_fence
+        match = None if in_fence else MARKDOWN_HEADING.match(line)
+        if match:
+            if body or heading_path:
+                sections.append((heading_path, start_line, "\n".join(body).strip()))
+            level = len(match.group(1))
+            stack = [(lvl, title) for lvl, title in stack if lvl < level]
+            stack.append((level, match.group(2)))
+            heading_path, start_line, body = " > ".join(title for _, title in stack), line_no, []
+        else:
+            body.append(line)
+    if body or heading_path:
+        sections.append((heading_path, start_line, "\n".join(body).strip()))
+    return sections
+
+PROJECT_CACHE_DIR = Path(".specify") / "cache"
+
+def project_cache_dir(project_root: Path) -> Path:
+    """Возвращает `.specify/cache/` проекта, создавая его вместе с `.gitignore`, исключающим содержимое из git."""
+    cache_dir = project_root / PROJECT_CACHE_DIR
+    if not cache_dir.is_dir():
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        (cache_dir / ".gitignore").write_text("*\n", encoding="utf-8")
+    return cache_dir
+
+SEARCH_FILE_SUFFIXES = {".md", ".yaml", ".yml", ".json"}
+
+def _open_search_index(project_root: Path) -> sqlite3.Connection:
+    db = sqlite3.connect(project_cache_dir(project_root) / "search.db")
+    db.execute("CREATE TABLE IF NOT EXISTS files (path TEXT PRIMARY KEY, mtime_ns INTEGER, size INTEGER)")
+    db.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS sections USING fts5("
+        "path UNINDEXED, feature UNINDEXED, line UNINDEXED, heading, body, "
+        "tokenize = 'unicode61 remove_diacritics 2')"
+    )
+    return db
+
+def update_search_index(project_root: Path, *, rebuild: bool = False) -> dict:
+    """Инкрементально обновляет поисковый индекс `.specify/cache/search.db` по файлам `specs/` и архива фич.
+
+    Переиндексируются только файлы с изменившимися mtime или размером; удаленные файлы
+    убираются из индекса.
+
+    Returns:
+        Счетчики: indexed (переиндексировано файлов), removed, total
+    """
+    db = _open_search_index(project_root)
+    try:
+        with db:
+            if rebuild:
+                db.execute("DELETE FROM files")
+                db.execute("DELETE FROM sections")
+            known = {path: (mtime, size) for path, mtime, size in db.execute("SELECT path, mtime_ns, size FROM files")}
+            seen = set()
+            indexed = 0
+
+            def index_file(rel: str, feature: str, signature: tuple[int, int], read) -> None:
+                nonlocal indexed
+                seen.add(rel)
+                if known.get(rel) == signature:
+                    return
+                text = read()
+                sections = split_markdown_sections(text) if rel.lower().endswith(".md") else [("", 1, text)]
+                db.execute("DELETE FROM sections WHERE path = ?", (rel,))
+                db.executemany(
+                    "INSERT INTO sections (path, feature, line, heading, body) VALUES (?, ?, ?, ?, ?)",
+                    [(rel, feature, line, heading, body) for heading, line, body in sections],
+                )
+                db.execute("INSERT OR REPLACE INTO files (path, mtime_ns, size) VALUES (?, ?, ?)", (rel, *signature))
+                indexed += 1
+
+            for feature_dir in iter_feature_dirs(project_root):
+                for file in feature_dir.rglob("*"):
+                    if file.suffix.lower() not in SEARCH_FILE_SUFFIXES or not file.is_file():
+                        continue
+                    st = file.stat()
+                    index_file(file.relative_to(project_root).as_posix(), feature_dir.name, (st.st_mtime_ns, st.st_size),
+                               lambda: file.read_text(encoding="utf-8", errors="replace"))
+            # Фичи из архива (`specify archive`) индексируются без распаковки; вместо mtime - CRC записи ZIP
+            pack = project_root / ARCHIVE_DIR / ARCHIVE_PACK
+            if pack.is_file():
+                with zipfile.ZipFile(pack, "r") as zip_ref:
+                    for info in zip_ref.infolist():
+                        if info.is_dir() or Path(info.filename).suffix.lower() not in SEARCH_FILE_SUFFIXES:
+                            continue
+                        index_file(f"{ARCHIVE_DIR.as_posix()}/{ARCHIVE_PACK}/{info.filename}", info.filename.split("/", 1)[0], (info.CRC, info.file_size),
+                                   lambda: zip_ref.read(info).decode("utf-8", errors="replace"))
+            removed = [path for path in known if path not in seen]
+            for path in removed:
+                db.execute("DELETE FROM sections WHERE path = ?", (path,))
+                db.execute("DELETE FROM files WHERE path = ?", (path,))
+    finally:
+        db.close()
+    record_cache_lookup("search-index", hits=len(seen) - indexed, misses=indexed)
+    return {"indexed": indexed, "removed": len(removed), "total": len(seen)}
+
+def _fts_query(query: str, operator: str) -> str:
+    # Пользовательский ввод не должен интерпретироваться как синтаксис FTS5: каждое слово - фраза в кавычках
+    terms = re.findall(r"\w+", query)
+    return f" {operator} ".join(f'"{term}"*' for term in terms)
+
+def search_specs(project_root: Path, query: str, *, limit: int = 10, feature: str | None = None) -> list[dict]:
+    """Ищет секции артефактов фич, наиболее релевантные запросу (BM25, заголовки весомее текста).
+
+    Сначала требуются все слова запроса; если совпадений нет - любое из них.
+    Во фрагментах (snippet) совпадения обрамлены символами \\x02 и \\x03.
+    """
+    db = _open_search_index(project_root)
+    try:
+        for operator in ("AND", "OR"):
+            match = _fts_query(query, operator)
+            if not match:
+                return []
+            sql = (
+                "SELECT path, feature, line, heading, snippet(sections, 4, char(2), char(3), '…', 24), "
+                "bm25(sections, 0, 0, 0, 4.0, 1.0) AS score FROM sections WHERE sections MATCH ?"
+            )
+            params: list = [match]
+            if feature:
+                sql += " AND feature LIKE ?"
+                params.append(f"{feature}%")
+            sql += " ORDER BY score LIMIT ?"
+            params.append(limit)
+            rows = db.execute(sql, params).fetchall()
+            if rows:
+                break
+    finally:
+        db.close()
+    return [
+        {"path": path, "feature": feat, "line": line, "heading": heading, "snippet": snippet, "score": round(-score, 4)}
+        for path, feat, line, heading, snippet, score in rows
+    ]
+
+@app.command()
+def search(
+    query: str = typer.Argument(..., help="Поисковый запрос"),
+    limit: int = typer.Option(10, "--limit", "-n", help="Максимальное число результатов"),
+    feature: str = typer.Option(None, "--feature", help="Искать только в фиче (номер или имя директории, например 004)"),
+    rebuild: bool = typer.Option(False, "--rebuild", help="Перестроить индекс с нуля"),
+    json_output: bool = typer.Option(False, "--json", help="Вывод результатов событиями JSON Lines в stdout"),
+):
+    """Полнотекстовый поиск по артефактам фич в specs/ (spec.md, plan.md, data-model.md, contracts/...) и в архиве фич.
+
+    Индекс SQLite FTS5 хранится в .specify/cache/search.db и обновляется по mtime файлов перед каждым поиском.
+    """
+    if json_output:
+        enable_json_output()
+    project_root = _require_project_root()
+    stats = update_search_index(project_root, rebuild=rebuild)
+    hits = search_specs(project_root, query, limit=limit, feature=feature)
+
+    if json_output:
+        for rank, hit in enumerate(hits, start=1):
+            emit_event("hit", rank=rank, **{**hit, "snippet": hit["snippet"].replace("\x02", "[[").replace("\x03", "]]")})
+        emit_event("result", ok=True, hits=len(hits), index=stats)
+        return
+
+    if not hits:
+        console.print(f"[yellow]Ничего не найдено:[/yellow] {escape(query)}")
+        return
+    for hit in hits:
+        location = f"{hit['path']}:{hit['line']}"
+        heading = f" [bright_black]{escape(hit['heading'])}[/bright_black]" if hit["heading"] else ""
+        snippet = escape(" ".join(hit["snippet"].split())).replace("\x02", "[bold yellow]").replace("\x03", "[/bold yellow]")
+        console.print(f"[cyan]{location}[/cyan]{heading}")
+        console.print(f"  {snippet}\n")
+
+REQUIREMENT_LINE = re.compile(r"^\s*[-*]\s*(?:\*\*)?((?:FR|NFR|SC)-\d{3,})(?:\*\*)?\s*:?\s*(?:\*\*)?\s*(.*)$")
+REQUIREMENT_REF = re.compile(r"\b((?:FR|NFR|SC)-\d{3,})\b")
+USER_STORY_HEADING = re.compile(r"^#{2,4}\s+(?:Пользовательская история|User Story)\s+(\d+)\s*[-–—:]?\s*(.*?)\s*(?:\((?:Приоритет|Priority):\s*(P\d+)\))?\s*(?:🎯.*)?$", re.IGNORECASE)
+TASK_LINE = re.compile(r"^\s*[-*]\s*\[([ xX])\]\s*(T\d{3,})\b\s*(.*)$")
+STORY_TAG = re.compile(r"\[(US\d+)\]")
+AMBIGUITY_MARKERS = re.compile(r"ТРЕБУЕТСЯ УТОЧНЕНИЕ|NEEDS CLARIFICATION|\bTODO\b|\bTKTK\b|\?\?\?|<placeholder>", re.IGNORECASE)
+VAGUE_TERMS = re.compile(r"\b(быстр\w*|масштабируем\w*|безопасн\w*|интуитивн\w*|надежн\w*|удобн\w*|fast|scalable|secure|intuitive|robust|user-friendly)\b", re.IGNORECASE)
+ANALYSIS_STOP_WORDS = {
+    "система", "должна", "должен", "должны", "должно", "может", "могут", "иметь", "возможность",
+    "пользователь", "пользователи", "пользователям", "для", "или", "при", "что", "это", "все", "как",
+    "the", "and", "for", "must", "should", "system", "user", "users", "with", "that",
+}
+COVERAGE_KEYWORD_THRESHOLD = 0.5
+DUPLICATE_SIMILARITY_THRESHOLD = 0.5
+
+def _analysis_terms(text: str) -> list[str]:
+    """Нормализует текст: слова от 3 букв без стоп-слов, усеченные до 6 символов (грубый стемминг для русского)."""
+    words = re.findall(r"[^\W\d_]{3,}", text.lower())
+    return [w[:6] for w in words if w not in ANALYSIS_STOP_WORDS]
+
+def _shingles(terms: list[str], size: int = 2) -> set[tuple[str, ...]]:
+    if len(terms) < size:
+        return {tuple(terms)} if terms else set()
+    return {tuple(terms[i:i + size]) for i in range(len(terms) - size + 1)}
+
+def _jaccard(a: set, b: set) -> float:
+    return len(a & b) / len(a | b) if a and b else 0.0
+
+def _find_duplicates(items: list[dict]) -> list[dict]:
+    shingled = [(item["id"], _shingles(_analysis_terms(item["text"]))) for item in items]
+    duplicates = []
+    for i, (id_a, sh_a) in enumerate(shingled):
+        for id_b, sh_b in shingled[i + 1:]:
+            similarity = _jaccard(sh_a, sh_b)
+            if similarity >= DUPLICATE_SIMILARITY_THRESHOLD:
+                duplicates.append({"a": id_a, "b": id_b, "similarity": round(similarity, 2)})
+    return duplicates
+
+TASK_ISSUE_LINK = re.compile(r"(?:github\.com/[^/\s]+/[^/\s]+/issues/|(?<![\w/&])#)(\d+)\b")
+
+def parse_tasks(tasks_file: Path) -> list[dict]:
+    """Разбирает задачи `- [ ] T### ...` из tasks.md.
+
+    Returns:
+        Список словарей: id, line, done, parallel ([P]), stories ([USn]), refs (FR/NFR/SC),
+        phase (ближайший заголовок), issue (номер связанного issue, если в строке есть #N или ссылка) и text.
+    """
+    tasks = []
+    phase = ""
+    for line_no, line in enumerate(tasks_file.read_text(encoding="utf-8").splitlines(), start=1):
+        heading = MARKDOWN_HEADING.match(line)
+        if heading:
+            phase = heading.group(2)
+            continue
+        task = TASK_LINE.match(line)
+        if not task:
+            continue
+        text = task.group(3)
+        issue = TASK_ISSUE_LINK.search(text)
+        tasks.append({
+            "id": task.group(2),
+            "line": line_no,
+            "done": task.group(1) != " ",
+            "parallel": "[P]" in text,
+            "stories": STORY_TAG.findall(text),
+            "refs": REQUIREMENT_REF.findall(text),
+            "phase": phase,
+            "issue": int(issue.group(1)) if issue else None,
+            "text": STORY_TAG.sub("", text).replace("[P]", "").strip(),
+        })
+    return tasks
+
+def analyze_feature(feature_dir: Path) -> dict:
+    """Детерминированный анализ согласованности spec.md и tasks.md фичи.
+
+    Извлекает требования (FR/NFR/SC), пользовательские истории и задачи T###, строит карту
+    покрытия (явные ссылки на ID, иначе совпадение ключевых слов), находит требования без задач,
+    задачи без требований и историй, ссылки на несуществующие ID, почти-дубликаты
+    (шинглы нормализованных слов) и двусмысленности (заполнители, расплывчатые формулировки без чисел).
+    """
+    spec_file = feature_dir / "spec.md"
+    tasks_file = feature_dir / "tasks.md"
+    missing = [f.name for f in (spec_file, tasks_file) if not f.is_file()]
+
+    requirements: list[dict] = []
+    stories: dict[str, dict] = {}
+    ambiguities: list[dict] = []
+    for file in (spec_file, feature_dir / "plan.md"):
+        if not file.is_file():
+            continue
+        for line_no, line in enumerate(file.read_text(encoding="utf-8").splitlines(), start=1):
+            if file is spec_file:
+                req = REQUIREMENT_LINE.match(line)
+                if req:
+                    requirements.append({"id": req.group(1), "line": line_no, "text": req.group(2).strip()})
+                    if VAGUE_TERMS.search(req.group(2)) and not re.search(r"\d", req.group(2)):
+                        ambiguities.append({"file": file.name, "line": line_no, "kind": "vague", "text": line.strip()[:160]})
+                story = USER_STORY_HEADING.match(line)
+                if story:
+                    stories[f"US{story.group(1)}"] = {"title": story.group(2).strip(), "priority": story.group(3), "line": line_no, "tasks": []}
+            if AMBIGUITY_MARKERS.search(line):
+                ambiguities.append({"file": file.name, "line": line_no, "kind": "placeholder", "text": line.strip()[:160]})
+
+    tasks = parse_tasks(tasks_file) if tasks_file.is_file() else []
+
+    req_ids = {req["id"] for req in requirements}
+    coverage: dict[str, list[str]] = {req["id"]: [] for req in requirements}
+    matched_by: dict[str, str] = {}
+    dangling = []
+    for task in tasks:
+        for ref in task["refs"]:
+            if ref in coverage:
+                coverage[ref].append(task["id"])
+                matched_by[ref] = "id"
+            else:
+                dangling.append({"task": task["id"], "ref": ref})
+        for story in task["stories"]:
+            if story in stories:
+                stories[story]["tasks"].append(task["id"])
+            else:
+                dangling.append({"task": task["id"], "ref": story})
+
+    # Требования без явных ссылок сопоставляются с задачами по доле общих ключевых слов
+    task_terms = [(task, set(_analysis_terms(task["text"]))) for task in tasks]
+    keyword_mapped_tasks = set()
+    for req in requirements:
+        if coverage[req["id"]]:
+            continue
+        terms = set(_analysis_terms(req["text"]))
+        if len(terms) < 2:
+            continue
+        for task, t_terms in task_terms:
+            common = terms & t_terms
+            if len(common) >= 2 and len(common) / len(terms) >= COVERAGE_KEYWORD_THRESHOLD:
+                coverage[req["id"]].append(task["id"])
+                matched_by[req["id"]] = "keywords"
+                keyword_mapped_tasks.add(task["id"])
+
+    unmapped_tasks = [
+        {"id": task["id"], "line": task["line"], "text": task["text"][:160]}
+        for task in tasks
+        if not task["stories"] and not any(ref in req_ids for ref in task["refs"]) and task["id"] not in keyword_mapped_tasks
+    ]
+    uncovered = [req_id for req_id, task_ids in coverage.items() if not task_ids]
+    functional = [req for req in requirements if not req["id"].startswith("SC-")]
+    covered_functional = sum(1 for req in functional if coverage[req["id"]])
+    duplicates = _find_duplicates(requirements) + _find_duplicates(tasks)
+
+    return {
+        "feature_dir": str(feature_dir),
+        "missing_files": missing,
+        "summary": {
+            "requirements": len(functional),
+            "success_criteria": len(requirements) - len(functional),
+            "user_stories": len(stories),
+            "tasks": len(tasks),
+            "tasks_done": sum(1 for task in tasks if task["done"]),
+            "coverage_pct": round(100 * covered_functional / len(functional), 1) if functional else None,
+            "uncovered": len(uncovered),
+            "unmapped_tasks": len(unmapped_tasks),
+            "duplicates": len(duplicates),
+            "ambiguities": len(ambiguities),
+            "dangling_references": len(dangling),
+        },
+        "coverage": {req_id: {"tasks": task_ids, "match": matched_by.get(req_id)} for req_id, task_ids in coverage.items()},
+        "uncovered": uncovered,
+        "stories": {key: {"title": s["title"], "priority": s["priority"], "line": s["line"], "tasks": len(s["tasks"])} for key, s in stories.items()},
+        "stories_without_tasks": [key for key, s in stories.items() if not s["tasks"]],
+        "unmapped_tasks": unmapped_tasks,
+        "dangling_references": dangling,
+        "duplicates": duplicates,
+        "ambiguities": ambiguities,
+    }
+
+@app.command()
+def analyze(
+    feature: str = typer.Option(None, "--feature", help="Фича (номер или имя директории в specs/); по умолчанию - из SPECIFY_FEATURE или текущей ветки git"),
+    json_output: bool = typer.Option(False, "--json", help="Вывод отчета событием JSON Lines в stdout"),
+):
+    """Детерминированный отчет о покрытии требований задачами для /speckit.analyze.
+
+    Разбирает spec.md и tasks.md фичи за миллисекунды: реестр требований и историй, карта покрытия,
+    несопоставленные задачи, почти-дубликаты и двусмысленности. Файлы не изменяются.
+    """
+    if json_output:
+        enable_json_output()
+    project_root = _require_project_root()
+    try:
+        project_root, feature_dir = resolve_feature(project_root, feature)
+    except ValueError as e:
+        exit_with_error(str(e))
+
+    report = analyze_feature(feature_dir)
+    if json_output:
+        emit_event("analysis", **report)
+        return
+
+    summary = report["summary"]
+    metrics = Table(show_header=False, box=None, padding=(0, 2))
+    metrics.add_column("Метрика", style="cyan", justify="right")
+    metrics.add_column("Значение", style="white")
+    metrics.add_row("Требования", str(summary["requirements"]))
+    metrics.add_row("Критерии успеха", str(summary["success_criteria"]))
+    metrics.add_row("Пользовательские истории", str(summary["user_stories"]))
+    metrics.add_row("Задачи", f"{summary['tasks']} (выполнено {summary['tasks_done']})")
+    metrics.add_row("Покрытие", "—" if summary["coverage_pct"] is None else f"{summary['coverage_pct']}%")
+    metrics.add_row("Без задач", ", ".join(report["uncovered"]) or "—")
+    metrics.add_row("Истории без задач", ", ".join(report["stories_without_tasks"]) or "—")
+    metrics.add_row("Несопоставленные задачи", ", ".join(t["id"] for t in report["unmapped_tasks"]) or "—")
+    metrics.add_row("Ссылки на несуществующие ID", ", ".join(f"{d['task']}→{d['ref']}" for d in report["dangling_references"]) or "—")
+    metrics.add_row("Почти-дубликаты", ", ".join(f"{d['a']}≈{d['b']}" for d in report["duplicates"]) or "—")
+    metrics.add_row("Двусмысленности", str(summary["ambiguities"]))
+    if report["missing_files"]:
+        metrics.add_row("[red]Отсутствуют[/red]", ", ".join(report["missing_files"]))
+    console.print(Panel(metrics, title=f"[bold cyan]Анализ {feature_dir.name}[/bold cyan]", border_style="cyan", padding=(1, 2)))
+
+    for item in report["ambiguities"]:
+        console.print(f"[yellow]{item['file']}:{item['line']}[/yellow] [bright_black]({item['kind']})[/bright_black] {escape(item['text'])}")
+
+def load_project_cache(project_root: Path, name: str) -> dict:
+    """Читает JSON-кэш `.specify/cache/<name>`; поврежденный или отсутствующий кэш считается пустым."""
+    try:
+        data = json.loads((project_root / PROJECT_CACHE_DIR / name).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    return data if isinstance(data, dict) else {}
+
+def store_project_cache(project_root: Path, name: str, data: dict) -> None:
+    """Атомарно сохраняет JSON-кэш `.specify/cache/<name>`; ошибки записи игнорируются."""
+    cache_file = project_cache_dir(project_root) / name
+    tmp_file = _atomic_tmp_path(cache_file)
+    try:
+        tmp_file.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp_file, cache_file)
+    except OSError:
+        tmp_file.unlink(missing_ok=True)
+
+CHECKLIST_ITEM = re.compile(r"^\s*[-*]\s+\[([ xX])\]\s*(.*)$")
+
+def _parse_checklist(path: Path) -> dict:
+    total = completed = 0
+    incomplete_items = []
+    in_fence = False
+    for line_no, line in enumerate(path.read_text(encoding="utf-8").splitlines(), start=1):
+        if line.lstrip().startswith(("```", "~~~")):
+            in_fence = not in_fence
+            continue
+        match = None if in_fence else CHECKLIST_ITEM.match(line)
+        if not match:
+            continue
+        total += 1
+        if match.group(1) == " ":
+            incomplete_items.append({"line": line_no, "text": match.group(2).strip()[:160]})
+        else:
+            completed += 1
+    return {"total": total, "completed": completed, "incomplete": total - completed, "incomplete_items": incomplete_items}
+
+def checklist_status(project_root: Path, feature_dir: Path) -> dict:
+    """Подсчитывает пункты всех чек-листов `FEATURE_DIR/checklists/*.md`.
+
+    Результат разбора каждого файла кэшируется в `.specify/cache/checklists.json` по sha256
+    содержимого, поэтому повторные запуски перечитывают только измененные чек-листы.
+
+    Returns:
+        {"checklists": [{file, total, completed, incomplete, status, incomplete_items}], "total",
+        "completed", "incomplete", "passed"}; при отсутствии чек-листов passed = True.
+    """
+    checklists_dir = feature_dir / "checklists"
+    files = sorted(checklists_dir.glob("*.md")) if checklists_dir.is_dir() else []
+    cache = load_project_cache(project_root, "checklists.json")
+    prefix = f"{checklists_dir.relative_to(project_root).as_posix()}/"
+    fresh_cache = {key: value for key, value in cache.items() if not key.startswith(prefix)}
+    checklists = []
+    for path in files:
+        key = path.relative_to(project_root).as_posix()
+        digest = _file_digest(path).hex()
+        cached = cache.get(key)
+        if isinstance(cached, dict) and cached.get("sha256") == digest:
+            counts = cached["counts"]
+        else:
+            counts = _parse_checklist(path)
+        fresh_cache[key] = {"sha256": digest, "counts": counts}
+        checklists.append({"file": path.name, **counts, "status": "PASS" if counts["incomplete"] == 0 else "FAIL"})
+    if fresh_cache != cache:
+        store_project_cache(project_root, "checklists.json", fresh_cache)
+    return {
+        "feature_dir": str(feature_dir),
+        "checklists": checklists,
+        "total": sum(c["total"] for c in checklists),
+        "completed": sum(c["completed"] for c in checklists),
+        "incomplete": sum(c["incomplete"] for c in checklists),
+        "passed": all(c["incomplete"] == 0 for c in checklists),
+    }
+
+checklists_app = typer.Typer(name="checklists", help="Работа с чек-листами фичи (`FEATURE_DIR/checklists/`)", add_completion=False)
+app.add_typer(checklists_app)
+
+@checklists_app.command("status")
+def checklists_status(
+    feature: str = typer.Option(None, "--feature", help="Фича (номер или имя директории в specs/); по умолчанию - из SPECIFY_FEATURE или текущей ветки git"),
+    json_output: bool = typer.Option(False, "--json", help="Вывод статуса событием JSON Lines в stdout"),
+):
+    """Статус чек-листов фичи: всего, выполнено и не выполнено пунктов по каждому файлу.
+
+    Используется шагом 2 /speckit.implement вместо ручного подсчета пунктов агентом.
+    """
+    if json_output:
+        enable_json_output()
+    project_root = _require_project_root()
+    try:
+        project_root, feature_dir = resolve_feature(project_root, feature)
+    except ValueError as e:
+        exit_with_error(str(e))
+
+    status = checklist_status(project_root, feature_dir)
+    if json_output:
+        emit_event("checklists", **status)
+        return
+
+    if not status["checklists"]:
+        console.print(f"[yellow]В {feature_dir.name} нет чек-листов[/yellow]")
+        return
+    table = Table(title=f"Чек-листы {feature_dir.name}", show_lines=False)
+    table.add_column("Чек-лист", style="cyan")
+    table.add_column("Всего", justify="right")
+    table.add_column("Выполнено", justify="right")
+    table.add_column("Не выполнено", justify="right")
+    table.add_column("Статус")
+    for item in status["checklists"]:
+        mark = "[green]✓ PASS[/green]" if item["status"] == "PASS" else "[red]✗ FAIL[/red]"
+        table.add_row(item["file"], str(item["total"]), str(item["completed"]), str(item["incomplete"]), mark)
+    console.print(table)
+    overall = "[green]PASS[/green]" if status["passed"] else "[red]FAIL[/red]"
+    console.print(f"Общий статус: {overall}")
+
+CONTEXT_PACK_VERSION = 1
+CONTEXT_PACK_DEFAULT_BUDGET = 8000
+# Порядок и вес артефактов: выше вес - раньше попадает в бюджет
+CONTEXT_ARTIFACT_WEIGHTS = {
+    "constitution.md": 1.0,
+    "spec.md": 1.0,
+    "plan.md": 0.9,
+    "tasks.md": 0.8,
+    "data-model.md": 0.7,
+    "contracts": 0.6,
+    "research.md": 0.5,
+    "quickstart.md": 0.4,
+}
+CONTEXT_KEY_HEADINGS = re.compile(
+    r"требовани|истори|принцип|ограничени|архитектур|структур|сущност|критери|приемк|"
+    r"requirement|stor(y|ies)|principle|constraint|architecture|structure|entit|acceptance",
+    re.IGNORECASE,
+)
+TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+HTML_COMMENT = re.compile(r"<!--.*?-->", re.DOTALL)
+
+def estimate_tokens(text: str) -> int:
+    """Приближенное число токенов без внешнего токенизатора.
+
+    Слово из ASCII считается по 4 символа на токен, прочие слова (кириллица) - по 3,
+    каждый знак пунктуации - отдельный токен. Погрешность для BPE-токенизаторов около 10-15%.
+    """
+    count = 0
+    for token in TOKEN_PATTERN.findall(text):
+        if token[0].isalnum() or token[0] == "_":
+            count += (len(token) + 3) // 4 if token.isascii() else (len(token) + 2) // 3
+        else:
+            count += 1
+    return count
+
+def _context_sources(project_root: Path, feature_dir: Path) -> list[tuple[str, Path]]:
+    sources = []
+    constitution = project_root / ".specify" / "memory" / "constitution.md"
+    if constitution.is_file():
+        sources.append(("constitution.md", constitution))
+    for name in ("spec.md", "plan.md", "tasks.md", "data-model.md", "research.md", "quickstart.md"):
+        if (feature_dir / name).is_file():
+            sources.append((name, feature_dir / name))
+    contracts = feature_dir / "contracts"
+    if contracts.is_dir():
+        sources.extend(("contracts", path) for path in sorted(contracts.rglob("*")) if path.is_file())
+    return sources
+
+def build_context_pack(project_root: Path, feature_dir: Path, budget: int) -> dict:
+    """Собирает артефакты фичи в один Markdown-файл, укладывающийся в бюджет токенов.
+
+    Артефакты режутся на секции по заголовкам; HTML-комментарии шаблонов и пустые секции
+    отбрасываются, одинаковые по содержимому секции включаются один раз. Секции отбираются
+    по весу артефакта (с бонусом за ключевые заголовки: требования, истории, принципы, архитектура)
+    и выводятся в исходном порядке; не вошедшие перечисляются в конце с номерами строк.
+
+    Результат кэшируется в `.specify/cache/context/` по хешу содержимого исходных файлов и бюджету.
+
+    Returns:
+        {"path", "tokens", "budget", "cached", "included", "omitted"}
+    """
+    sources = _context_sources(project_root, feature_dir)
+    key_hash = hashlib.sha256(f"{CONTEXT_PACK_VERSION}:{budget}".encode())
+    for _, path in sources:
+        key_hash.update(path.relative_to(project_root).as_posix().encode())
+        key_hash.update(_file_digest(path))
+    key = key_hash.hexdigest()
+
+    context_dir = project_cache_dir(project_root) / "context"
+    context_dir.mkdir(exist_ok=True)
+    pack_file = context_dir / f"{feature_dir.name}.md"
+    meta_file = context_dir / f"{feature_dir.name}.json"
+    try:
+        meta = json.loads(meta_file.read_text(encoding="utf-8"))
+        if meta.get("key") == key and pack_file.is_file():
+            record_cache_lookup("context-pack", hits=1)
+            return {"path": str(pack_file), **meta["stats"], "cached": True}
+    except (OSError, ValueError, KeyError):
+        pass
+    record_cache_lookup("context-pack", misses=1)
+
+    sections = []
+    seen = set()
+    for kind, path in sources:
+        rel = path.relative_to(project_root).as_posix()
+        text = HTML_COMMENT.sub("", path.read_text(encoding="utf-8", errors="replace"))
+        parts = split_markdown_sections(text) if path.suffix == ".md" else [("", 1, text.strip())]
+        for heading, line, body in parts:
+            if not body:
+                continue
+            fingerprint = hashlib.sha1(" ".join(body.lower().split()).encode()).digest()
+            if fingerprint in seen:
+                continue
+            seen.add(fingerprint)
+            if path.suffix != ".md":
+                body = f"```{path.suffix.lstrip('.')}\n{body}\n```"
+            block = f"#### {heading or path.name} ({rel}:{line})\n\n{body}\n"
+            weight = CONTEXT_ARTIFACT_WEIGHTS[kind] * (1.5 if CONTEXT_KEY_HEADINGS.search(heading) else 1.0)
+            sections.append({"order": len(sections), "rel": rel, "heading": heading or path.name, "line": line,
+                             "block": block, "tokens": estimate_tokens(block), "weight": weight})
+
+    def render(chosen: set[int]) -> str:
+        parts = [f"# Контекстный пакет: {feature_dir.name}\n\n"]
+        current_file = None
+        for section in sections:
+            if section["order"] not in chosen:
+                continue
+            if section["rel"] != current_file:
+                current_file = section["rel"]
+                parts.append(f"## {current_file}\n\n")
+            parts.append(section["block"] + "\n")
+        omitted = [s for s in sections if s["order"] not in chosen]
+        if omitted:
+            parts.append("## Не вошло в бюджет (загружайте по необходимости)\n\n")
+            parts.extend(f"- {s['rel']}:{s['line']} {s['heading']} (~{s['tokens']} токенов)\n" for s in omitted)
+        return "".join(parts)
+
+    ranked = sorted(sections, key=lambda s: (-s["weight"], s["order"]))
+    chosen: list[dict] = []
+    remaining = budget
+    for section in ranked:
+        if section["tokens"] <= remaining:
+            chosen.append(section)
+            remaining -= section["tokens"]
+    # Заголовки файлов и список пропущенных секций тоже занимают бюджет: убираем наименее важные секции, пока не уложимся
+    content = render({s["order"] for s in chosen})
+    while chosen and estimate_tokens(content) > budget:
+        chosen.pop()
+        content = render({s["order"] for s in chosen})
+    omitted = len(sections) - len(chosen)
+
+    stats = {"tokens": estimate_tokens(content), "budget": budget, "included": len(chosen), "omitted": omitted}
+    pack_file.write_text(content, encoding="utf-8")
+    meta_file.write_text(json.dumps({"key": key, "stats": stats}), encoding="utf-8")
+    return {"path": str(pack_file), **stats, "cached": False}
+
+@app.command("context-pack")
+def context_pack(
+    budget: int = typer.Option(CONTEXT_PACK_DEFAULT_BUDGET, "--budget", min=500, help="Бюджет токенов пакета"),
+    feature: str = typer.Option(None, "--feature", help="Фича (номер или имя директории в specs/); по умолчанию - из SPECIFY_FEATURE или текущей ветки git"),
+    json_output: bool = typer.Option(False, "--json", help="Вывод результата событием JSON Lines в stdout"),
+):
+    """Собирает конституцию и артефакты фичи в один файл в пределах бюджета токенов.
+
+    Шаблоны команд читают этот файл вместо полной загрузки spec, plan, data-model, research и contracts.
+    """
+    if json_output:
+        enable_json_output()
+    project_root = _require_project_root()
+    try:
+        project_root, feature_dir = resolve_feature(project_root, feature)
+    except ValueError as e:
+        exit_with_error(str(e))
+
+    result = build_context_pack(project_root, feature_dir, budget)
+    if json_output:
+        emit_event("context_pack", **result)
+        return
+    cached = " [bright_black](из кэша)[/bright_black]" if result["cached"] else ""
+    console.print(f"[green]Контекстный пакет:[/green] {result['path']}{cached}")
+    console.print(f"~{result['tokens']} из {result['budget']} токенов, секций: {result['included']}, пропущено: {result['omitted']}")
+
+DEPENDENCY_FILE = "deps.json"
+DERIVED_ARTIFACTS = ("plan.md", "tasks.md")
+DERIVED_FROM_COMMENT = re.compile(r"<!--\s*derived-from:\s*(.*?)\s*-->", re.IGNORECASE)
+STORY_REF = re.compile(r"\[US(\d+)\]|(?:Пользовательская история|User Story)\s+(\d+)", re.IGNORECASE)
+DEPENDENCY_MIN_COMMON_TERMS = 3
+
+def _section_hash(text: str) -> str:
+    return hashlib.sha256(" ".join(text.split()).encode()).hexdigest()[:16]
+
+def _section_keys(sections: list[tuple[str, int, str]]) -> list[tuple[str, int, str]]:
+    """Делает пути заголовков уникальными: повторный заголовок получает порядковый номер ("Тесты (2)")."""
+    seen: dict[str, int] = {}
+    keyed = []
+    for heading, line, body in sections:
+        if not heading:
+            continue
+        seen[heading] = seen.get(heading, 0) + 1
+        keyed.append((heading if seen[heading] == 1 else f"{heading} ({seen[heading]})", line, body))
+    return keyed
+
+def _spec_units(spec_text: str) -> tuple[dict[str, str], dict[str, str], dict[str, set[str]]]:
+    """Делит spec.md на единицы отслеживания: секции по заголовкам и отдельные требования FR/NFR/SC.
+
+    Returns:
+        (хеши единиц, псевдонимы историй USn -> заголовок, ключевые слова секций)
+    """
+    hashes, stories, terms = {}, {}, {}
+    for heading, _, body in _section_keys(split_markdown_sections(spec_text)):
+        # Требования отслеживаются по отдельности, поэтому правка одного FR не делает устаревшей всю секцию
+        own_text = "\n".join(line for line in body.splitlines() if not REQUIREMENT_LINE.match(line))
+        hashes[heading] = _section_hash(own_text)
+        terms[heading] = set(_analysis_terms(own_text))
+        story = USER_STORY_HEADING.match("### " + heading.rsplit(" > ", 1)[-1])
+        if story:
+            stories[f"US{story.group(1)}"] = heading
+    for line in spec_text.splitlines():
+        req = REQUIREMENT_LINE.match(line)
+        if req:
+            hashes[req.group(1)] = _section_hash(req.group(2))
+    return hashes, stories, terms
+
+def _derive_sources(body: str, hashes: dict, stories: dict, terms: dict) -> list[str]:
+    """Определяет, из каких единиц spec.md выведена секция плана или задач.
+
+    Явная пометка `<!-- derived-from: FR-001, US2, Заголовок -->` имеет приоритет; иначе источники
+    выводятся из ссылок на ID требований, историй и пересечения ключевых слов с секциями спецификации.
+    Секция без найденных источников зависит от спецификации целиком ("*").
+    """
+    sources: set[str] = set()
+    explicit = DERIVED_FROM_COMMENT.search(body)
+    if explicit:
+        for item in (part.strip() for part in explicit.group(1).split(",")):
+            if item in hashes:
+                sources.add(item)
+            elif item.upper() in stories:
+                sources.add(stories[item.upper()])
+            else:
+                sources.update(h for h in terms if item.lower() in h.lower())
+        return sorted(sources) or ["*"]
+    sources.update(ref for ref in REQUIREMENT_REF.findall(body) if ref in hashes)
+    for match in STORY_REF.finditer(body):
+        alias = f"US{match.group(1) or match.group(2)}"
+        if alias in stories:
+            sources.add(stories[alias])
+    body_terms = set(_analysis_terms(body))
+    for heading, spec_terms in terms.items():
+        if len(body_terms & spec_terms) >= DEPENDENCY_MIN_COMMON_TERMS and heading not in sources:
+            sources.add(heading)
+    return sorted(sources) or ["*"]
+
+def record_dependencies(feature_dir: Path) -> dict:
+    """Сохраняет в `FEATURE_DIR/deps.json` хеши единиц spec.md и источники каждой секции plan.md и tasks.md."""
+    spec_file = feature_dir / "spec.md"
+    if not spec_file.is_file():
+        raise FileNotFoundError(f"spec.md не найден в {feature_dir}")
+    hashes, stories, terms = _spec_units(spec_file.read_text(encoding="utf-8"))
+    derived = {}
+    for name in DERIVED_ARTIFACTS:
+        path = feature_dir / name
+        if not path.is_file():
+            continue
+        derived[name] = {
+            key: _derive_sources(body, hashes, stories, terms)
+            for key, _, body in _section_keys(split_markdown_sections(path.read_text(encoding="utf-8")))
+        }
+    deps = {"version": 1, "spec": hashes, "derived": derived}
+    (feature_dir / DEPENDENCY_FILE).write_text(json.dumps(deps, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+    return deps
+
+def diff_impact(feature_dir: Path) -> dict:
+    """Сравнивает spec.md с записанным `deps.json` и находит устаревшие секции plan.md и tasks.md.
+
+    Секция устарела, если изменилась, появилась или исчезла хотя бы одна единица spec.md, из которой
+    она выведена; секции, зависящие от всей спецификации ("*" - источники не определены), устаревают
+    при любом изменении spec.md. Повторяющиеся заголовки различаются порядковым номером (`_section_keys`).
+
+    Returns:
+        {"baseline": bool, "spec": {"changed", "added", "removed"}, "stale": [{file, section, line, because}]}
+    """
+    empty = {"changed": [], "added": [], "removed": []}
+    try:
+        deps = json.loads((feature_dir / DEPENDENCY_FILE).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {"feature_dir": str(feature_dir), "baseline": False, "spec": empty, "stale": []}
+    spec_file = feature_dir / "spec.md"
+    current = _spec_units(spec_file.read_text(encoding="utf-8"))[0] if spec_file.is_file() else {}
+    recorded = deps.get("spec", {})
+    spec = {
+        "changed": [key for key in recorded if key in current and current[key] != recorded[key]],
+        "added": [key for key in current if key not in recorded],
+        "removed": [key for key in recorded if key not in current],
+    }
+    touched = set(spec["changed"]) | set(spec["removed"])
+    spec_changed = bool(touched or spec["added"])
+
+    stale = []
+    for name, sections in deps.get("derived", {}).items():
+        path = feature_dir / name
+        lines = {}
+        if path.is_file():
+            lines = {key: line for key, line, _ in _section_keys(split_markdown_sections(path.read_text(encoding="utf-8")))}
+        for heading, sources in sections.items():
+            because = ["*"] if sources == ["*"] and spec_changed else [src for src in sources if src in touched]
+            if because:
+                stale.append({"file": name, "section": heading, "line": lines.get(heading), "because": because})
+    return {"feature_dir": str(feature_dir), "baseline": True, "spec": spec, "stale": stale}
+
+@app.command("diff-impact")
+def diff_impact_command(
+    feature: str = typer.Option(None, "--feature", help="Фича (номер или имя директории в specs/); по умолчанию - из SPECIFY_FEATURE или текущей ветки git"),
+    record: bool = typer.Option(False, "--record", help="Записать текущее состояние spec.md, plan.md и tasks.md как актуальное"),
+    json_output: bool = typer.Option(False, "--json", help="Вывод отчета событием JSON Lines в stdout"),
+):
+    """Показывает, какие секции plan.md и tasks.md устарели после правок spec.md.
+
+    Опирается на `FEATURE_DIR/deps.json`, который записывается через --record после генерации плана и задач.
+    """
+    if json_output:
+        enable_json_output()
+    project_root = _require_project_root()
+    try:
+        project_root, feature_dir = resolve_feature(project_root, feature)
+    except ValueError as e:
+        exit_with_error(str(e))
+
+    if record:
+        try:
+            deps = record_dependencies(feature_dir)
+        except FileNotFoundError as e:
+            exit_with_error(str(e))
+        sections = sum(len(s) for s in deps["derived"].values())
+        emit_event("recorded", path=str(feature_dir / DEPENDENCY_FILE), spec_units=len(deps["spec"]), derived_sections=sections)
+        console.print(f"[green]Зависимости записаны:[/green] {feature_dir / DEPENDENCY_FILE} (единиц спецификации: {len(deps['spec'])}, производных секций: {sections})")
+        return
+
+    report = diff_impact(feature_dir)
+    if json_output:
+        emit_event("impact", **report)
+        return
+    if not report["baseline"]:
+        console.print(f"[yellow]Для {feature_dir.name} нет {DEPENDENCY_FILE}.[/yellow] Запустите [cyan]specify diff-impact --record[/cyan] после генерации плана и задач")
+        return
+    spec = report["spec"]
+    for label, keys in (("Изменено", spec["changed"]), ("Добавлено", spec["added"]), ("Удалено", spec["removed"])):
+        if keys:
+            console.print(f"[cyan]{label} в spec.md:[/cyan] {escape(', '.join(keys))}")
+    if not report["stale"]:
+        console.print("[green]Все секции plan.md и tasks.md актуальны[/green]")
+        return
+    table = Table(title="Устаревшие секции")
+    table.add_column("Файл", style="cyan")
+    table.add_column("Секция")
+    table.add_column("Строка", justify="right")
+    table.add_column("Из-за", style="yellow")
+    for item in report["stale"]:
+        table.add_row(item["file"], escape(item["section"]), str(item["line"] or "—"), escape(", ".join(item["because"])))
+    console.print(table)
+
+GITHUB_API_URL = "https://api.github.com"
+GITHUB_API_URL_ENV = "SPECIFY_GITHUB_API_URL"
+ISSUES_LEDGER_FILE = "issues.json"
+ISSUE_CONCURRENCY_DEFAULT = 2
+ISSUE_MIN_INTERVAL = 1.0  # секунды между созданиями issue: GitHub просит не создавать контент чаще раза в секунду
+ISSUE_SECONDARY_LIMIT_WAIT = 60.0  # пауза при вторичном лимите без Retry-After, удваивается с каждой попыткой
+ISSUE_MAX_WAIT = 900.0  # дольше не ждем: прогон останавливается, продолжить можно повторным запуском
+GITHUB_REMOTE = re.compile(r"^(?:https?://|ssh://)?(?:[^@/]+@)?([^/:]+)[/:]([^/]+)/([^/]+?)(?:\.git)?/?$")
+
+def _github_repo_from_remote(project_root: Path) -> tuple[str, str] | None:
+    """Возвращает (хост, "owner/repo") из `remote.origin.url` или None, если remote не задан."""
+    try:
+        result = subprocess.run(["git", "config", "--get", "remote.origin.url"], cwd=project_root, capture_output=True, text=True, check=True)
+    except (subprocess.CalledProcessError, FileNotFoundError):
+        return None
+    match = GITHUB_REMOTE.match(result.stdout.strip())
+    if not match:
+        return None
+    return match.group(1).lower(), f"{match.group(2)}/{match.group(3)}"
+
+def _issue_marker(feature_dir: Path, task_id: str) -> str:
+    return f"speckit-task: {feature_dir.name}/{task_id}"
+
+def _issue_payload(project_root: Path, feature_dir: Path, task: dict, labels: list[str]) -> dict:
+    rel = (feature_dir / "tasks.md").relative_to(project_root).as_posix()
+    lines = [f"**Задача**: {task['id']} — {task['text']}", f"**Фича**: `{feature_dir.name}` ({rel}:{task['line']})"]
+    if task["phase"]:
+        lines.append(f"**Фаза**: {task['phase']}")
+    if task["stories"]:
+        lines.append(f"**История**: {', '.join(task['stories'])}")
+    if task["refs"]:
+        lines.append(f"**Требования**: {', '.join(task['refs'])}")
+    if task["parallel"]:
+        lines.append("**Можно выполнять параллельно**: да")
+    lines.append(f"\n<!-- {_issue_marker(feature_dir, task['id'])} -->")
+    payload = {"title": f"{task['id']} {task['text']}"[:256], "body": "\n".join(lines)}
+    if labels:
+        payload["labels"] = labels
+    return payload
+
+def _load_issue_ledger(feature_dir: Path, repo: str) -> dict:
+    """Читает `FEATURE_DIR/issues.json` и возвращает записи для `repo`: {task_id: {"number", "url"} или {"pending": true}}."""
+    try:
+        data = json.loads((feature_dir / ISSUES_LEDGER_FILE).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    entries = data.get(repo, {}) if isinstance(data, dict) else {}
+    return entries if isinstance(entries, dict) else {}
+
+def _store_issue_ledger(feature_dir: Path, repo: str, entries: dict) -> None:
+    ledger_file = feature_dir / ISSUES_LEDGER_FILE
+    try:
+        data = json.loads(ledger_file.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        data = {}
+    data[repo] = dict(sorted(entries.items()))
+    tmp_file = _atomic_tmp_path(ledger_file)
+    tmp_file.write_text(json.dumps(data, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+    os.replace(tmp_file, ledger_file)
+
+def _issue_rate_limit_wait(response: httpx.Response, attempt: int) -> float | None:
+    """Пауза перед повтором создания issue при первичном или вторичном ограничении скорости; None - не ограничение."""
+    if response.status_code not in (403, 429):
+        return None
+    rate_info = _parse_rate_limit_headers(response.headers)
+    if "retry_after_seconds" in rate_info:
+        return float(rate_info["retry_after_seconds"])
+    if rate_info.get("remaining") == "0" and "reset_epoch" in rate_info:
+        return max(0.0, rate_info["reset_epoch"] - time.time()) + 1.0
+    if response.status_code == 429 or "rate limit" in response.text.lower():
+        return ISSUE_SECONDARY_LIMIT_WAIT * (2 ** attempt)
+    return None
+
+def _github_error_message(response: httpx.Response) -> str:
+    try:
+        message = response.json().get("message")
+    except ValueError:
+        message = None
+    return f"HTTP {response.status_code}: {message or ' '.join(response.text.split())[:200]}"
+
+class _RequestPacer:
+    """Общий темп запросов для всех воркеров: минимальный интервал между запросами и общая пауза при ограничении скорости."""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._next = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self) -> None:
+        async with self._lock:
+            now = time.monotonic()
+            delay = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def pause(self, seconds: float) -> None:
+        self._next = max(self._next, time.monotonic() + seconds)
+
+class IssueExportStopped(Exception):
+    """Прогон остановлен: ошибка доступа или слишком долгое ожидание лимита. Прогресс сохранен в журнале."""
+
+async def _find_issue_by_marker(aclient: httpx.AsyncClient, api_url: str, repo: str, marker: str, headers: dict) -> dict | None:
+    # Поиск нужен только для задач, прерванных между отправкой запроса и записью в журнал
+    response = await aclient.get(f"{api_url}/search/issues", params={"q": f'repo:{repo} in:body "{marker}"'}, headers=headers, timeout=30)
+    if response.status_code != 200:
+        return None
+    items = response.json().get("items", [])
+    return items[0] if items else None
+
+async def _create_issue(aclient: httpx.AsyncClient, api_url: str, repo: str, payload: dict, headers: dict, pacer: _RequestPacer) -> dict:
+    for attempt in range(RETRY_MAX_ATTEMPTS):
+        await pacer.wait()
+        # Сетевые ошибки POST не повторяются: issue мог быть создан, задача останется в журнале как pending
+        response = await aclient.post(f"{api_url}/repos/{repo}/issues", json=payload, headers=headers, timeout=30)
+        if response.status_code == 201:
+            return response.json()
+        if response.status_code in (401, 404, 410) or (response.status_code == 403 and _issue_rate_limit_wait(response, attempt) is None):
+            raise IssueExportStopped(f"GitHub отклонил создание issue в {repo}: {_github_error_message(response)}")
+        delay = _issue_rate_limit_wait(response, attempt)
+        if delay is None and response.status_code in RETRYABLE_STATUS_CODES:
+            delay = _retry_delay(attempt)
+        if delay is None:
+            raise ValueError(_github_error_message(response))
+        if delay > ISSUE_MAX_WAIT or attempt == RETRY_MAX_ATTEMPTS - 1:
+            raise IssueExportStopped(f"Ограничение скорости GitHub: повтор возможен через {delay:.0f} с. Запустите команду снова позже")
+        pacer.pause(delay)
+    raise IssueExportStopped("Исчерпаны попытки создания issue")
+
+async def export_tasks_to_issues(project_root: Path, feature_dir: Path, tasks: list[dict], *, repo: str, api_url: str,
+                                 headers: dict, labels: list[str], concurrency: int, on_result=None) -> dict:
+    """Создает GitHub issues для задач с ограниченным параллелизмом.
+
+    Журнал `FEATURE_DIR/issues.json` обновляется после каждой задачи, поэтому повторный запуск
+    пропускает уже созданные issues и продолжает с места остановки. Задача отмечается pending
+    до отправки запроса; при следующем запуске такие задачи сначала ищутся по маркеру в теле issue.
+
+    Returns:
+        Счетчики {"created", "linked", "failed", "remaining"}; remaining > 0 означает, что прогон был остановлен.
+    """
+    entries = _load_issue_ledger(feature_dir, repo)
+    counts = {"created": 0, "linked": 0, "failed": 0, "remaining": 0}
+    report = on_result or (lambda task, status, **fields: None)
+    pacer = _RequestPacer(ISSUE_MIN_INTERVAL)
+    queue: asyncio.Queue = asyncio.Queue()
+    for task in tasks:
+        queue.put_nowait(task)
+    stop: list[str] = []
+
+    async def worker(aclient: httpx.AsyncClient) -> None:
+        while not stop:
+            try:
+                task = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            marker = _issue_marker(feature_dir, task["id"])
+            try:
+                if entries.get(task["id"], {}).get("pending"):
+                    found = await _find_issue_by_marker(aclient, api_url, repo, marker, headers)
+                    if found:
+                        entries[task["id"]] = {"number": found["number"], "url": found["html_url"]}
+                        _store_issue_ledger(feature_dir, repo, entries)
+                        counts["linked"] += 1
+                        report(task, "linked", number=found["number"], url=found["html_url"])
+                        continue
+                entries[task["id"]] = {"pending": True}
+                _store_issue_ledger(feature_dir, repo, entries)
+                issue = await _create_issue(aclient, api_url, repo, _issue_payload(project_root, feature_dir, task, labels), headers, pacer)
+            except IssueExportStopped as e:
+                stop.append(str(e))
+                queue.put_nowait(task)
+                return
+            except (ValueError, httpx.HTTPError) as e:
+                if isinstance(e, ValueError):
+                    # GitHub ответил отказом - issue точно не создан
+                    entries.pop(task["id"], None)
+                    _store_issue_ledger(feature_dir, repo, entries)
+                counts["failed"] += 1
+                report(task, "failed", error=str(e))
+                continue
+            entries[task["id"]] = {"number": issue["number"], "url": issue["html_url"]}
+            _store_issue_ledger(feature_dir, repo, entries)
+            counts["created"] += 1
+            report(task, "created", number=issue["number"], url=issue["html_url"])
+
+    async with httpx.AsyncClient(verify=ssl_context) as aclient:
+        await asyncio.gather(*(worker(aclient) for _ in range(concurrency)))
+    counts["remaining"] = queue.qsize()
+    if stop:
+        counts["stopped"] = stop[0]
+    return counts
+
+tasks_app = typer.Typer(name="tasks", help="Работа с задачами фичи (tasks.md)", add_completion=False)
+app.add_typer(tasks_app)
+
+@tasks_app.command("to-issues")
+def tasks_to_issues(
+    feature: str = typer.Option(None, "--feature", help="Фича (номер или имя директории в specs/); по умолчанию - из SPECIFY_FEATURE или текущей ветки git"),
+    labels: list[str] = typer.Option(None, "--label", help="Метка для создаваемых issues (можно указать несколько раз)"),
+    concurrency: int = typer.Option(ISSUE_CONCURRENCY_DEFAULT, "--concurrency", min=1, max=8, help="Число одновременных запросов к GitHub API"),
+    include_done: bool = typer.Option(False, "--include-done", help="Создавать issues и для выполненных задач [X]"),
+    dry_run: bool = typer.Option(False, "--dry-run", help="Показать, какие issues будут созданы, без обращения к GitHub"),
+    github_token: str = typer.Option(None, "--github-token", help="Токен GitHub для API-запросов (или установите переменную окружения GH_TOKEN или GITHUB_TOKEN)"),
+    json_output: bool = typer.Option(False, "--json", help="Вывод событий JSON Lines в stdout"),
+):
+    """Создает GitHub issues для задач из tasks.md в репозитории из `remote.origin.url`.
+
+    Уже связанные задачи (номер issue в строке задачи или запись в `FEATURE_DIR/issues.json`) пропускаются,
+    поэтому прерванный прогон можно просто запустить снова. Запросы идут с ограниченным параллелизмом
+    и общей паузой при ограничениях скорости GitHub.
+    """
+    if json_output:
+        enable_json_output()
+    project_root = _require_project_root()
+    try:
+        project_root, feature_dir = resolve_feature(project_root, feature)
+    except ValueError as e:
+        exit_with_error(str(e))
+    tasks_file = feature_dir / "tasks.md"
+    if not tasks_file.is_file():
+        exit_with_error(f"tasks.md не найден в {feature_dir}. Сначала запустите /speckit.tasks")
+
+    api_url = (os.getenv(GITHUB_API_URL_ENV) or GITHUB_API_URL).rstrip("/")
+    remote = _github_repo_from_remote(project_root)
+    if remote is None:
+        exit_with_error("Не удалось определить репозиторий: remote.origin.url не задан или не похож на URL GitHub")
+    host, repo = remote
+    # Issues создаются только в репозитории из remote; другой хост допустим лишь при явно заданном API (GitHub Enterprise)
+    if host != "github.com" and not os.getenv(GITHUB_API_URL_ENV):
+        exit_with_error(f"Remote указывает на {host}, а не на github.com. Для GitHub Enterprise задайте {GITHUB_API_URL_ENV}")
+
+    entries = _load_issue_ledger(feature_dir, repo)
+    pending, skipped = [], 0
+    for task in parse_tasks(tasks_file):
+        if (task["done"] and not include_done) or task["issue"] or "number" in entries.get(task["id"], {}):
+            skipped += 1
+            continue
+        pending.append(task)
+
+    emit_event("start", command="tasks to-issues", repo=repo, feature=feature_dir.name, tasks=len(pending), skipped=skipped)
+    if dry_run or not pending:
+        for task in pending:
+            emit_event("issue", task=task["id"], status="planned", title=_issue_payload(project_root, feature_dir, task, labels or [])["title"])
+            console.print(f"[cyan]{task['id']}[/cyan] {escape(task['text'])}")
+        emit_event("result", ok=True, dry_run=dry_run, planned=len(pending), skipped=skipped)
+        console.print(f"[bold]{repo}[/bold]: к созданию {len(pending)}, пропущено {skipped}" + (" [bright_black](пробный запуск)[/bright_black]" if dry_run else ""))
+        return
+
+    if not _github_token(github_token):
+        exit_with_error("Для создания issues нужен токен GitHub: --github-token или GH_TOKEN/GITHUB_TOKEN")
+    headers = {"Accept": "application/vnd.github+json", "X-GitHub-Api-Version": "2022-11-28", **_github_auth_headers(github_token)}
+
+    progress = Progress(SpinnerColumn(), TextColumn("[progress.description]{task.description}"), BarColumn(), TextColumn("{task.completed}/{task.total}"), console=console, transient=True)
+
+    def on_result(task: dict, status: str, **fields) -> None:
+        emit_event("issue", task=task["id"], status=status, **fields)
+        progress.advance(progress_task)
+        if status == "failed":
+            progress.console.print(f"[red]{task['id']}[/red]: {escape(fields.get('error', ''))}")
+
+    with progress:
+        progress_task = progress.add_task(f"Создание issues в {repo}", total=len(pending))
+        counts = asyncio.run(export_tasks_to_issues(
+            project_root, feature_dir, pending, repo=repo, api_url=api_url, headers=headers,
+            labels=labels or [], concurrency=concurrency, on_result=on_result,
+        ))
+
+    stopped = counts.pop("stopped", None)
+    emit_event("result", ok=not stopped and counts["failed"] == 0, skipped=skipped, **counts, **({"error": stopped} if stopped else {}))
+    console.print(f"[bold]{repo}[/bold]: создано {counts['created']}, найдено {counts['linked']}, ошибок {counts['failed']}, пропущено {skipped}")
+    if stopped:
+        console.print(f"[yellow]{escape(stopped)}[/yellow]\nОсталось задач: {counts['remaining']}; повторный запуск продолжит с места остановки")
+        raise typer.Exit(1)
+    if counts["failed"]:
+        raise typer.Exit(1)
+
+AGENT_CONTEXT_PATHS = (
+    "CLAUDE.md",
+    "GEMINI.md",
+    ".github/agents/copilot-instructions.md",
+    ".cursor/rules/specify-rules.mdc",
+    "QWEN.md",
+    "AGENTS.md",
+    ".windsurf/rules/specify-rules.md",
+    ".kilocode/rules/specify-rules.md",
+    ".augment/rules/specify-rules.md",
+    ".roo/rules/specify-rules.md",
+    "CODEBUDDY.md",
+    "SHAI.md",
+    "QODER.md",
+)
+# Поля плана, из которых update-agent-context строит записи (русские и исходные английские подписи)
+PLAN_CONTEXT_FIELDS = {
+    "lang": ("Язык/Версия", "Language/Version"),
+    "framework": ("Основные зависимости", "Primary Dependencies"),
+    "db": ("Хранилище", "Storage"),
+}
+PLAN_FIELD_LINE = re.compile(r"^\*\*(.+?)\*\*:\s*(.*?)\s*$")
+PLAN_FIELD_EMPTY = {"N/A", "Н/Д", ""}
+AGENT_TECH_HEADING = "## Активные технологии"
+AGENT_CHANGES_HEADING = "## Недавние изменения"
+AGENT_RECENT_CHANGES_LIMIT = 3
+AGENT_LAST_UPDATED = re.compile(r"(Последнее обновление:.*?)\d{4}-\d{2}-\d{2}")
+AGENT_CONTEXT_STATE = "agent-context.json"
+WATCH_DEBOUNCE_DEFAULT = 0.5
+WATCH_POLL_INTERVAL = 1.0
+
+def parse_plan_fields(plan_file: Path) -> dict:
+    """Извлекает из plan.md язык, зависимости и хранилище, как `extract_plan_field` в update-agent-context.sh.
+
+    Незаполненные значения (Н/Д, ТРЕБУЕТСЯ УТОЧНЕНИЕ и нетронутые подсказки шаблона в квадратных
+    скобках) возвращаются пустыми строками.
+    """
+    labels = {label: key for key, names in PLAN_CONTEXT_FIELDS.items() for label in names}
+    fields = dict.fromkeys(PLAN_CONTEXT_FIELDS, "")
+    for line in plan_file.read_text(encoding="utf-8", errors="replace").splitlines():
+        match = PLAN_FIELD_LINE.match(line)
+        if not match or match.group(1) not in labels:
+            continue
+        key, value = labels[match.group(1)], match.group(2)
+        if fields[key] or value in PLAN_FIELD_EMPTY or value.startswith("[") or AMBIGUITY_MARKERS.search(value):
+            continue
+        fields[key] = value
+    return fields
+
+def _plan_context_entries(feature: str, fields: dict) -> tuple[list[str], str | None]:
+    """Записи "Активные технологии" и "Недавние изменения" для фичи в формате update-agent-context.sh."""
+    tech_stack = " + ".join(value for value in (fields["lang"], fields["framework"]) if value)
+    tech_entries = [f"- {value} ({feature})" for value in (tech_stack, fields["db"]) if value]
+    added = tech_stack or fields["db"]
+    return tech_entries, (f"- {feature}: Добавлено {added}" if added else None)
+
+def _entry_tech(entry: str) -> str:
+    # "- Python 3.11 + FastAPI (001-feature)" -> "Python 3.11 + FastAPI"
+    return entry.rsplit(" (", 1)[0][2:]
+
+def _section_bounds(lines: list[str], heading: str) -> tuple[int, int] | None:
+    if heading not in lines:
+        return None
+    start = lines.index(heading)
+    end = next((i for i in range(start + 1, len(lines)) if lines[i].startswith("## ")), len(lines))
+    return start, end
+
+def update_agent_context_text(text: str, feature: str, *, add: list[str], remove: list[str], change: str | None, today: str) -> str:
+    """Применяет к файлу контекста агента только записи одной фичи.
+
+    Строки `remove` (ранее добавленные для этой фичи) удаляются из "Активных технологий", новые
+    технологии из `add` дописываются в конец раздела, если такой технологии там еще нет, а запись фичи в
+    "Недавних изменениях" поднимается наверх (хранятся последние три). Дата обновления
+    меняется, только если изменилось что-то еще. Отсутствующие разделы добавляются в конец.
+    """
+    lines = text.splitlines()
+    bounds = _section_bounds(lines, AGENT_TECH_HEADING)
+    if bounds:
+        start, end = bounds
+        stale = set(remove)
+        lines[start:end] = [line for line in lines[start:end] if line not in stale]
+        bounds = _section_bounds(lines, AGENT_TECH_HEADING)
+    section = "\n".join(lines[bounds[0]:bounds[1]]) if bounds else ""
+    new_tech = []
+    for entry in add:
+        if _entry_tech(entry) not in section:
+            new_tech.append(entry)
+            section += "\n" + entry
+    if new_tech:
+        if bounds is None:
+            lines += ["", AGENT_TECH_HEADING, *new_tech]
+        else:
+            start, end = bounds
+            last_entry = max((i for i in range(start, end) if lines[i].startswith("- ")), default=start)
+            lines[last_entry + 1:last_entry + 1] = new_tech
+
+    if change:
+        bounds = _section_bounds(lines, AGENT_CHANGES_HEADING)
+        if bounds is None:
+            lines += ["", AGENT_CHANGES_HEADING, change]
+        else:
+            start, end = bounds
+            first_entry = next((i for i in range(start + 1, end) if lines[i].startswith("- ")), start + 1)
+            kept = []
+            entries = 1
+            for line in lines[first_entry:end]:
+                if line.startswith("- "):
+                    if line.startswith(f"- {feature}:") or entries >= AGENT_RECENT_CHANGES_LIMIT:
+                        continue
+                    entries += 1
+                kept.append(line)
+            lines[first_entry:end] = [change, *kept]
+
+    updated = "\n".join(lines) + ("\n" if text.endswith("\n") else "")
+    if updated != text:
+        updated = AGENT_LAST_UPDATED.sub(lambda m: m.group(1) + today, updated)
+    return updated
+
+def _write_text_atomic(path: Path, text: str) -> None:
+    tmp_path = _atomic_tmp_path(path)
+    with open(tmp_path, 'w', encoding='utf-8', newline='') as f:
+        f.write(text)
+    if path.exists():
+        shutil.copymode(path, tmp_path)
+    tmp_path.replace(path)
+
+def sync_agent_context(project_root: Path, plan_files: list[Path] | None = None) -> list[dict]:
+    """Переносит изменения plan.md в существующие файлы контекста агентов.
+
+    Разобранные поля каждого плана запоминаются в `.specify/cache/agent-context.json`: план, поля
+    которого не изменились (правка текста), файлы агентов не трогает, а при изменении полей
+    старые записи этой фичи заменяются новыми. Технология, которую используют и другие фичи,
+    при этом не пропадает: вместо удаленной строки добавляется запись одной из этих фич.
+    В кэше для плана хранятся только строки, действительно присутствующие в файлах агентов.
+    Файлы агентов перезаписываются, только если их содержимое изменилось. Без `plan_files`
+    обрабатываются планы всех фич.
+
+    Returns:
+        Для каждого плана с изменившимися полями: feature, plan, fields, files (обновленные файлы агентов)
+    """
+    if plan_files is None:
+        plan_files = [feature_dir / "plan.md" for feature_dir in iter_feature_dirs(project_root)]
+    state = load_project_cache(project_root, AGENT_CONTEXT_STATE)
+    plans_state = state.setdefault("plans", {})
+    agent_files = [project_root / rel for rel in AGENT_CONTEXT_PATHS if (project_root / rel).is_file()]
+    today = datetime.now().strftime("%Y-%m-%d")
+    results = []
+
+    for plan_file in plan_files:
+        rel_plan = plan_file.relative_to(project_root).as_posix()
+        previous = plans_state.get(rel_plan)
+        if not plan_file.is_file():
+            plans_state.pop(rel_plan, None)
+            continue
+        fields = parse_plan_fields(plan_file)
+        if previous and previous["fields"] == fields:
+            continue
+        feature = plan_file.parent.name
+        tech_entries, change = _plan_context_entries(feature, fields)
+        removed = previous["entries"] if previous else []
+        # Записи других фич с технологиями из удаляемых строк: при добавлении их технология
+        # была найдена в строке этой фичи, поэтому своей строки у них может не быть
+        dropped = [_entry_tech(entry) for entry in removed]
+        inherited = {
+            other_plan: [entry for entry in _plan_context_entries(Path(other_plan).parent.name, other["fields"])[0]
+                         if any(_entry_tech(entry) in tech for tech in dropped)]
+            for other_plan, other in plans_state.items() if other_plan != rel_plan
+        }
+        add = tech_entries + [entry for entries in inherited.values() for entry in entries]
+        written: set[str] = set()
+        updated_files = []
+        for agent_file in agent_files:
+            text = agent_file.read_text(encoding="utf-8")
+            new_text = update_agent_context_text(text, feature, add=add, remove=removed, change=change, today=today)
+            written.update(line for line in new_text.splitlines() if line in add)
+            if new_text != text:
+                _write_text_atomic(agent_file, new_text)
+                updated_files.append(agent_file.relative_to(project_root).as_posix())
+        plans_state[rel_plan] = {"fields": fields, "entries": [entry for entry in tech_entries if entry in written]}
+        for other_plan, entries in inherited.items():
+            other_entries = plans_state[other_plan]["entries"]
+            other_entries.extend(entry for entry in entries if entry in written and entry not in other_entries)
+        results.append({"feature": feature, "plan": rel_plan, "fields": fields, "files": updated_files})
+
+    store_project_cache(project_root, AGENT_CONTEXT_STATE, state)
+    return results
+
+def refresh_context_packs(project_root: Path, features: set[str] | None = None) -> list[str]:
+    """Пересобирает уже созданные контекстные пакеты (`specify context-pack`) с их прежним бюджетом.
+
+    Без `features` проверяются пакеты всех фич (например, после правки конституции).
+    Возвращает имена фич, пакеты которых действительно изменились.
+    """
+    refreshed = []
+    context_dir = project_root / PROJECT_CACHE_DIR / "context"
+    if not context_dir.is_dir():
+        return refreshed
+    for meta_file in sorted(context_dir.glob("*.json")):
+        feature_dir = project_root / "specs" / meta_file.stem
+        if (features is not None and meta_file.stem not in features) or not feature_dir.is_dir():
+            continue
+        try:
+            budget = json.loads(meta_file.read_text(encoding="utf-8"))["stats"]["budget"]
+        except (OSError, ValueError, KeyError, TypeError):
+            continue
+        if not build_context_pack(project_root, feature_dir, budget)["cached"]:
+            refreshed.append(meta_file.stem)
+    return refreshed
+
+class _PollingWatcher:
+    """Отслеживает изменения файлов сравнением mtime/размера раз в `interval` секунд."""
+
+    def __init__(self, project_root: Path, interval: float = WATCH_POLL_INTERVAL):
+        self.project_root = project_root
+        self.interval = interval
+        self._snapshot = self._scan()
+
+    def _scan(self) -> dict[Path, tuple[int, int]]:
+        snapshot = {}
+        for path in _watched_files(self.project_root):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            snapshot[path] = (stat.st_mtime_ns, stat.st_size)
+        return snapshot
+
+    def wait(self, timeout: float | None) -> set[Path]:
+        time.sleep(self.interval if timeout is None else min(self.interval, timeout))
+        snapshot = self._scan()
+        changed = {path for path in snapshot.keys() | self._snapshot.keys() if snapshot.get(path) != self._snapshot.get(path)}
+        self._snapshot = snapshot
+        return changed
+
+    def close(self) -> None:
+        pass
+
+class _InotifyWatcher:
+    """Отслеживает директории `specs/*` и `.specify/memory` через inotify (Linux, через ctypes).
+
+    Следятся директории, а не файлы: редакторы часто сохраняют файл через переименование
+    временного, и наблюдение за самим файлом теряется после первой записи.
+    """
+    # IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+    FILE_EVENTS = 0x008 | 0x040 | 0x080 | 0x100 | 0x200
+    IN_ISDIR = 0x40000000
+    EVENT_HEADER = struct.Struct("iIII")
+
+    def __init__(self, project_root: Path):
+        import ctypes
+        import ctypes.util
+
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self._fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+        self._dirs: dict[int, Path] = {}
+        self.project_root = project_root
+        for directory in (project_root / ".specify" / "memory", project_root / "specs", *iter_feature_dirs(project_root)):
+            self._add(directory)
+
+    def _add(self, directory: Path) -> None:
+        if not directory.is_dir():
+            return
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(directory), self.FILE_EVENTS)
+        if wd >= 0:
+            self._dirs[wd] = directory
+
+    def wait(self, timeout: float | None) -> set[Path]:
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        if not ready:
+            return set()
+        try:
+            data = os.read(self._fd, 65536)
+        except BlockingIOError:
+            return set()
+        changed = set()
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, name_len = self.EVENT_HEADER.unpack_from(data, offset)
+            offset += self.EVENT_HEADER.size
+            name = os.fsdecode(data[offset:offset + name_len].rstrip(b"\0"))
+            offset += name_len
+            directory = self._dirs.get(wd)
+            if directory is None or not name:
+                continue
+            path = directory / name
+            if mask & self.IN_ISDIR:
+                # Новая директория фичи: начинаем следить и за ней, ее plan.md мог появиться сразу
+                if directory == self.project_root / "specs" and FEATURE_DIR_PATTERN.match(name):
+                    self._add(path)
+                    changed.add(path / "plan.md")
+                continue
+            changed.add(path)
+        return changed
+
+    def close(self) -> None:
+        os.close(self._fd)
+
+def _watched_files(project_root: Path) -> list[Path]:
+    return [project_root / ".specify" / "memory" / "constitution.md", *(feature_dir / "plan.md" for feature_dir in iter_feature_dirs(project_root))]
+
+def _is_watched_file(project_root: Path, path: Path) -> bool:
+    if path == project_root / ".specify" / "memory" / "constitution.md":
+        return True
+    return path.name == "plan.md" and path.parent.parent == project_root / "specs" and bool(FEATURE_DIR_PATTERN.match(path.parent.name))
+
+def _apply_watch_changes(project_root: Path, changed: set[Path]) -> None:
+    plans = sorted(path for path in changed if path.name == "plan.md")
+    started = time.monotonic()
+    with profile_span("watch-sync", files=len(changed)):
+        results = sync_agent_context(project_root, plans) if plans else []
+        constitution_changed = any(path.name == "constitution.md" for path in changed)
+        packs = refresh_context_packs(project_root, None if constitution_changed else {path.parent.name for path in plans})
+    updated = sorted({rel for result in results for rel in result["files"]})
+    emit_event("sync", changed=sorted(path.relative_to(project_root).as_posix() for path in changed), plans=results, agent_files=updated, context_packs=packs, duration=round(time.monotonic() - started, 6))
+    stamp = datetime.now().strftime("%H:%M:%S")
+    for path in sorted(changed):
+        console.print(f"[bright_black]{stamp}[/bright_black] изменен {path.relative_to(project_root).as_posix()}")
+    if updated:
+        console.print(f"  [green]Обновлены файлы агентов:[/green] {', '.join(updated)}")
+    elif plans:
+        console.print("  [bright_black]Технологии в планах не изменились - файлы агентов не тронуты[/bright_black]")
+    if packs:
+        console.print(f"  [green]Пересобраны контекстные пакеты:[/green] {', '.join(packs)}")
+
+@app.command()
+def watch(
+    debounce: float = typer.Option(WATCH_DEBOUNCE_DEFAULT, "--debounce", min=0.0, help="Пауза в секундах после последнего изменения перед синхронизацией (серия сохранений - одна синхронизация)"),
+    poll: bool = typer.Option(False, "--poll", help="Опрашивать файлы раз в секунду вместо inotify (например, для сетевых файловых систем)"),
+    once: bool = typer.Option(False, "--once", help="Синхронизировать планы всех фич один раз и завершиться"),
+    json_output: bool = typer.Option(False, "--json", help="Вывод синхронизаций событиями JSON Lines в stdout"),
+):
+    """Следит за specs/*/plan.md и конституцией и обновляет файлы контекста агентов без ручного запуска update-agent-context.
+
+    В CLAUDE.md, GEMINI.md, copilot-instructions и другие уже существующие файлы агентов вносятся только
+    записи измененной фичи в разделах "Активные технологии" и "Недавние изменения". Уже собранные
+    контекстные пакеты (`specify context-pack`) пересобираются. На Linux используется inotify,
+    на других системах - опрос файлов.
+    """
+    if json_output:
+        enable_json_output()
+    project_root = _require_project_root()
+    if not any((project_root / rel).is_file() for rel in AGENT_CONTEXT_PATHS):
+        console.print("[yellow]Файлы контекста агентов не найдены - будут пересобираться только контекстные пакеты.[/yellow] Создайте их командой /speckit.plan или скриптом update-agent-context.")
+
+    results = sync_agent_context(project_root)
+    updated = sorted({rel for result in results for rel in result["files"]})
+    emit_event("sync", changed=[], plans=results, agent_files=updated, context_packs=[], duration=0)
+    if updated:
+        console.print(f"[green]Файлы агентов синхронизированы с планами:[/green] {', '.join(updated)}")
+    if once:
+        return
+
+    watcher = None
+    if not poll and sys.platform.startswith("linux"):
+        try:
+            watcher = _InotifyWatcher(project_root)
+        except (OSError, AttributeError) as e:
+            console.print(f"[yellow]inotify недоступен ({e}), используется опрос файлов[/yellow]")
+    if watcher is None:
+        watcher = _PollingWatcher(project_root)
+    mode = "inotify" if isinstance(watcher, _InotifyWatcher) else "опрос"
+    emit_event("watch", root=str(project_root), mode=mode, debounce=debounce)
+    console.print(f"[cyan]Наблюдение за[/cyan] specs/*/plan.md, .specify/memory/constitution.md [bright_black]({mode}, Ctrl+C - выход)[/bright_black]")
+
+    pending: set[Path] = set()
+    deadline = None
+    try:
+        while True:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            changed = {path for path in watcher.wait(timeout) if _is_watched_file(project_root, path)}
+            if changed:
+                pending |= changed
+                deadline = time.monotonic() + debounce
+            if pending and time.monotonic() >= deadline:
+                _apply_watch_changes(project_root, pending)
+                pending = set()
+                deadline = None
+    except KeyboardInterrupt:
+        console.print("\n[cyan]Наблюдение остановлено[/cyan]")
+    finally:
+        watcher.close()
+
+STATUS_CACHE_FILE = Path(platformdirs.user_cache_dir("specify-cli")) / "status.json"
+STATUS_CACHE_VERSION = 1
+WORKSPACE_SKIP_DIRS = {"node_modules", "venv", "__pycache__", "dist", "build", "target", "vendor"}
+WORKSPACE_MAX_DEPTH = 6
+WORKSPACE_INPROCESS_MAX = 4  # столько проектов и меньше сканируются без пула процессов
+FEATURE_STAGE_LABELS = {
+    "empty": "пусто",
+    "spec": "спецификация",
+    "plan": "план",
+    "tasks": "задачи",
+    "implement": "реализация",
+    "done": "готово",
+}
+
+def discover_project_roots(base: Path, max_depth: int = WORKSPACE_MAX_DEPTH) -> list[Path]:
+    """Ищет проекты Specify (директории с `.specify/`) в дереве `base`.
+
+    Внутрь найденного проекта, скрытых директорий и типичных директорий зависимостей и сборки
+    поиск не спускается; глубина ограничена `max_depth` уровнями.
+    """
+    roots = []
+    stack = [(base.resolve(), 0)]
+    while stack:
+        directory, depth = stack.pop()
+        try:
+            with os.scandir(directory) as it:
+                entries = [entry for entry in it if entry.is_dir(follow_symlinks=False)]
+        except OSError:
+            continue
+        if any(entry.name == ".specify" for entry in entries):
+            roots.append(directory)
+            continue
+        if depth >= max_depth:
+            continue
+        for entry in entries:
+            if not entry.name.startswith(".") and entry.name not in WORKSPACE_SKIP_DIRS:
+                stack.append((Path(entry.path), depth + 1))
+    return sorted(roots)
+
+def _read_git_head(project_root: Path) -> str | None:
+    """Текущая ветка по `.git/HEAD` без запуска git (для рабочих деревьев `.git` - файл с gitdir)."""
+    git_path = project_root / ".git"
+    try:
+        if git_path.is_file():
+            git_dir = Path(git_path.read_text(encoding="utf-8").split(":", 1)[1].strip())
+            git_path = git_dir if git_dir.is_absolute() else project_root / git_dir
+        head = (git_path / "HEAD").read_text(encoding="utf-8").strip()
+    except (OSError, IndexError):
+        return None
+    return head.removeprefix("ref: refs/heads/") if head.startswith("ref: ") else head[:12]
+
+def _count_tasks(path: Path) -> dict:
+    tasks = parse_tasks(path)
+    return {"total": len(tasks), "completed": sum(1 for task in tasks if task["done"])}
+
+def _count_checklist(path: Path) -> dict:
+    counts = _parse_checklist(path)
+    return {"total": counts["total"], "completed": counts["completed"]}
+
+def _feature_stage(feature_dir: Path, tasks: dict | None) -> str:
+    if tasks is not None:
+        if tasks["total"] and tasks["completed"] == tasks["total"]:
+            return "done"
+        return "implement" if tasks["completed"] else "tasks"
+    if (feature_dir / "plan.md").is_file():
+        return "plan"
+    return "spec" if (feature_dir / "spec.md").is_file() else "empty"
+
+def scan_project_status(project_root: str, cached: dict) -> tuple[dict, dict]:
+    """Статус фич одного проекта: этап, выполнение задач tasks.md и чек-листов.
+
+    Выполняется в процессе пула `specify status --workspace`, поэтому принимает и возвращает
+    простые данные. `cached` - записи кэша проекта {относительный путь: {sig, counts}}: файл,
+    у которого не изменились mtime и размер, повторно не разбирается.
+
+    Returns:
+        (статус проекта, актуальные записи кэша проекта)
+    """
+    root = Path(project_root)
+    fresh: dict[str, dict] = {}
+
+    def counts_for(path: Path, parse) -> dict:
+        rel = path.relative_to(root).as_posix()
+        stat = path.stat()
+        sig = [stat.st_mtime_ns, stat.st_size]
+        entry = cached.get(rel)
+        counts = entry["counts"] if isinstance(entry, dict) and entry.get("sig") == sig else parse(path)
+        fresh[rel] = {"sig": sig, "counts": counts}
+        return counts
+
+    features = []
+    try:
+        for feature_dir in iter_feature_dirs(root):
+            tasks_file = feature_dir / "tasks.md"
+            tasks = counts_for(tasks_file, _count_tasks) if tasks_file.is_file() else None
+            checklists_dir = feature_dir / "checklists"
+            checklists = [counts_for(path, _count_checklist) for path in sorted(checklists_dir.glob("*.md"))] if checklists_dir.is_dir() else []
+            features.append({
+                "feature": feature_dir.name,
+                "stage": _feature_stage(feature_dir, tasks),
+                "tasks": tasks,
+                "checklists": {
+                    "files": len(checklists),
+                    "total": sum(c["total"] for c in checklists),
+                    "completed": sum(c["completed"] for c in checklists),
+                } if checklists else None,
+            })
+    except (OSError, UnicodeDecodeError) as e:
+        return {"root": project_root, "branch": _read_git_head(root), "features": features, "error": str(e)}, fresh
+    return {"root": project_root, "branch": _read_git_head(root), "features": features}, fresh
+
+def _load_status_cache() -> dict:
+    try:
+        with open(STATUS_CACHE_FILE, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError, OSError):
+        return {}
+    if not isinstance(data, dict) or data.get("version") != STATUS_CACHE_VERSION:
+        return {}
+    return data.get("projects", {})
+
+def _store_status_cache(projects: dict) -> None:
+    try:
+        STATUS_CACHE_FILE.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = _atomic_tmp_path(STATUS_CACHE_FILE)
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"version": STATUS_CACHE_VERSION, "projects": projects}, f, ensure_ascii=False)
+        tmp_path.replace(STATUS_CACHE_FILE)
+    except OSError:
+        pass
+
+def workspace_status(roots: list[Path], *, jobs: int | None = None) -> list[dict]:
+    """Сканирует проекты параллельно в пуле процессов, используя общий кэш в директории кэша `specify-cli`.
+
+    Записи кэша проектов, не вошедших в `roots`, сохраняются, поэтому сканирование одного
+    проекта не сбрасывает кэш всего рабочего пространства.
+    """
+    cache = _load_status_cache()
+    keys = [str(root) for root in roots]
+    cached = [cache.get(key, {}) for key in keys]
+    jobs = jobs or os.cpu_count() or 1
+    with profile_span("status-scan", projects=len(roots), jobs=jobs):
+        if jobs == 1 or len(roots) <= WORKSPACE_INPROCESS_MAX:
+            results = list(map(scan_project_status, keys, cached))
+        else:
+            with ProcessPoolExecutor(max_workers=jobs) as pool:
+                results = list(pool.map(scan_project_status, keys, cached, chunksize=max(1, len(keys) // (jobs * 4))))
+    fresh_cache = dict(cache)
+    for key, previous, (_, entries) in zip(keys, cached, results):
+        fresh_cache[key] = entries
+        hits = sum(1 for rel, entry in entries.items() if isinstance(previous.get(rel), dict) and previous[rel].get("sig") == entry["sig"])
+        record_cache_lookup("status", hits=hits, misses=len(entries) - hits)
+    if fresh_cache != cache:
+        _store_status_cache(fresh_cache)
+    return [status for status, _ in results]
+
+def _completion_cell(counts: dict | None) -> str:
+    if not counts:
+        return "[bright_black]-[/bright_black]"
+    color = "green" if counts["completed"] == counts["total"] else "yellow"
+    return f"[{color}]{counts['completed']}/{counts['total']}[/{color}]"
+
+@app.command()
+def status(
+    workspace: Path = typer.Option(None, "--workspace", help="Найти все проекты Specify в дереве этой директории и показать сводный статус", exists=True, file_okay=False),
+    jobs: int = typer.Option(None, "--jobs", "-j", min=1, help="Число процессов сканирования (по умолчанию - число CPU)"),
+    active: bool = typer.Option(False, "--active", help="Показывать только незавершенные фичи"),
+    json_output: bool = typer.Option(False, "--json", help="Вывод статуса событием JSON Lines в stdout"),
+):
+    """Статус фич: этап (спецификация, план, задачи, реализация, готово), выполнение задач и чек-листов.
+
+    Без --workspace показывает текущий проект. С --workspace находит все директории с `.specify/`
+    и сканирует их параллельно; результаты разбора tasks.md и чек-листов кэшируются по mtime файлов.
+    """
+    if json_output:
+        enable_json_output()
+    started = time.monotonic()
+    if workspace is not None:
+        base = workspace.resolve()
+        roots = discover_project_roots(base)
+    else:
+        roots = [_require_project_root()]
+        base = roots[0].parent
+
+    projects = workspace_status(roots, jobs=jobs)
+    if active:
+        for project in projects:
+            project["features"] = [f for f in project["features"] if f["stage"] != "done"]
+    stages = [feature["stage"] for project in projects for feature in project["features"]]
+    summary = {
+        "projects": len(projects),
+        "features": len(stages),
+        "in_progress": sum(1 for stage in stages if stage != "done"),
+        "done": stages.count("done"),
+        "duration": round(time.monotonic() - started, 6),
+    }
+    if json_output:
+        emit_event("status", projects=projects, summary=summary)
+        return
+
+    if not projects:
+        console.print(f"[yellow]Проекты Specify в {base} не найдены[/yellow]")
+        return
+    table = Table(show_header=True, header_style="bold", box=None, padding=(0, 2))
+    table.add_column("Проект", style="cyan")
+    table.add_column("Ветка", style="bright_black")
+    table.add_column("Фича")
+    table.add_column("Этап")
+    table.add_column("Задачи", justify="right")
+    table.add_column("Чек-листы", justify="right")
+    for project in projects:
+        name = Path(project["root"]).relative_to(base).as_posix() if workspace is not None else Path(project["root"]).name
+        branch = project["branch"] or ""
+        if project.get("error"):
+            table.add_row(name or ".", branch, f"[red]{escape(project['error'])}[/red]", "", "", "")
+        elif not project["features"]:
+            table.add_row(name or ".", branch, "[bright_black]нет фич[/bright_black]", "", "", "")
+        for index, feature in enumerate(project["features"]):
+            stage = FEATURE_STAGE_LABELS[feature["stage"]]
+            table.add_row(
+                (name or ".") if index == 0 else "",
+                branch if index == 0 else "",
+                feature["feature"],
+                f"[green]{stage}[/green]" if feature["stage"] == "done" else stage,
+                _completion_cell(feature["tasks"]),
+                _completion_cell(feature["checklists"]),
+            )
+    console.print(table)
+    console.print(
+        f"\n[bold]Итого:[/bold] проектов {summary['projects']}, фич {summary['features']}, "
+        f"в работе {summary['in_progress']}, готово {summary['done']} [bright_black]({summary['duration']:.2f} с)[/bright_black]"
+    )
+
+RUN_HISTORY_FILE = Path(platformdirs.user_data_dir("specify-cli")) / "history.db"
+RUN_HISTORY_ENV = "SPECIFY_HISTORY"  # "0" отключает запись истории запусков
+RUN_HISTORY_MAX_ROWS = 5000
+RUN_HISTORY_MAX_AGE_DAYS = 90
+RUN_HISTORY_LOCK_TIMEOUT = 1.0  # секунды ожидания блокировки базы параллельным запуском; дольше - запуск не записывается
+RUN_HISTORY_SKIP_COMMANDS = {"stats", "watch"}  # watch работает до прерывания, его длительность ничего не говорит
+RUN_HISTORY_RECENT_DEFAULT = 10
+RUN_HISTORY_MIN_BASELINE = 3  # меньше предыдущих запусков - регрессия не оценивается
+RUN_HISTORY_REGRESSION_RATIO = 0.2  # медиана последних запусков медленнее предыдущих на 20% и более
+RUN_HISTORY_REGRESSION_MIN_DELTA = 0.05  # секунды; более мелкие изменения - шум
+
+def run_history_enabled() -> bool:
+    return os.getenv(RUN_HISTORY_ENV, "1").strip().lower() not in {"0", "false", "no", "off"}
+
+def start_run_record(command: str) -> None:
+    """Начинает запись запуска команды в локальную историю (если она не отключена через SPECIFY_HISTORY=0)."""
+    global _run_record
+    if command in RUN_HISTORY_SKIP_COMMANDS or not run_history_enabled():
+        return
+    _run_record = RunRecord(command)
+
+def finish_run_record(exit_code: int) -> None:
+    """Сохраняет запись текущего запуска. Ошибки записи истории на команду не влияют."""
+    global _run_record
+    record, _run_record = _run_record, None
+    if record is None:
+        return
+    try:
+        store_run(record.row(exit_code))
+    except (OSError, sqlite3.Error):
+        pass
+
+def _cli_version() -> str | None:
+    try:
+        return importlib.metadata.version("specify-cli")
+    except importlib.metadata.PackageNotFoundError:
+        return None
+
+def _open_run_history() -> sqlite3.Connection:
+    RUN_HISTORY_FILE.parent.mkdir(parents=True, exist_ok=True)
+    db = sqlite3.connect(RUN_HISTORY_FILE, timeout=RUN_HISTORY_LOCK_TIMEOUT)
+    db.execute(
+        "CREATE TABLE IF NOT EXISTS runs ("
+        "id INTEGER PRIMARY KEY, started REAL NOT NULL, command TEXT NOT NULL, version TEXT, "
+        "exit_code INTEGER NOT NULL, duration REAL NOT NULL, cause TEXT, data TEXT NOT NULL)"
+    )
+    db.execute("CREATE INDEX IF NOT EXISTS runs_started ON runs (started)")
+    return db
+
+def store_run(row: dict) -> None:
+    """Добавляет запуск в `history.db` в директории данных `specify-cli` и удаляет записи сверх лимитов хранения."""
+    db = _open_run_history()
+    try:
+        with db:
+            db.execute(
+                "INSERT INTO runs (started, command, version, exit_code, duration, cause, data) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (row["started"], row["command"], _cli_version(), row["exit_code"], round(row["duration"], 4), row["cause"],
+                 json.dumps(row["data"], ensure_ascii=False, separators=(",", ":"))),
+            )
+            db.execute("DELETE FROM runs WHERE started < ?", (time.time() - RUN_HISTORY_MAX_AGE_DAYS * 86400,))
+            db.execute("DELETE FROM runs WHERE id <= (SELECT id FROM runs ORDER BY id DESC LIMIT 1 OFFSET ?)", (RUN_HISTORY_MAX_ROWS,))
+    finally:
+        db.close()
+
+def load_run_history(*, days: int, command: str | None = None) -> list[dict]:
+    """Запуски за последние `days` дней в порядке записи."""
+    if not RUN_HISTORY_FILE.is_file():
+        return []
+    query = "SELECT started, command, version, exit_code, duration, cause, data FROM runs WHERE started >= ?"
+    params: list = [time.time() - days * 86400]
+    if command:
+        query += " AND command = ?"
+        params.append(command)
+    db = _open_run_history()
+    try:
+        rows = db.execute(query + " ORDER BY id", params).fetchall()
+    finally:
+        db.close()
+    runs = []
+    for started, name, version, exit_code, duration, cause, data in rows:
+        try:
+            data = json.loads(data)
+        except ValueError:
+            data = {}
+        runs.append({"started": started, "command": name, "version": version, "exit_code": exit_code, "duration": duration, "cause": cause, "data": data})
+    return runs
+
+def _percentile(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * q
+    low = int(position)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (position - low)
+
+def _duration_stats(values: list[float], recent: int) -> dict:
+    """p50/p95 и сравнение медианы последних `recent` значений с медианой предыдущих."""
+    stats = {"p50": round(_percentile(values, 0.5), 4), "p95": round(_percentile(values, 0.95), 4), "change": None, "regression": False}
+    if len(values) >= recent + RUN_HISTORY_MIN_BASELINE:
+        before = _percentile(values[:-recent], 0.5)
+        after = _percentile(values[-recent:], 0.5)
+        if before > 0:
+            stats["change"] = round(after / before - 1, 4)
+            stats["regression"] = stats["change"] >= RUN_HISTORY_REGRESSION_RATIO and after - before >= RUN_HISTORY_REGRESSION_MIN_DELTA
+    return stats
+
+def summarize_run_history(runs: list[dict], *, recent: int = RUN_HISTORY_RECENT_DEFAULT) -> list[dict]:
+    """Сводка по командам: перцентили длительности успешных запусков и их фаз, регрессии,
+    загруженные байты, доля попаданий в кэши и причины сбоев."""
+    by_command: dict[str, list[dict]] = {}
+    for run in runs:
+        by_command.setdefault(run["command"], []).append(run)
+
+    summaries = []
+    for command, command_runs in sorted(by_command.items()):
+        ok = [run for run in command_runs if run["exit_code"] == 0]
+        causes: dict[str, int] = {}
+        for run in command_runs:
+            if run["exit_code"]:
+                causes[run["cause"] or "error"] = causes.get(run["cause"] or "error", 0) + 1
+        cache: dict[str, dict] = {}
+        for run in command_runs:
+            for name, (hits, misses) in run["data"].get("cache", {}).items():
+                entry = cache.setdefault(name, {"hits": 0, "misses": 0})
+                entry["hits"] += hits
+                entry["misses"] += misses
+        for entry in cache.values():
+            lookups = entry["hits"] + entry["misses"]
+            entry["rate"] = round(entry["hits"] / lookups, 4) if lookups else None
+        phase_values: dict[str, list[float]] = {}
+        for run in ok:
+            for phase, seconds in run["data"].get("phases", {}).items():
+                phase_values.setdefault(phase, []).append(seconds)
+        downloaded = [run["data"].get("totals", {}).get("bytes_downloaded", 0) for run in ok]
+
+        summary = {
+            "command": command,
+            "runs": len(command_runs),
+            "failures": len(command_runs) - len(ok),
+            "causes": causes,
+            "version": command_runs[-1]["version"],
+            "last_run": command_runs[-1]["started"],
+            "duration": _duration_stats([run["duration"] for run in ok], recent) if ok else None,
+            "bytes_downloaded": round(_percentile(downloaded, 0.5)) if any(downloaded) else 0,
+            "cache": cache,
+            "phases": [{"phase": phase, "runs": len(values), **_duration_stats(values, recent)} for phase, values in phase_values.items()],
+        }
+        summaries.append(summary)
+    return summaries
+
+def _change_cell(stats: dict | None) -> str:
+    if not stats or stats["change"] is None:
+        return "[bright_black]-[/bright_black]"
+    text = f"{stats['change'] * 100:+.0f}%"
+    if stats["regression"]:
+        return f"[red]{text}[/red]"
+    if stats["change"] <= -RUN_HISTORY_REGRESSION_RATIO:
+        return f"[green]{text}[/green]"
+    return text
+
+@app.command()
+def stats(
+    command: str = typer.Option(None, "--command", "-c", help="Только запуски указанной команды, с длительностями фаз"),
+    days: int = typer.Option(30, "--days", min=1, help="Учитывать запуски за последние N дней"),
+    recent: int = typer.Option(RUN_HISTORY_RECENT_DEFAULT, "--recent", min=1, help="Сколько последних успешных запусков сравнивать с предыдущими при поиске регрессий"),
+    clear: bool = typer.Option(False, "--clear", help="Удалить историю запусков"),
+    json_output: bool = typer.Option(False, "--json", help="Вывод сводки событием JSON Lines в stdout"),
+):
+    """Сводка локальной истории запусков: p50/p95 длительностей, регрессии, загрузки, кэши и причины сбоев.
+
+    Каждый запуск команды записывается одной строкой (длительность, фазы StepTracker, счетчики
+    и причина сбоя) в `history.db` в пользовательской директории данных `specify-cli`; никуда
+    не отправляется. Отключается переменной окружения SPECIFY_HISTORY=0.
+    """
+    if json_output:
+        enable_json_output()
+    if clear:
+        RUN_HISTORY_FILE.unlink(missing_ok=True)
+        emit_event("stats", history=str(RUN_HISTORY_FILE), cleared=True)
+        console.print(f"[green]История запусков удалена[/green] [bright_black]({RUN_HISTORY_FILE})[/bright_black]")
+        return
+    try:
+        runs = load_run_history(days=days, command=command)
+    except sqlite3.Error as e:
+        exit_with_error(f"Не удалось прочитать историю запусков {RUN_HISTORY_FILE}: {e}")
+    summaries = summarize_run_history(runs, recent=recent)
+    if json_output:
+        emit_event("stats", history=str(RUN_HISTORY_FILE), days=days, recent=recent, commands=summaries)
+        return
+
+    if not summaries:
+        hint = " (запись отключена через SPECIFY_HISTORY)" if not run_history_enabled() else ""
+        console.print(f"[yellow]Запусков за последние {days} дн. нет{hint}[/yellow] [bright_black]({RUN_HISTORY_FILE})[/bright_black]")
+        return
+
+    table = Table(show_header=True, header_style="bold", box=None, padding=(0, 2))
+    table.add_column("Команда", style="cyan")
+    table.add_column("Запусков", justify="right")
+    table.add_column("Сбоев", justify="right")
+    table.add_column("p50", justify="right")
+    table.add_column("p95", justify="right")
+    table.add_column("Δ p50", justify="right")
+    table.add_column("Загрузка", justify="right")
+    table.add_column("Кэш")
+    for summary in summaries:
+        duration = summary["duration"]
+        cache = ", ".join(f"{name} {entry['rate'] * 100:.0f}%" for name, entry in summary["cache"].items() if entry["rate"] is not None)
+        table.add_row(
+            summary["command"],
+            str(summary["runs"]),
+            f"[red]{summary['failures']}[/red]" if summary["failures"] else "0",
+            _format_duration(duration["p50"]) if duration else "-",
+            _format_duration(duration["p95"]) if duration else "-",
+            _change_cell(duration),
+            f"{summary['bytes_downloaded'] / 1e6:.1f} МБ" if summary["bytes_downloaded"] else "-",
+            cache or "[bright_black]-[/bright_black]",
+        )
+    console.print(table)
+
+    if command:
+        phases = Table(show_header=True, header_style="bold", box=None, padding=(0, 2))
+        phases.add_column("Фаза", style="cyan")
+        phases.add_column("Запусков", justify="right")
+        phases.add_column("p50", justify="right")
+        phases.add_column("p95", justify="right")
+        phases.add_column("Δ p50", justify="right")
+        for summary in summaries:
+            for phase in summary["phases"]:
+                phases.add_row(phase["phase"], str(phase["runs"]), _format_duration(phase["p50"]), _format_duration(phase["p95"]), _change_cell(phase))
+        if phases.row_count:
+            console.print()
+            console.print(phases)
+
+    regressions = []
+    for summary in summaries:
+        if summary["duration"] and summary["duration"]["regression"]:
+            regressions.append((summary["command"], summary["duration"]))
+        regressions.extend((f"{summary['command']} / {phase['phase']}", phase) for phase in summary["phases"] if phase["regression"])
+    if regressions:
+        console.print(f"\n[bold red]Регрессии[/bold red] [bright_black](медиана последних {recent} успешных запусков против предыдущих)[/bright_black]")
+        for name, phase in regressions:
+            console.print(f"  • {name}: p50 {_format_duration(phase['p50'])}, {_change_cell(phase)}")
+
+    causes: dict[str, int] = {}
+    for summary in summaries:
+        for cause, count in summary["causes"].items():
+            causes[cause] = causes.get(cause, 0) + count
+    if causes:
+        console.print("\n[bold]Причины сбоев:[/bold] " + ", ".join(f"{cause} {count}" for cause, count in sorted(causes.items(), key=lambda item: -item[1])))
+    console.print(f"\n[bright_black]Запусков за {days} дн.: {len(runs)}; история: {RUN_HISTORY_FILE} (не более {RUN_HISTORY_MAX_ROWS} запусков за {RUN_HISTORY_MAX_AGE_DAYS} дн.)[/bright_black]")
+
+ARCHIVE_DIR = Path(".specify") / "archive"
+ARCHIVE_PACK = "specs.zip"
+ARCHIVE_INDEX = "index.json"
+ARCHIVE_INDEX_VERSION = 1
+
+def load_archive_index(project_root: Path) -> list[dict]:
+    """Записи архива фич `.specify/archive/index.json` в порядке номеров."""
+    try:
+        data = json.loads((project_root / ARCHIVE_DIR / ARCHIVE_INDEX).read_text(encoding="utf-8"))
+    except (FileNotFoundError, json.JSONDecodeError):
+        return []
+    return data.get("features", [])
+
+def _store_archive_index(project_root: Path, features: list[dict]) -> None:
+    # Одна фича на строку "name": scripts/bash/create-new-feature.sh читает номера grep-ом
+    features = sorted(features, key=lambda entry: entry["name"])
+    _write_text_atomic(
+        project_root / ARCHIVE_DIR / ARCHIVE_INDEX,
+        json.dumps({"version": ARCHIVE_INDEX_VERSION, "features": features}, ensure_ascii=False, indent=2) + "\n",
+    )
+
+def find_archived_feature(project_root: Path, name: str, features: list[dict] | None = None) -> dict | None:
+    """Ищет фичу в архиве по имени директории или числовому префиксу (004 или 004-whatever)."""
+    if features is None:
+        features = load_archive_index(project_root)
+    exact = [entry for entry in features if entry["name"] == name]
+    if exact:
+        return exact[0]
+    match = FEATURE_DIR_PATTERN.match(name)
+    prefix = f"{int(name):03d}" if name.isdigit() else (match.group(1) if match else None)
+    prefixed = [entry for entry in features if prefix and entry["name"].startswith(f"{prefix}-")]
+    return prefixed[0] if len(prefixed) == 1 else None
+
+def _spec_title(feature_dir: Path) -> str:
+    try:
+        with open(feature_dir / "spec.md", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("# "):
+                    return line[2:].split(":", 1)[-1].strip()
+    except (OSError, UnicodeDecodeError):
+        pass
+    return ""
+
+def archive_features(project_root: Path, feature_dirs: list[Path]) -> list[dict]:
+    """Переносит директории фич в сжатый архив `.specify/archive/specs.zip` и удаляет их из specs/.
+
+    Архив - один ZIP (записи `NNN-имя/путь`, его центральный каталог служит индексом файлов),
+    рядом `index.json` со сводкой по каждой фиче. Архив пишется во временный файл и подменяет
+    старый целиком; директории фич удаляются только после записи архива и индекса.
+
+    Returns:
+        Добавленные записи индекса
+
+    Raises:
+        ValueError: фича с таким именем уже есть в архиве
+    """
+    archive_dir = project_root / ARCHIVE_DIR
+    pack = archive_dir / ARCHIVE_PACK
+    features = load_archive_index(project_root)
+    known = {entry["name"] for entry in features}
+    for feature_dir in feature_dirs:
+        if feature_dir.name in known:
+            raise ValueError(f"Фича {feature_dir.name} уже есть в архиве")
+
+    archive_dir.mkdir(parents=True, exist_ok=True)
+    staging = _atomic_tmp_path(pack)
+    if pack.is_file():
+        shutil.copyfile(pack, staging)
+    added = []
+    try:
+        with profile_span("archive", features=len(feature_dirs)) as span, \
+                zipfile.ZipFile(staging, "a", compression=zipfile.ZIP_DEFLATED, compresslevel=9) as zip_ref:
+            for feature_dir in feature_dirs:
+                tasks_file = feature_dir / "tasks.md"
+                files = sorted(path for path in feature_dir.rglob("*") if path.is_file())
+                for path in files:
+                    zip_ref.write(path, f"{feature_dir.name}/{path.relative_to(feature_dir).as_posix()}")
+                added.append({
+                    "name": feature_dir.name,
+                    "title": _spec_title(feature_dir),
+                    "archived": datetime.now(timezone.utc).strftime("%Y-%m-%d"),
+                    "files": len(files),
+                    "bytes": sum(path.stat().st_size for path in files),
+                    "tasks": _count_tasks(tasks_file) if tasks_file.is_file() else None,
+                })
+            span["bytes_written"] = sum(entry["bytes"] for entry in added)
+        os.replace(staging, pack)
+    finally:
+        staging.unlink(missing_ok=True)
+    _store_archive_index(project_root, features + added)
+    for feature_dir in feature_dirs:
+        shutil.rmtree(feature_dir)
+    return added
+
+def restore_features(project_root: Path, names: list[str]) -> list[dict]:
+    """Восстанавливает фичи из архива в specs/ и убирает их из архива.
+
+    Returns:
+        Восстановленные записи индекса
+
+    Raises:
+        ValueError: фича не найдена в архиве или директория уже есть в specs/
+    """
+    archive_dir = project_root / ARCHIVE_DIR
+    pack = archive_dir / ARCHIVE_PACK
+    features = load_archive_index(project_root)
+    entries = []
+    for name in names:
+        entry = find_archived_feature(project_root, name, features)
+        if entry is None:
+            raise ValueError(f"Фича '{name}' не найдена в архиве")
+        if (project_root / "specs" / entry["name"]).exists():
+            raise ValueError(f"Директория specs/{entry['name']} уже существует")
+        if entry not in entries:
+            entries.append(entry)
+
+    # Файлы распаковываются во временную директорию рядом с архивом и переносятся в specs/
+    # только после подмены архива: при ошибке чтения ни specs/, ни архив не меняются
+    prefixes = tuple(f"{entry['name']}/" for entry in entries)
+    specs_dir = project_root / "specs"
+    staging_dir = Path(tempfile.mkdtemp(prefix=".restore-", dir=archive_dir)).resolve()
+    staging = _atomic_tmp_path(pack)
+    try:
+        with zipfile.ZipFile(pack, "r") as source, \
+                zipfile.ZipFile(staging, "w", compression=zipfile.ZIP_DEFLATED, compresslevel=9) as rest:
+            for info in source.infolist():
+                if not info.filename.startswith(prefixes):
+                    rest.writestr(info, source.read(info))
+                    continue
+                target = (staging_dir / info.filename).resolve()
+                if not target.is_relative_to(staging_dir):
+                    raise ValueError(f"Небезопасный путь в архиве: {info.filename}")
+                target.parent.mkdir(parents=True, exist_ok=True)
+                target.write_bytes(source.read(info))
+        os.replace(staging, pack)
+    except BaseException:
+        staging.unlink(missing_ok=True)
+        shutil.rmtree(staging_dir, ignore_errors=True)
+        raise
+    _store_archive_index(project_root, [entry for entry in features if entry not in entries])
+    specs_dir.mkdir(exist_ok=True)
+    for entry in entries:
+        restored_dir = staging_dir / entry["name"]
+        if restored_dir.is_dir():
+            restored_dir.rename(specs_dir / entry["name"])
+        else:
+            (specs_dir / entry["name"]).mkdir()
+    staging_dir.rmdir()
+    return entries
+
+def read_archived_file(project_root: Path, path: str) -> str:
+    """Читает файл фичи из архива без восстановления (путь `NNN-имя/spec.md`)."""
+    with zipfile.ZipFile(project_root / ARCHIVE_DIR / ARCHIVE_PACK, "r") as zip_ref:
+        return zip_ref.read(path).decode("utf-8", errors="replace")
+
+@app.command()
+def archive(
+    features: list[str] = typer.Argument(None, help="Фичи (номер или имя директории). Без аргументов - все завершенные фичи"),
+    restore: bool = typer.Option(False, "--restore", help="Восстановить указанные фичи из архива в specs/"),
+    list_archived: bool = typer.Option(False, "--list", help="Показать фичи в архиве"),
+    show: str = typer.Option(None, "--show", help="Вывести файл из архива без восстановления, например 004/spec.md"),
+    force: bool = typer.Option(False, "--force", help="Архивировать указанные фичи, даже если не все задачи выполнены"),
+    dry_run: bool = typer.Option(False, "--dry-run", help="Показать, какие фичи будут перенесены, ничего не меняя"),
+    json_output: bool = typer.Option(False, "--json", help="Вывод результата событиями JSON Lines в stdout"),
+):
+    """Перенос завершенных фич из specs/ в сжатый архив `.specify/archive/`.
+
+    Завершенная фича - tasks.md, в котором отмечены все задачи. Фичи выгруженных веток (текущей
+    и других рабочих деревьев) без явного указания не архивируются. Номера фич из архива остаются
+    занятыми для create-new-feature, а их артефакты доступны в `specify search`, через --show
+    и восстанавливаются с --restore.
+    """
+    if json_output:
+        enable_json_output()
+    project_root = _require_project_root()
+
+    if list_archived:
+        entries = load_archive_index(project_root)
+        if json_output:
+            emit_event("archive", features=entries)
+            return
+        if not entries:
+            console.print("[yellow]Архив фич пуст[/yellow]")
+            return
+        table = Table(show_header=True, header_style="bold", box=None, padding=(0, 2))
+        table.add_column("Фича", style="cyan")
+        table.add_column("Название")
+        table.add_column("Задачи", justify="right")
+        table.add_column("Файлов", justify="right")
+        table.add_column("В архиве с", style="bright_black")
+        for entry in entries:
+            table.add_row(entry["name"], escape(entry["title"]), _completion_cell(entry["tasks"]), str(entry["files"]), entry["archived"])
+        console.print(table)
+        return
+
+    if show:
+        name, _, rel = show.partition("/")
+        entry = find_archived_feature(project_root, name)
+        if entry is None or not rel:
+            exit_with_error(f"Фича '{name}' не найдена в архиве" if entry is None else "Укажите файл фичи, например 004/spec.md")
+        try:
+            text = read_archived_file(project_root, f"{entry['name']}/{rel}")
+        except KeyError:
+            exit_with_error(f"Файл {rel} не найден в архиве фичи {entry['name']}")
+        except (OSError, zipfile.BadZipFile) as e:
+            exit_with_error(f"Не удалось прочитать архив {ARCHIVE_DIR.as_posix()}/{ARCHIVE_PACK}: {e}")
+        if json_output:
+            emit_event("file", feature=entry["name"], path=rel, text=text)
+        else:
+            console.print(text, markup=False, highlight=False, soft_wrap=True)
+        return
+
+    if restore:
+        if not features:
+            exit_with_error("Укажите фичи для восстановления")
+        if dry_run:
+            entries = [find_archived_feature(project_root, name) for name in features]
+            for name, entry in zip(features, entries):
+                console.print(f"{'Будет восстановлена' if entry else '[red]Нет в архиве[/red]'}: {entry['name'] if entry else escape(name)}")
+            emit_event("result", ok=all(entries), dry_run=True, restored=[entry["name"] for entry in entries if entry])
+            return
+        try:
+            restored = restore_features(project_root, features)
+        except ValueError as e:
+            exit_with_error(str(e))
+        except (OSError, zipfile.BadZipFile) as e:
+            exit_with_error(f"Не удалось восстановить фичи из {ARCHIVE_DIR.as_posix()}/{ARCHIVE_PACK}: {e}")
+        for entry in restored:
+            console.print(f"[green]Восстановлена:[/green] specs/{entry['name']}")
+        emit_event("result", ok=True, restored=[entry["name"] for entry in restored])
+        return
+
+    skipped = []
+    if features:
+        candidates = []
+        for name in features:
+            try:
+                candidates.append(resolve_feature_dir(project_root, name))
+            except ValueError as e:
+                exit_with_error(str(e))
+    else:
+        checked_out = {branch for _, branch in git_worktrees(project_root) if branch} or {_current_git_branch(project_root)}
+        candidates = []
+        for feature_dir in iter_feature_dirs(project_root):
+            if feature_dir.name in checked_out:
+                skipped.append((feature_dir.name, "ветка выгружена"))
+            else:
+                candidates.append(feature_dir)
+    selected = []
+    for feature_dir in candidates:
+        tasks_file = feature_dir / "tasks.md"
+        tasks = _count_tasks(tasks_file) if tasks_file.is_file() else None
+        if (force and features) or _feature_stage(feature_dir, tasks) == "done":
+            selected.append(feature_dir)
+        elif features:
+            skipped.append((feature_dir.name, "выполнены не все задачи (--force для архивации)"))
+
+    if not dry_run and selected:
+        try:
+            archived = archive_features(project_root, selected)
+        except (ValueError, OSError, zipfile.BadZipFile) as e:
+            exit_with_error(f"Не удалось записать архив: {e}")
+    else:
+        archived = [{"name": feature_dir.name} for feature_dir in selected]
+
+    if json_output:
+        emit_event("result", ok=True, dry_run=dry_run, archived=[entry["name"] for entry in archived], skipped=[{"feature": name, "reason": reason} for name, reason in skipped])
+        return
+    for name, reason in skipped:
+        console.print(f"[yellow]Пропущена:[/yellow] {name} [bright_black]({reason})[/bright_black]")
+    if not archived:
+        console.print("[yellow]Нет завершенных фич для архивации[/yellow]")
+        return
+    verb = "Будет перенесена в архив" if dry_run else "Перенесена в архив"
+    for entry in archived:
+        console.print(f"[green]{verb}:[/green] {entry['name']}")
+    if not dry_run:
+        pack = project_root / ARCHIVE_DIR / ARCHIVE_PACK
+        total = sum(entry["bytes"] for entry in archived)
+        console.print(f"\n[bright_black]{ARCHIVE_DIR.as_posix()}/{ARCHIVE_PACK}: {pack.stat().st_size:,} байт (перенесено {total:,} байт)[/bright_black]")
+
 def main():
-    app()
+    exit_code = 1
+    try:
+        app()
+        exit_code = 0
+    except SystemExit as e:
+        exit_code = e.code if isinstance(e.code, int) else int(e.code is not None)
+        raise
+    finally:
+        finish_run_record(exit_code)
 
 if __name__ == "__main__":
     main()
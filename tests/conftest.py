@@ -0,0 +1,75 @@
+"""Общие фикстуры: локальный HTTP-сервер-заглушка в отдельном потоке."""
+
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import specify_cli
+
+
+class StubServer:
+    """HTTP-заглушка: `routes` - {(метод, путь): обработчик(запрос) -> (статус, заголовки, тело)}.
+
+    Соединение закрывается после каждого ответа (HTTP/1.0).
+
+    Все полученные запросы сохраняются в `requests` как (метод, путь, заголовки, тело).
+    """
+
+    def __init__(self):
+        self.routes = {}
+        self.requests = []
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _handle(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length else b""
+                request = (self.command, self.path, dict(self.headers), body)
+                stub.requests.append(request)
+                route = stub.routes.get((self.command, self.path.split("?", 1)[0]))
+                status, headers, payload = route(request) if route else (404, {}, b'{"message": "Not Found"}')
+                if isinstance(payload, str):
+                    payload = payload.encode("utf-8")
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, str(value))
+                # Явный Content-Length больше тела - обрыв соединения посреди ответа
+                if "Content-Length" not in headers:
+                    self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            do_GET = do_POST = do_PATCH = _handle
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self._server.server_address[1]}"
+        self._thread = threading.Thread(target=self._server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+
+    def route(self, method, path, handler):
+        self.routes[(method, path)] = handler
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+@pytest.fixture
+def stub_server():
+    with StubServer() as server:
+        yield server
+
+
+@pytest.fixture(autouse=True)
+def isolated_user_dirs(tmp_path, monkeypatch):
+    """Кэш релизов и история запусков тестов не попадают в пользовательские директории."""
+    monkeypatch.setattr(specify_cli, "RELEASE_CACHE_FILE", tmp_path / "user-cache" / "releases.json")
+    monkeypatch.setattr(specify_cli, "TEMPLATE_STORE_DIR", tmp_path / "user-cache" / "store")
+    monkeypatch.setattr(specify_cli, "RUN_HISTORY_FILE", tmp_path / "user-data" / "history.db")
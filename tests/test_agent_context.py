@@ -0,0 +1,74 @@
+"""Разбор plan.md и синхронизация файлов контекста агентов (`specify watch`)."""
+
+from pathlib import Path
+
+from specify_cli import parse_plan_fields, sync_agent_context, update_agent_context_text
+
+TEMPLATE = Path(__file__).resolve().parents[1] / "templates" / "plan-template.md"
+
+
+def test_untouched_template_placeholders_are_empty():
+    assert parse_plan_fields(TEMPLATE) == {"lang": "", "framework": "", "db": ""}
+
+
+def test_filled_and_unclarified_fields(tmp_path):
+    plan = tmp_path / "plan.md"
+    plan.write_text(
+        "**Язык/Версия**: Python 3.11\n"
+        "**Основные зависимости**: NEEDS CLARIFICATION\n"
+        "**Primary Dependencies**: FastAPI (ТРЕБУЕТСЯ УТОЧНЕНИЕ: версия)\n"
+        "**Хранилище**: Н/Д\n"
+        "**Storage**: PostgreSQL\n",
+        encoding="utf-8",
+    )
+    assert parse_plan_fields(plan) == {"lang": "Python 3.11", "framework": "", "db": "PostgreSQL"}
+
+
+AGENT_FILE = """# Контекст проекта
+
+Последнее обновление: 2026-01-01
+
+## Активные технологии
+
+## Недавние изменения
+"""
+
+
+def _plan(root, feature, lang):
+    feature_dir = root / "specs" / feature
+    feature_dir.mkdir(parents=True, exist_ok=True)
+    (feature_dir / "plan.md").write_text(f"**Язык/Версия**: {lang}\n**Хранилище**: Н/Д\n", encoding="utf-8")
+
+
+def _technologies(root):
+    text = (root / "CLAUDE.md").read_text(encoding="utf-8")
+    section = text.split("## Активные технологии", 1)[1].split("## ", 1)[0]
+    return [line for line in section.splitlines() if line.startswith("- ")]
+
+
+def test_shared_technology_survives_when_one_feature_drops_it(tmp_path):
+    (tmp_path / ".specify").mkdir()
+    (tmp_path / "CLAUDE.md").write_text(AGENT_FILE, encoding="utf-8")
+    _plan(tmp_path, "001-a", "Python 3.11")
+    _plan(tmp_path, "002-b", "Python 3.11")
+    _plan(tmp_path, "003-c", "Python 3.11")
+    sync_agent_context(tmp_path)
+    assert _technologies(tmp_path) == ["- Python 3.11 (001-a)"]
+
+    _plan(tmp_path, "001-a", "Go 1.22")
+    sync_agent_context(tmp_path, [tmp_path / "specs" / "001-a" / "plan.md"])
+    assert _technologies(tmp_path) == ["- Go 1.22 (001-a)", "- Python 3.11 (002-b)"]
+
+    # Запись теперь принадлежит 002-b: при ее смене Python остается за 003-c
+    _plan(tmp_path, "002-b", "Rust 1.75")
+    sync_agent_context(tmp_path, [tmp_path / "specs" / "002-b" / "plan.md"])
+    assert _technologies(tmp_path) == ["- Go 1.22 (001-a)", "- Rust 1.75 (002-b)", "- Python 3.11 (003-c)"]
+
+
+def test_removal_is_limited_to_the_technology_section(tmp_path):
+    text = AGENT_FILE.replace("## Недавние изменения\n", "## Недавние изменения\n\n## Заметки\n\n- Python 3.11 (001-a)\n")
+    text = text.replace("## Активные технологии\n", "## Активные технологии\n\n- Python 3.11 (001-a)\n")
+    updated = update_agent_context_text(text, "001-a", add=["- Go 1.22 (001-a)"], remove=["- Python 3.11 (001-a)"], change=None, today="2026-10-19")
+    assert "## Заметки\n\n- Python 3.11 (001-a)" in updated
+    technologies = updated.split("## Недавние изменения", 1)[0]
+    assert "- Go 1.22 (001-a)" in technologies and "Python" not in technologies
@@ -0,0 +1,50 @@
+"""`specify archive`: перенос фич в `.specify/archive/specs.zip` и восстановление."""
+
+import pytest
+from typer.testing import CliRunner
+
+from specify_cli import ARCHIVE_DIR, ARCHIVE_PACK, app, archive_features, load_archive_index, restore_features
+
+
+@pytest.fixture
+def project(tmp_path, monkeypatch):
+    root = tmp_path / "project"
+    (root / ".specify").mkdir(parents=True)
+    feature = root / "specs" / "001-export"
+    (feature / "contracts").mkdir(parents=True)
+    (feature / "spec.md").write_text("# Спецификация фичи: Экспорт\n", encoding="utf-8")
+    (feature / "tasks.md").write_text("- [x] T001 Готово\n", encoding="utf-8")
+    (feature / "contracts" / "api.yaml").write_text("openapi: 3.1.0\n", encoding="utf-8")
+    monkeypatch.chdir(root)
+    archive_features(root, [feature])
+    return root
+
+
+def _restore(*args):
+    return CliRunner().invoke(app, ["archive", "--restore", *args])
+
+
+def test_restore_round_trip(project):
+    assert not (project / "specs" / "001-export").exists()
+    assert [entry["name"] for entry in restore_features(project, ["001"])] == ["001-export"]
+    feature = project / "specs" / "001-export"
+    assert (feature / "contracts" / "api.yaml").read_text(encoding="utf-8") == "openapi: 3.1.0\n"
+    assert load_archive_index(project) == []
+    assert sorted(p.name for p in (project / ARCHIVE_DIR).iterdir()) == ["index.json", ARCHIVE_PACK]
+
+
+@pytest.mark.parametrize("damage", ["missing", "corrupt"])
+def test_restore_from_damaged_pack_reports_error(project, damage):
+    pack = project / ARCHIVE_DIR / ARCHIVE_PACK
+    if damage == "missing":
+        pack.unlink()
+    else:
+        pack.write_bytes(b"not a zip")
+    result = _restore("001")
+    assert result.exit_code == 1
+    assert result.exception is None or isinstance(result.exception, SystemExit)
+    assert "Не удалось восстановить" in result.output
+    # Ни specs/, ни индекс архива не изменены, временных файлов не осталось
+    assert not (project / "specs" / "001-export").exists()
+    assert [entry["name"] for entry in load_archive_index(project)] == ["001-export"]
+    assert sorted(p.name for p in (project / ARCHIVE_DIR).iterdir()) == sorted([ARCHIVE_PACK, "index.json"] if damage == "corrupt" else ["index.json"])
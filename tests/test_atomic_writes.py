@@ -0,0 +1,25 @@
+"""Атомарная запись файлов из нескольких потоков (предзагрузка релиза пишет те же кэши, что и основной поток)."""
+
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+import specify_cli
+from specify_cli import HttpMirrorSource, _write_text_atomic, store_cached_release
+
+
+def test_concurrent_atomic_writes_do_not_share_temp_files(tmp_path):
+    target = tmp_path / "CLAUDE.md"
+    texts = [f"версия {i}\n" * 2000 for i in range(16)]
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(lambda text: _write_text_atomic(target, text), texts * 4))
+    assert target.read_text(encoding="utf-8") in texts
+    assert [p.name for p in tmp_path.iterdir()] == ["CLAUDE.md"]
+
+
+def test_concurrent_release_cache_writes(tmp_path):
+    sources = [HttpMirrorSource(f"https://mirror-{i}.example/templates") for i in range(8)]
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(lambda source: store_cached_release(source, {"tag_name": "v1.0.0", "assets": []}), sources * 4))
+    cache = json.loads(specify_cli.RELEASE_CACHE_FILE.read_text(encoding="utf-8"))
+    assert all(entry["release"]["tag_name"] == "v1.0.0" for entry in cache.values())
+    assert [p.name for p in specify_cli.RELEASE_CACHE_FILE.parent.iterdir()] == ["releases.json"]
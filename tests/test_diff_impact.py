@@ -0,0 +1,71 @@
+"""Поиск устаревших секций plan.md и tasks.md после правок spec.md (`specify diff-impact`)."""
+
+import json
+
+from specify_cli import DEPENDENCY_FILE, diff_impact, record_dependencies
+
+SPEC = """# Спецификация фичи: Экспорт
+
+## Требования
+
+- **FR-001**: Система ДОЛЖНА экспортировать отчеты в CSV
+- **FR-002**: Система ДОЛЖНА отправлять отчеты по почте
+"""
+
+TASKS = """# Задачи
+
+## Фаза 1
+
+### Тесты
+
+- [ ] T001 Проверить FR-001
+
+## Фаза 2
+
+### Тесты
+
+- [ ] T002 Проверить FR-002
+
+## Общее
+
+- [ ] T003 Настроить окружение
+"""
+
+
+def _feature(tmp_path):
+    feature = tmp_path / "specs" / "001-export"
+    feature.mkdir(parents=True)
+    (feature / "spec.md").write_text(SPEC, encoding="utf-8")
+    (feature / "tasks.md").write_text(TASKS, encoding="utf-8")
+    return feature
+
+
+def test_repeated_headings_are_recorded_separately(tmp_path):
+    feature = _feature(tmp_path)
+    deps = record_dependencies(feature)
+    sections = deps["derived"]["tasks.md"]
+    assert sections["Задачи > Фаза 1 > Тесты"] == ["FR-001"]
+    assert sections["Задачи > Фаза 2 > Тесты"] == ["FR-002"]
+    assert json.loads((feature / DEPENDENCY_FILE).read_text(encoding="utf-8")) == deps
+
+    (feature / "spec.md").write_text(SPEC.replace("по почте", "в мессенджер"), encoding="utf-8")
+    stale = {(item["section"], tuple(item["because"])) for item in diff_impact(feature)["stale"]}
+    assert ("Задачи > Фаза 2 > Тесты", ("FR-002",)) in stale
+    assert not any(section == "Задачи > Фаза 1 > Тесты" for section, _ in stale)
+
+
+def test_sections_without_known_sources_go_stale_on_content_edits(tmp_path):
+    feature = _feature(tmp_path)
+    assert record_dependencies(feature)["derived"]["tasks.md"]["Задачи > Общее"] == ["*"]
+
+    (feature / "spec.md").write_text(SPEC.replace("в CSV", "в XLSX"), encoding="utf-8")
+    report = diff_impact(feature)
+    assert report["spec"]["changed"] == ["FR-001"]
+    assert {"file": "tasks.md", "section": "Задачи > Общее", "line": 15, "because": ["*"]} in report["stale"]
+
+
+def test_duplicate_heading_keys_get_ordinals(tmp_path):
+    feature = _feature(tmp_path)
+    (feature / "tasks.md").write_text("## Тесты\n\n- [ ] T001 FR-001\n\n## Тесты\n\n- [ ] T002 FR-002\n", encoding="utf-8")
+    sections = record_dependencies(feature)["derived"]["tasks.md"]
+    assert sections == {"Тесты": ["FR-001"], "Тесты (2)": ["FR-002"]}
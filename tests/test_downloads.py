@@ -0,0 +1,128 @@
+"""Повторы и докачка сетевых запросов (`_get_with_retry`, `_download_with_resume`) против локальной заглушки."""
+
+import time
+
+import httpx
+import pytest
+
+import specify_cli
+from specify_cli import _download_with_resume, _get_with_retry, _retry_delay
+
+DATA = bytes(range(256)) * 1024  # 256 КиБ
+CUT = 100_000
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    delays = []
+    monkeypatch.setattr(specify_cli.time, "sleep", delays.append)
+    return delays
+
+
+def _serve(stub_server, *responses):
+    """Отдает `responses` по очереди на GET /file; каждый элемент - функция заголовков запроса -> ответ."""
+    queue = list(responses)
+    stub_server.route("GET", "/file", lambda request: queue.pop(0)(request[2]))
+    return f"{stub_server.url}/file"
+
+
+def _cut(headers):
+    # Заявлен весь файл, но соединение обрывается после CUT байт
+    return 200, {"Content-Length": len(DATA)}, DATA[:CUT]
+
+
+def _full(headers):
+    return 200, {}, DATA
+
+
+def _rest(headers):
+    start = int(headers["Range"].removeprefix("bytes=").rstrip("-"))
+    return 206, {"Content-Range": f"bytes {start}-{len(DATA) - 1}/{len(DATA)}"}, DATA[start:]
+
+
+def _ranges(stub_server):
+    return [headers.get("Range") for _, _, headers, _ in stub_server.requests]
+
+
+def _download(url, tmp_path, **kwargs):
+    dest = tmp_path / "template.zip"
+    with httpx.Client() as client:
+        size = _download_with_resume(client, url, dest, expected_size=len(DATA), show_progress=False, **kwargs)
+    return dest, size
+
+
+def test_resume_requests_only_the_missing_tail(stub_server, tmp_path, sleeps):
+    url = _serve(stub_server, _cut, _rest)
+    dest, size = _download(url, tmp_path)
+    assert dest.read_bytes() == DATA and size == len(DATA)
+    assert _ranges(stub_server) == [None, f"bytes={CUT}-"]
+    assert len(sleeps) == 1
+    assert not (tmp_path / "template.zip.part").exists()
+
+
+def test_ignored_range_restarts_from_scratch(stub_server, tmp_path, sleeps):
+    url = _serve(stub_server, _cut, _full)
+    dest, _ = _download(url, tmp_path)
+    assert dest.read_bytes() == DATA
+    assert _ranges(stub_server) == [None, f"bytes={CUT}-"]
+
+
+def test_rejected_range_drops_partial_file(stub_server, tmp_path, sleeps):
+    url = _serve(stub_server, _cut, lambda headers: (416, {}, b""), _full)
+    dest, _ = _download(url, tmp_path)
+    assert dest.read_bytes() == DATA
+    assert _ranges(stub_server) == [None, f"bytes={CUT}-", None]
+    assert sleeps[1] == 0.0
+
+
+def test_rate_limited_403_is_retried(stub_server, tmp_path, sleeps):
+    reset = str(int(time.time()))
+    url = _serve(stub_server, lambda headers: (403, {"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": reset}, b"{}"), _full)
+    dest, _ = _download(url, tmp_path)
+    assert dest.read_bytes() == DATA
+    assert len(stub_server.requests) == 2
+    assert 0.0 < sleeps[0] <= 2.0
+
+
+def test_access_denied_403_fails_without_retry(stub_server, tmp_path, sleeps):
+    url = _serve(stub_server, lambda headers: (403, {}, b'{"message": "Forbidden"}'))
+    with pytest.raises(RuntimeError, match="403"):
+        _download(url, tmp_path)
+    assert len(stub_server.requests) == 1 and sleeps == []
+
+
+def test_retry_after_beyond_backoff_max_is_not_waited(stub_server, tmp_path, sleeps):
+    too_long = str(int(specify_cli.RETRY_BACKOFF_MAX) + 1)
+    url = _serve(stub_server, lambda headers: (429, {"Retry-After": too_long}, b""))
+    with pytest.raises(RuntimeError, match="429"):
+        _download(url, tmp_path)
+    assert len(stub_server.requests) == 1 and sleeps == []
+    assert _retry_delay(0, httpx.Headers({"Retry-After": too_long})) is None
+    assert _retry_delay(0, httpx.Headers({"Retry-After": "5"})) == 5.0
+
+
+def test_persistent_cuts_exhaust_attempts(stub_server, tmp_path, sleeps):
+    # Каждый ответ обрывается на том же месте относительно начала: повторы не бесконечны
+    url = _serve(stub_server, *[_cut] * specify_cli.RETRY_MAX_ATTEMPTS)
+    with pytest.raises(httpx.TransportError):
+        _download(url, tmp_path)
+    assert len(stub_server.requests) == specify_cli.RETRY_MAX_ATTEMPTS
+    assert len(sleeps) == specify_cli.RETRY_MAX_ATTEMPTS - 1
+
+
+def test_get_with_retry(stub_server, sleeps):
+    url = _serve(
+        stub_server,
+        lambda headers: (503, {}, b""),
+        lambda headers: (403, {"Retry-After": "2"}, b""),
+        lambda headers: (200, {}, b"ok"),
+    )
+    with httpx.Client() as client:
+        response = _get_with_retry(client, url, timeout=5, headers={})
+    assert response.status_code == 200 and response.text == "ok"
+    assert len(sleeps) == 2 and sleeps[1] == 2.0
+
+    url = _serve(stub_server, lambda headers: (403, {}, b'{"message": "Forbidden"}'))
+    with httpx.Client() as client:
+        assert _get_with_retry(client, url, timeout=5, headers={}).status_code == 403
+    assert len(sleeps) == 2
@@ -0,0 +1,136 @@
+"""`specify tasks to-issues` против заглушки GitHub API (SPECIFY_GITHUB_API_URL)."""
+
+import json
+import subprocess
+import time
+from urllib.parse import parse_qs, urlsplit
+
+import httpx
+import pytest
+from typer.testing import CliRunner
+
+import specify_cli
+from specify_cli import ISSUES_LEDGER_FILE, _issue_rate_limit_wait, app
+
+REPO = "acme/widgets"
+TASKS = """# Задачи
+
+## Фаза 1
+
+- [ ] T001 Настроить проект
+- [ ] T002 Добавить модель
+- [ ] T003 Добавить API
+- [ ] T004 Написать тесты
+"""
+
+
+@pytest.fixture
+def project(tmp_path, monkeypatch, stub_server):
+    root = tmp_path / "project"
+    feature = root / "specs" / "001-widgets"
+    feature.mkdir(parents=True)
+    (root / ".specify").mkdir()
+    (feature / "tasks.md").write_text(TASKS, encoding="utf-8")
+    subprocess.run(["git", "init", "-q"], cwd=root, check=True)
+    subprocess.run(["git", "remote", "add", "origin", f"https://github.com/{REPO}.git"], cwd=root, check=True)
+    monkeypatch.chdir(root)
+    monkeypatch.setenv("SPECIFY_FEATURE", "001-widgets")
+    monkeypatch.setenv("GH_TOKEN", "test-token")
+    monkeypatch.setenv(specify_cli.GITHUB_API_URL_ENV, stub_server.url)
+    monkeypatch.setattr(specify_cli, "ISSUE_MIN_INTERVAL", 0.0)
+    return feature
+
+
+class FakeGitHub:
+    """Создает issues с последовательными номерами; `responses` - очередь ответов, выдаваемых вместо успеха."""
+
+    def __init__(self, stub_server):
+        self.issues = []
+        self.responses = []
+        stub_server.route("POST", f"/repos/{REPO}/issues", self.create)
+        stub_server.route("GET", "/search/issues", self.search)
+
+    def create(self, request):
+        if self.responses:
+            return self.responses.pop(0)
+        payload = json.loads(request[3])
+        number = len(self.issues) + 1
+        self.issues.append({**payload, "number": number, "html_url": f"https://github.com/{REPO}/issues/{number}"})
+        return 201, {"Content-Type": "application/json"}, json.dumps(self.issues[-1])
+
+    def search(self, request):
+        query = parse_qs(urlsplit(request[1]).query)["q"][0]
+        items = [issue for issue in self.issues if issue["body"].rsplit("<!-- ", 1)[-1].removesuffix(" -->") in query]
+        return 200, {"Content-Type": "application/json"}, json.dumps({"items": items})
+
+    def titles(self):
+        return [issue["title"] for issue in self.issues]
+
+
+def _run(*args):
+    return CliRunner().invoke(app, ["tasks", "to-issues", "--concurrency", "1", *args])
+
+
+def _ledger(feature):
+    return json.loads((feature / ISSUES_LEDGER_FILE).read_text(encoding="utf-8"))[REPO]
+
+
+def test_rate_limit_headers_drive_the_wait():
+    retry_after = httpx.Response(403, headers={"Retry-After": "7"}, text='{"message": "secondary rate limit"}')
+    assert _issue_rate_limit_wait(retry_after, 0) == 7.0
+    reset = int(time.time()) + 30
+    exhausted = httpx.Response(403, headers={"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": str(reset)})
+    assert 29.0 <= _issue_rate_limit_wait(exhausted, 0) <= 32.0
+    # 403 без признаков ограничения - отказ в доступе, не повод ждать
+    assert _issue_rate_limit_wait(httpx.Response(403, text='{"message": "Forbidden"}'), 0) is None
+
+
+def test_rate_limited_requests_are_retried(project, stub_server):
+    github = FakeGitHub(stub_server)
+    github.responses = [
+        (403, {"Retry-After": "0"}, '{"message": "You have exceeded a secondary rate limit"}'),
+        (403, {"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": str(int(time.time()) - 1)}, '{"message": "API rate limit exceeded"}'),
+    ]
+    result = _run()
+    assert result.exit_code == 0, result.output
+    assert github.titles() == ["T001 Настроить проект", "T002 Добавить модель", "T003 Добавить API", "T004 Написать тесты"]
+    assert sum(1 for method, *_ in stub_server.requests if method == "POST") == 6
+
+
+def test_rerun_skips_tasks_already_in_ledger(project, stub_server):
+    github = FakeGitHub(stub_server)
+    assert _run().exit_code == 0
+    assert sorted(_ledger(project)) == ["T001", "T002", "T003", "T004"]
+    posts = len(stub_server.requests)
+
+    result = _run()
+    assert result.exit_code == 0, result.output
+    assert len(stub_server.requests) == posts
+    assert len(github.issues) == 4
+
+
+def test_interrupted_run_resumes_without_duplicates(project, stub_server):
+    github = FakeGitHub(stub_server)
+    original_create = github.create
+
+    def create(request):
+        # После двух issues GitHub требует ждать дольше ISSUE_MAX_WAIT - прогон останавливается
+        if len(github.issues) >= 2:
+            return 429, {"Retry-After": "3600"}, '{"message": "rate limit"}'
+        return original_create(request)
+
+    stub_server.route("POST", f"/repos/{REPO}/issues", create)
+    result = _run()
+    assert result.exit_code == 1
+    assert "Осталось задач: 2" in result.output
+    assert _ledger(project)["T003"] == {"pending": True}
+
+    # Запрос T003 мог дойти до GitHub до остановки: повторный прогон находит его по маркеру, а не создает заново
+    marker = specify_cli._issue_marker(project, "T003")
+    original_create(("POST", "", {}, json.dumps({"title": "T003 Добавить API", "body": f"<!-- {marker} -->"}).encode()))
+    stub_server.route("POST", f"/repos/{REPO}/issues", original_create)
+    result = _run()
+    assert result.exit_code == 0, result.output
+    assert "создано 1, найдено 1" in result.output
+    assert sorted(github.titles()) == ["T001 Настроить проект", "T002 Добавить модель", "T003 Добавить API", "T004 Написать тесты"]
+    assert {entry["number"] for entry in _ledger(project).values()} == {1, 2, 3, 4}
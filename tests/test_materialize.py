@@ -0,0 +1,33 @@
+"""Слияние шаблона поверх файлов, связанных жесткими ссылками с общим хранилищем (`--materialize hardlink`)."""
+
+import os
+
+import pytest
+
+from specify_cli import apply_template_merge, plan_template_merge
+
+
+@pytest.mark.skipif(not hasattr(os, "link") or os.name == "nt", reason="жесткие ссылки и режимы файлов POSIX")
+def test_copy_merge_does_not_write_through_store_hardlinks(tmp_path):
+    store = tmp_path / "store" / "tree"
+    (store / ".specify" / "scripts").mkdir(parents=True)
+    stored = store / ".specify" / "scripts" / "common.sh"
+    stored.write_text("старая версия\n", encoding="utf-8")
+    stored.chmod(0o555)
+
+    project = tmp_path / "project"
+    (project / ".specify" / "scripts").mkdir(parents=True)
+    linked = project / ".specify" / "scripts" / "common.sh"
+    os.link(stored, linked)
+
+    source = tmp_path / "template"
+    (source / ".specify" / "scripts").mkdir(parents=True)
+    (source / ".specify" / "scripts" / "common.sh").write_text("новая версия\n", encoding="utf-8")
+
+    plan = plan_template_merge(source, project)
+    assert plan == [("overwrite", linked.relative_to(project))]
+    apply_template_merge(plan, source, project, workers=1)
+
+    assert linked.read_text(encoding="utf-8") == "новая версия\n"
+    assert stored.read_text(encoding="utf-8") == "старая версия\n"
+    assert stored.stat().st_nlink == 1
@@ -0,0 +1,128 @@
+"""HTTP-зеркало шаблонов (`SPECIFY_TEMPLATE_SOURCE=https://...`) против локальной заглушки."""
+
+import io
+import json
+import threading
+import zipfile
+
+import httpx
+import pytest
+from typer.testing import CliRunner
+
+import specify_cli
+from specify_cli import HttpMirrorSource, ReleasePrefetch, app, download_templates, resolve_template_source
+
+
+def _template_zip() -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        archive.writestr("sp-template/.specify/memory/constitution.md", "# Конституция\n")
+        archive.writestr("sp-template/.claude/commands/speckit.plan.md", "план\n")
+    return buffer.getvalue()
+
+
+def _mirror(stub_server, index):
+    archive = _template_zip()
+    stub_server.route("GET", "/templates/index.json", lambda request: (200, {"Content-Type": "application/json", "ETag": '"v1"'}, json.dumps(index)))
+    stub_server.route("GET", "/templates/spec-kit-template-claude-sh-v1.0.0.zip", lambda request: (200, {"Content-Type": "application/zip"}, archive))
+    return archive
+
+
+INDEX = {
+    "tag_name": "v1.0.0",
+    "published_at": "2026-01-01T00:00:00Z",
+    "assets": [{"name": "spec-kit-template-claude-sh-v1.0.0.zip"}],
+}
+
+
+def test_mirror_source_resolves_release_and_downloads(stub_server, tmp_path, monkeypatch):
+    archive = _mirror(stub_server, INDEX)
+    monkeypatch.setenv(specify_cli.TEMPLATE_SOURCE_ENV, f"{stub_server.url}/templates/")
+    source = resolve_template_source()
+    assert isinstance(source, HttpMirrorSource)
+    assert source.release_url == f"{stub_server.url}/templates/index.json"
+
+    with httpx.Client() as client:
+        release = source.fetch_release(client)
+        # Относительный адрес актива разрешается относительно index.json
+        asset = release["assets"][0]
+        assert asset["browser_download_url"] == f"{stub_server.url}/templates/spec-kit-template-claude-sh-v1.0.0.zip"
+
+        downloads = download_templates(["claude"], tmp_path, verbose=False, show_progress=False, client=client, source=source)
+    zip_path, meta = downloads[0]
+    assert zip_path.read_bytes() == archive
+    assert meta["release"] == "v1.0.0"
+    assert meta["filename"] == "spec-kit-template-claude-sh-v1.0.0.zip"
+
+    # Повторный запрос метаданных условный: ETag из кэша релизов
+    with httpx.Client() as client:
+        assert source.fetch_release(client)["tag_name"] == "v1.0.0"
+    index_requests = [headers for method, path, headers, _ in stub_server.requests if path == "/templates/index.json"]
+    assert index_requests[-1].get("If-None-Match") == '"v1"'
+
+
+def test_mirror_missing_index_reports_status(stub_server):
+    source = HttpMirrorSource(f"{stub_server.url}/missing")
+    with httpx.Client() as client, pytest.raises(RuntimeError, match="404"):
+        source.fetch_release(client)
+
+
+def test_mirror_malformed_index_is_an_error(stub_server):
+    stub_server.route("GET", "/broken/index.json", lambda request: (200, {"Content-Type": "application/json"}, "{not json"))
+    source = HttpMirrorSource(f"{stub_server.url}/broken")
+    with httpx.Client() as client, pytest.raises(RuntimeError, match="распарсить JSON"):
+        source.fetch_release(client)
+
+
+def test_stalled_prefetch_falls_back_to_foreground_download(stub_server, tmp_path, monkeypatch):
+    index = {**INDEX, "assets": [{"name": "spec-kit-template-claude-sh-v1.0.0.zip"}, {"name": "spec-kit-template-gemini-sh-v1.0.0.zip"}]}
+    archive = _mirror(stub_server, index)
+    release_stall = threading.Event()
+    served = {"claude": 0, "gemini": 0}
+
+    def asset(ai):
+        def handler(request):
+            served[ai] += 1
+            if ai == "claude" and served[ai] == 1:
+                # Фоновая загрузка архива claude зависает, пока тест не завершится
+                release_stall.wait(10)
+            return 200, {"Content-Type": "application/zip"}, archive
+        return handler
+
+    for ai in served:
+        stub_server.route("GET", f"/templates/spec-kit-template-{ai}-sh-v1.0.0.zip", asset(ai))
+    monkeypatch.setattr(specify_cli, "PREFETCH_ASSET_WAIT", 1.0)
+    source = HttpMirrorSource(f"{stub_server.url}/templates")
+    prefetch = ReleasePrefetch(source).start()
+    try:
+        prefetch.request_assets(["claude", "gemini"], "sh")
+        with httpx.Client() as client:
+            downloads = download_templates(["claude", "gemini"], tmp_path, verbose=False, show_progress=False, client=client, source=source, prefetch=prefetch)
+        assert [zip_path.read_bytes() == archive for zip_path, _ in downloads] == [True, True]
+        # Отказ от зависшей загрузки не мешает забрать уже готовый архив другого агента
+        assert [meta["prefetched"] for _, meta in downloads] == [False, True]
+        assert served == {"claude": 2, "gemini": 1}
+        assert not prefetch._closed.is_set()
+    finally:
+        release_stall.set()
+        prefetch.close()
+
+
+def test_init_error_exits_do_not_start_prefetch(tmp_path, monkeypatch):
+    started = []
+    monkeypatch.setattr(ReleasePrefetch, "start", lambda self: started.append(self) or self)
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "taken").mkdir()
+    runner = CliRunner()
+    assert runner.invoke(app, ["init", "taken", "--ai", "claude", "--ignore-agent-tools"]).exit_code == 1
+    assert runner.invoke(app, ["init", "fresh", "--ai", "no-such-agent", "--ignore-agent-tools"]).exit_code == 1
+    assert runner.invoke(app, ["init", "fresh", "--ai", "claude", "--script", "bat", "--ignore-agent-tools"]).exit_code == 1
+    assert started == []
+
+
+def test_custom_source_has_a_default_description():
+    class PinnedSource(specify_cli.TemplateSource):
+        release_url = "https://templates.example/pinned.json"
+
+    assert PinnedSource().describe() == "https://templates.example/pinned.json"
+    assert specify_cli.TemplateSource().describe() == "TemplateSource"